@@ -0,0 +1,42 @@
+"""Index pagination par curseur
+
+Revision ID: 3f2a9c1d7e64
+Revises: 17740c7f9f05
+Create Date: 2026-10-18 09:12:30.418202
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f2a9c1d7e64'
+down_revision: Union[str, Sequence[str], None] = '17740c7f9f05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Colonnes de tri des curseurs : une date NULL casserait l'encodage du curseur
+    # et sortirait de l'ordre keyset. Lignes anciennes complétées, puis NOT NULL.
+    for table in ('users', 'posts'):
+        op.execute(f"UPDATE {table} SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL")
+        op.execute(f"UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+    op.create_index('ix_posts_created_at_id', 'posts', ['created_at', 'id'], unique=False)
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_created_at_id', table_name='users')
+    op.drop_index('ix_posts_created_at_id', table_name='posts')
+    for table in ('posts', 'users'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), nullable=True)
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(timezone=True), nullable=True)
@@ -0,0 +1,31 @@
+"""Index posts.users_id et titre unique
+
+Revision ID: 8b41e0d5a2c7
+Revises: 3f2a9c1d7e64
+Create Date: 2026-10-18 11:40:05.127733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b41e0d5a2c7'
+down_revision: Union[str, Sequence[str], None] = '3f2a9c1d7e64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_posts_users_id'), 'posts', ['users_id'], unique=False)
+    # Échoue si des titres en double existent déjà : les dédoublonner avant migration
+    op.create_index(op.f('ix_posts_title'), 'posts', ['title'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_posts_title'), table_name='posts')
+    op.drop_index(op.f('ix_posts_users_id'), table_name='posts')
@@ -0,0 +1,37 @@
+"""Compteur post_count sur users
+
+Revision ID: c5d2f7a914e3
+Revises: 8b41e0d5a2c7
+Create Date: 2026-10-18 14:02:51.660190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d2f7a914e3'
+down_revision: Union[str, Sequence[str], None] = '8b41e0d5a2c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('post_count', sa.Integer(), server_default='0', nullable=False))
+    # Initialisation des compteurs à partir des posts existants
+    op.execute(
+        "UPDATE users SET post_count = "
+        "(SELECT count(*) FROM posts WHERE posts.users_id = users.id)"
+    )
+    # CountPostByUser : parcours ordonné des seuls auteurs ayant des posts, sans relire la table
+    op.create_index('ix_users_with_posts', 'users', ['id', 'username', 'email', 'post_count'], unique=False,
+                    sqlite_where=sa.text('post_count > 0'), postgresql_where=sa.text('post_count > 0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_with_posts', table_name='users')
+    op.drop_column('users', 'post_count')
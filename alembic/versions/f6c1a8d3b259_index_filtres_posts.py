@@ -0,0 +1,33 @@
+"""Index filtres posts
+
+Revision ID: f6c1a8d3b259
+Revises: e3b8f1c06a92
+Create Date: 2026-10-18 16:03:14.552870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c1a8d3b259'
+down_revision: Union[str, Sequence[str], None] = 'e3b8f1c06a92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_posts_users_id_created_at_id', 'posts', ['users_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_posts_updated_at_id', 'posts', ['updated_at', 'id'], unique=False)
+    # Redondant : users_id est la colonne de tête de l'index composite
+    op.drop_index(op.f('ix_posts_users_id'), table_name='posts')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_posts_users_id'), 'posts', ['users_id'], unique=False)
+    op.drop_index('ix_posts_updated_at_id', table_name='posts')
+    op.drop_index('ix_posts_users_id_created_at_id', table_name='posts')
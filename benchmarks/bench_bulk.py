@@ -0,0 +1,129 @@
+"""
+Débit des écritures en lot face aux routes unitaires : N posts créés,
+modifiés puis supprimés via /api/add_post, /api/update_posts et
+/api/delete_post, puis via /api/bulk/posts (et /api/bulk/posts/delete) par
+lots de --batch-size.
+
+    python benchmarks/bench_bulk.py
+    python benchmarks/bench_bulk.py --items 5000 --batch-size 1000 --min-speedup 10
+    python benchmarks/bench_bulk.py --save bulk.json
+    python benchmarks/bench_bulk.py --compare bulk.json --metric rps
+
+Code de sortie 1 si une opération en lot n'atteint pas --min-speedup.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from common import add_baseline_arguments, handle_baseline, print_table, setup_environment
+
+
+def seed(n_users: int):
+    from datetime import datetime
+    from sqlalchemy import insert
+
+    import config
+    from models.models import Users
+
+    config.Base.metadata.create_all(config.engine)
+    now = datetime.utcnow()
+    with config.engine.begin() as conn:
+        conn.execute(insert(Users), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "phone": "0123456789",
+             "password": "x", "created_at": now, "updated_at": now}
+            for i in range(1, n_users + 1)
+        ])
+
+
+def chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def rate(items: int, elapsed: float, errors: int) -> dict:
+    return {"items": items, "seconds": round(elapsed, 3), "rps": round(items / elapsed, 1) if elapsed else 0.0, "errors": errors}
+
+
+async def timed(calls) -> tuple:
+    errors = 0
+    started = time.perf_counter()
+    for call in calls:
+        body = (await call()).json()
+        errors += body.get("code") != "200"
+    return time.perf_counter() - started, errors
+
+
+async def run(args):
+    import httpx
+    from main import app
+
+    n, users = args.items, args.users
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Routes unitaires : un appel (et une transaction) par post
+        single = [{"title": f"Unitaire {i}", "content": "x" * 200, "users_id": i % users + 1} for i in range(n)]
+        elapsed, errors = await timed(lambda p=p: client.post("/api/add_post", json=p) for p in single)
+        results["single.create"] = rate(n, elapsed, errors)
+        first = (await client.get("/api/posts", params={"limit": 1})).json()["result"][0]["id"]
+        ids = list(range(first - n + 1, first + 1))
+        elapsed, errors = await timed(
+            lambda i=i: client.put(f"/api/update_posts/{i}", json={"content": "y" * 200}) for i in ids
+        )
+        results["single.update"] = rate(n, elapsed, errors)
+        elapsed, errors = await timed(
+            lambda i=i: client.delete(f"/api/delete_post/{i}", params={"post_id": i}) for i in ids
+        )
+        results["single.delete"] = rate(n, elapsed, errors)
+
+        # Routes en lot : une transaction par lot
+        bulk = [{"title": f"Lot {i}", "content": "x" * 200, "users_id": i % users + 1} for i in range(n)]
+        ids = []
+        started = time.perf_counter()
+        errors = 0
+        for batch in chunks(bulk, args.batch_size):
+            result = (await client.post("/api/bulk/posts", json=batch)).json()["result"]
+            ids += [i for i in result["ids"] if i is not None]
+            errors += len(result["errors"])
+        results["bulk.create"] = rate(n, time.perf_counter() - started, errors)
+        elapsed, errors = await timed(
+            lambda b=b: client.put("/api/bulk/posts", json=[{"id": i, "content": "y" * 200} for i in b])
+            for b in chunks(ids, args.batch_size)
+        )
+        results["bulk.update"] = rate(n, elapsed, errors)
+        elapsed, errors = await timed(
+            lambda b=b: client.post("/api/bulk/posts/delete", json=b) for b in chunks(ids, args.batch_size)
+        )
+        results["bulk.delete"] = rate(n, elapsed, errors)
+
+    for op in ("create", "update", "delete"):
+        single_rps, bulk_rps = results[f"single.{op}"]["rps"], results[f"bulk.{op}"]["rps"]
+        results[f"bulk.{op}"]["speedup"] = round(bulk_rps / single_rps, 1) if single_rps else 0.0
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="base à utiliser (défaut : SQLite temporaire)")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--items", type=int, default=2000, help="posts écrits par scénario")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--min-speedup", type=float, default=10.0, help="gain minimal attendu du lot sur l'unitaire")
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    setup_environment(args.database_url)
+    seed(args.users)
+    results = asyncio.run(run(args))
+
+    print_table(results, columns=("items", "seconds", "rps", "errors", "speedup"))
+    slow = [name for name, row in results.items() if row.get("speedup", args.min_speedup) < args.min_speedup]
+    if slow:
+        print(f"\nGain inférieur à x{args.min_speedup} : {', '.join(slow)}")
+    status = handle_baseline(args, results)
+    return 1 if slow else status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
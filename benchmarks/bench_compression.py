@@ -0,0 +1,108 @@
+"""
+Coût CPU contre octets économisés de la compression des réponses, sur des
+listes de PostOut sérialisées comme /api/posts (EnvelopeResponse). Chaque
+encodage disponible (gzip, et br / zstd si installés) est mesuré à plusieurs
+niveaux ; "cache_hit" mesure la réponse servie depuis le cache par ETag.
+
+    python benchmarks/bench_compression.py
+    python benchmarks/bench_compression.py --sizes 50 500 --save compression.json
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+from common import add_baseline_arguments, handle_baseline, print_table, setup_environment, summarize
+
+setup_environment()
+
+from bench_micro import fake_user  # noqa: E402
+from repository.cache import TTLCache  # noqa: E402
+from repository.compression import BrotliCodec, GzipCodec, ZstdCodec  # noqa: E402
+from schemas.posts import PostOut, ResponseSchema  # noqa: E402
+from schemas.responses import EnvelopeResponse  # noqa: E402
+
+LEVELS = {GzipCodec: (1, 5, 9), BrotliCodec: (1, 4, 8), ZstdCodec: (1, 3, 10)}
+
+
+WORDS = (
+    "le la les un une des et ou mais donc car construction chantier béton devis client projet "
+    "équipe planning livraison matériaux rénovation maison toiture façade isolation budget délai "
+    "réunion architecte permis sécurité qualité contrôle facture commande fournisseur"
+).split()
+
+
+def realistic_posts(n: int, seed: int = 42):
+    """Contenus variés (et non répétés) : un taux de compression proche de la production."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    authors = [fake_user(i) for i in range(1, 21)]
+    return [
+        SimpleNamespace(
+            id=i, title=f"{' '.join(rng.choices(WORDS, k=5)).capitalize()} {i}",
+            content=" ".join(rng.choices(WORDS, k=rng.randint(20, 80))),
+            users=rng.choice(authors), created_at=now - timedelta(seconds=rng.randint(0, 10 ** 7)), updated_at=now,
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def available_codecs():
+    for factory, levels in LEVELS.items():
+        for level in levels:
+            try:
+                yield factory(level)
+            except ImportError:
+                break
+
+
+def measure(fn, iterations: int) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 500], help="tailles de liste")
+    parser.add_argument("--iterations", type=int, default=200)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+    results = {}
+
+    for size in args.sizes:
+        body = EnvelopeResponse(ResponseSchema[List[PostOut]](
+            code="200", status="Ok", message="Liste des postes", result=realistic_posts(size),
+        )).body
+        results[f"posts{size}.identity"] = {"bytes": len(body), "ratio": 1.0, "p50_ms": 0.0, "mb_s": ""}
+
+        for codec in available_codecs():
+            level = getattr(codec, "level", getattr(codec, "quality", ""))
+            compressed = codec.compress(body)
+            row = measure(lambda: codec.compress(body), args.iterations)
+            row.update(
+                bytes=len(compressed),
+                ratio=round(len(compressed) / len(body), 4),
+                mb_s=round(len(body) / (row["p50_ms"] / 1000) / 1e6, 1) if row["p50_ms"] else "",
+            )
+            results[f"posts{size}.{codec.name}.{level}"] = row
+
+        # Même version (ETag) : le corps compressé est relu dans le cache
+        cache = TTLCache(maxsize=16)
+        cache.set(("gzip", "/api/posts", b"", 'W/"etag"'), GzipCodec().compress(body))
+        row = measure(lambda: cache.get(("gzip", "/api/posts", b"", 'W/"etag"')), args.iterations)
+        results[f"posts{size}.gzip.cache_hit"] = {**row, "bytes": "", "ratio": "", "mb_s": ""}
+
+    print_table(results, columns=("bytes", "ratio", "p50_ms", "p95_ms", "mb_s"))
+    return handle_baseline(args, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Benchmark mémoire des exports en flux.
+
+Pour chaque taille, un premier sous-processus remplit une base SQLite avec
+N posts ; un second, neuf, consomme entièrement le flux NDJSON de
+/api/export/posts et rapporte le pic de RSS et sa hausse pendant l'export.
+Une hausse stable entre 10k et 1M lignes confirme la mémoire constante.
+
+    python benchmarks/bench_export.py --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def setup(db_path: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, ROOT)
+
+
+def seed(size: int, db_path: str):
+    """Remplissage de la base, dans son propre processus : son pic de RSS n'entre pas dans la mesure."""
+    setup(db_path)
+    from datetime import datetime
+    from sqlalchemy import insert
+    import config
+    from models.models import Post, Users
+
+    config.Base.metadata.create_all(config.engine)
+    now = datetime.utcnow()
+    with config.engine.begin() as conn:
+        conn.execute(insert(Users), [{"username": "bench", "email": "bench@example.com", "password": "x", "created_at": now, "updated_at": now}])
+        batch = 50_000
+        for start in range(0, size, batch):
+            conn.execute(insert(Post), [
+                {"title": f"Post {i}", "content": "x" * 200, "users_id": 1, "created_at": now, "updated_at": now}
+                for i in range(start, min(start + batch, size))
+            ])
+
+
+def child(size: int, fmt: str, db_path: str):
+    setup(db_path)
+    from repository.export import export_stream
+    from repository.posts import ExportPostsRepo
+    from schemas.posts import PostOut
+
+    # Processus neuf : ru_maxrss ne contient que les imports (rss_before) puis l'export
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    total = 0
+    for chunk in export_stream(ExportPostsRepo.export_query(), PostOut, fmt):
+        total += len(chunk)
+    elapsed = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps({
+        "rows": size,
+        "bytes": total,
+        "seconds": round(elapsed, 3),
+        "rows_per_s": round(size / elapsed),
+        "rss_before_mb": round(rss_before / 1024, 1),
+        "peak_rss_mb": round(rss_after / 1024, 1),
+        "export_rss_mb": round((rss_after - rss_before) / 1024, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--format", choices=["ndjson", "json"], default="ndjson")
+    parser.add_argument("--seed", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        seed(args.seed, args.db)
+        return
+    if args.child is not None:
+        child(args.child, args.format, args.db)
+        return
+
+    print(f"{'rows':>10} {'MB out':>9} {'s':>8} {'rows/s':>10} {'RSS avant MB':>13} {'pic RSS MB':>11} {'export MB':>10}")
+    for size in args.sizes:
+        db_path = os.path.join(tempfile.mkdtemp(), "export.db")
+        subprocess.run([sys.executable, __file__, "--seed", str(size), "--db", db_path], check=True)
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", str(size), "--format", args.format, "--db", db_path],
+            check=True, capture_output=True, text=True,
+        ).stdout.strip().splitlines()[-1]
+        os.remove(db_path)
+        os.rmdir(os.path.dirname(db_path))
+        r = json.loads(out)
+        print(f"{r['rows']:>10} {r['bytes'] / 1e6:>9.1f} {r['seconds']:>8} {r['rows_per_s']:>10} {r['rss_before_mb']:>13} "
+              f"{r['peak_rss_mb']:>11} {r['export_rss_mb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Harnais de charge ASGI en processus : chaque route de l'API est appelée via
+httpx sur une base SQLite remplie (ou la base fournie par --database-url),
+sans réseau ni serveur. Rapporte p50/p95/p99 et req/s par route.
+
+    python benchmarks/bench_load.py
+    python benchmarks/bench_load.py --posts 20000 --requests 500 --concurrency 20
+    python benchmarks/bench_load.py --only posts.list posts.one --save load.json
+    python benchmarks/bench_load.py --compare load.json --threshold 15
+"""
+import argparse
+import asyncio
+import itertools
+import sys
+import time
+
+from common import add_baseline_arguments, handle_baseline, print_table, setup_environment, summarize
+
+PASSWORD = "benchpwd"
+OTHER_PASSWORD = "pwdbench"
+
+
+def seed(n_users: int, n_posts: int, n_deletable: int):
+    """
+    `n_users` utilisateurs et `n_posts` posts lus et modifiés par les routes,
+    puis `n_deletable` utilisateurs (sans posts) et `n_deletable` posts
+    réservés aux routes de suppression : ids n_users + 1… et n_posts + 1….
+    """
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+
+    import config
+    from models.models import Post, Users
+    from repository.hashing import pwd_context
+    from repository.posts import PostCounterRepo
+
+    config.Base.metadata.create_all(config.engine)
+    now = datetime.utcnow()
+    hashed = pwd_context.hash(PASSWORD)
+    with config.engine.begin() as conn:
+        conn.execute(insert(Users), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "phone": "0123456789",
+             "password": hashed, "created_at": now, "updated_at": now}
+            for i in range(1, n_users + 1)
+        ])
+        conn.execute(insert(Post), [
+            {"title": f"Post {i}", "content": "x" * 200, "users_id": (i % n_users) + 1,
+             "created_at": now - timedelta(seconds=i), "updated_at": now}
+            for i in range(1, n_posts + 1)
+        ])
+        conn.execute(insert(Users), [
+            {"username": f"spare{i}", "email": f"spare{i}@example.com", "phone": "0123456789",
+             "password": hashed, "created_at": now, "updated_at": now}
+            for i in range(1, n_deletable + 1)
+        ])
+        conn.execute(insert(Post), [
+            {"title": f"Jetable {i}", "content": "x" * 200, "users_id": 1,
+             "created_at": now - timedelta(seconds=n_posts + i), "updated_at": now}
+            for i in range(1, n_deletable + 1)
+        ])
+    # Insertion en masse : les compteurs Users.post_count sont recalculés ensuite
+    with config.SessionLocal() as db:
+        PostCounterRepo.rebuild(db)
+
+
+def endpoints(n_users: int, n_posts: int):
+    """
+    (nom, méthode, fabrique de requête, séquentiel). La fabrique reçoit un
+    compteur et retourne les kwargs httpx ; les routes d'écriture consomment
+    des identifiants distincts pour rester valides d'un appel à l'autre (les
+    suppressions, ceux des lignes réservées par `seed`).
+    """
+    import config
+    from repository.tokens import RefreshTokenRepo
+
+    def refresh_token():
+        # Émis hors de la mesure : chaque appel consomme (rotation) son propre jeton
+        with config.SessionLocal() as db:
+            return RefreshTokenRepo.issue(db, 1)
+
+    deletable_posts = itertools.count(n_posts + 1)
+    deletable_users = itertools.count(n_users + 1)
+    signups = itertools.count(1)
+    new_posts = itertools.count(1)
+
+    return [
+        ("auth.signup", "POST", lambda i: {"url": "/auth/signup", "json": {
+            "username": f"new{next(signups)}", "email": f"new{i}-{time.monotonic_ns()}@example.com",
+            "phone": "0123456789", "password": PASSWORD}}, False),
+        ("auth.login", "POST", lambda i: {"url": "/auth/login", "json": {"username": "user1", "password": PASSWORD}}, False),
+        ("auth.me", "GET", lambda i: {"url": "/auth/me"}, False),
+        ("auth.refresh", "POST", lambda i: {"url": "/auth/refresh", "json": {"refresh_token": refresh_token()}}, False),
+        ("posts.add", "POST", lambda i: {"url": "/api/add_post", "json": {
+            "title": f"Nouveau {next(new_posts)}", "content": "y" * 50, "users_id": 1}}, False),
+        ("posts.list", "GET", lambda i: {"url": "/api/posts", "params": {"limit": 50}}, False),
+        ("posts.one", "GET", lambda i: {"url": f"/api/posts/{i % n_posts + 1}", "params": {"post_id": i % n_posts + 1}}, False),
+        ("posts.search", "GET", lambda i: {"url": "/api/posts/search", "params": {"q": f"Post {i % n_posts + 1}", "limit": 20}}, False),
+        ("posts.count_by_user", "GET", lambda i: {"url": "/api/count-by-user"}, False),
+        ("posts.update", "PUT", lambda i: {"url": f"/api/update_posts/{i % (n_posts // 2) + 1}", "json": {
+            "content": f"Contenu modifié {i}"}}, False),
+        ("posts.delete", "DELETE", lambda i: (lambda pid: {"url": f"/api/delete_post/{pid}", "params": {"post_id": pid}})(next(deletable_posts)), False),
+        ("posts.export", "GET", lambda i: {"url": "/api/export/posts"}, False),
+        ("users.list", "GET", lambda i: {"url": "/api/users", "params": {"limit": 50}}, False),
+        ("users.one", "GET", lambda i: {"url": f"/api/users/{i % n_users + 1}", "params": {"user_id": i % n_users + 1}}, False),
+        ("users.update", "PUT", lambda i: {"url": f"/api/update_users/{i % (n_users // 2) + 1}", "json": {"phone": "0987654321"}}, False),
+        ("users.change_password", "PUT", lambda i: {"url": "/api/change_password_by_email", "json": {
+            "email": "user2@example.com",
+            "old_password": (PASSWORD, OTHER_PASSWORD)[i % 2],
+            "new_password": (OTHER_PASSWORD, PASSWORD)[i % 2],
+            "confirm_password": (OTHER_PASSWORD, PASSWORD)[i % 2]}}, True),
+        ("users.export", "GET", lambda i: {"url": "/api/export/users"}, False),
+        ("users.delete", "DELETE", lambda i: {"url": f"/api/delete_users/{next(deletable_users)}"}, False),
+    ]
+
+
+def is_success(response) -> bool:
+    if response.status_code != 200:
+        return False
+    if response.headers.get("content-type", "").startswith("application/json"):
+        body = response.json()
+        return not isinstance(body, dict) or body.get("code", "200") == "200"
+    return True
+
+
+async def run_endpoint(client, method, factory, requests: int, concurrency: int, headers: dict):
+    counter = itertools.count()
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        for i in iter(lambda: next(counter), None):
+            if i >= requests:
+                return
+            kwargs = factory(i)
+            t0 = time.perf_counter()
+            response = await client.request(method, headers=headers, **kwargs)
+            latencies.append(time.perf_counter() - t0)
+            if not is_success(response):
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarize(latencies, time.perf_counter() - started)
+    result["errors"] = errors
+    return result
+
+
+async def run(args):
+    import httpx
+    from main import app
+
+    n_users, n_posts = args.users, args.posts
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        login = await client.post("/auth/login", json={"username": "user1", "password": PASSWORD})
+        token = login.json()["result"]["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for name, method, factory, sequential in endpoints(n_users, n_posts):
+            if args.only and name not in args.only:
+                continue
+            slow = name in ("auth.signup", "auth.login", "users.change_password")
+            requests = args.slow_requests if slow else args.requests
+            if name.endswith(".export"):
+                requests = min(requests, args.export_requests)
+            concurrency = 1 if sequential else args.concurrency
+            results[name] = await run_endpoint(client, method, factory, requests, concurrency, headers)
+            print(f"  {name}: {results[name]['rps']} req/s", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="base à utiliser (défaut : SQLite temporaire)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=300, help="requêtes par route")
+    parser.add_argument("--slow-requests", type=int, default=20, help="requêtes pour les routes bcrypt")
+    parser.add_argument("--export-requests", type=int, default=5, help="requêtes pour les exports complets")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--only", nargs="+", help="routes à mesurer")
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    setup_environment(args.database_url)
+    # Une ligne réservée par requête de suppression : aucun 404 quel que soit --requests
+    seed(args.users, args.posts, args.requests)
+    results = asyncio.run(run(args))
+
+    print_table(results, columns=("p50_ms", "p95_ms", "p99_ms", "rps", "errors"))
+    return handle_baseline(args, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
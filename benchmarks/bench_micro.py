@@ -0,0 +1,119 @@
+"""
+Micro-benchmarks : tokens JWT, coût bcrypt et sérialisation Pydantic
+(dont le coût de sérialisation d'une réponse de liste comme /api/posts :
+ancien chemin dict + jsonable_encoder + json.dumps contre EnvelopeResponse).
+
+    python benchmarks/bench_micro.py
+    python benchmarks/bench_micro.py --rounds 4 8 10 12 --save micro.json
+    python benchmarks/bench_micro.py --compare micro.json
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import List
+
+from common import add_baseline_arguments, handle_baseline, print_table, setup_environment, summarize
+
+setup_environment()
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from passlib.hash import bcrypt  # noqa: E402
+
+from repository.users import JWTRepo, token_cache, verify_token_cached  # noqa: E402
+from schemas.posts import PostOut, ResponseSchema  # noqa: E402
+from schemas.responses import EnvelopeResponse  # noqa: E402
+from schemas.users import UserOut  # noqa: E402
+
+
+def measure(fn, iterations: int) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def fake_user(i: int = 1):
+    now = datetime.utcnow()
+    return SimpleNamespace(
+        id=i, username=f"user{i}", email=f"user{i}@example.com", phone="0123456789",
+        created_at=now, updated_at=now,
+    )
+
+
+def fake_posts(n: int):
+    now = datetime.utcnow()
+    author = fake_user()
+    return [
+        SimpleNamespace(id=i, title=f"Post {i}", content="x" * 200, users=author, created_at=now, updated_at=now)
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[4, 8, 10, 12], help="coûts bcrypt mesurés")
+    parser.add_argument("--bcrypt-iterations", type=int, default=5)
+    parser.add_argument("--list-size", type=int, default=100, help="taille des listes de PostOut")
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+    n = args.iterations
+    results = {}
+
+    # Tokens JWT
+    token = JWTRepo.generate_token({"sub": "bench"})
+    results["jwt.encode"] = measure(lambda: JWTRepo.generate_token({"sub": "bench"}), n)
+    results["jwt.decode"] = measure(lambda: JWTRepo.decode_token(token), n)
+    token_cache.clear()
+    verify_token_cached(token)
+    results["jwt.decode_cached"] = measure(lambda: verify_token_cached(token), n)
+
+    # bcrypt selon le coût
+    for rounds in args.rounds:
+        hasher = bcrypt.using(rounds=rounds)
+        hashed = hasher.hash("password")
+        results[f"bcrypt.hash.r{rounds}"] = measure(lambda: hasher.hash("password"), args.bcrypt_iterations)
+        results[f"bcrypt.verify.r{rounds}"] = measure(lambda: hasher.verify("password", hashed), args.bcrypt_iterations)
+
+    # Sérialisation Pydantic
+    user = fake_user()
+    posts = fake_posts(args.list_size)
+    results["pydantic.UserOut"] = measure(lambda: UserOut.model_validate(user).model_dump_json(), n)
+    results["pydantic.PostOut"] = measure(lambda: PostOut.model_validate(posts[0]).model_dump_json(), n)
+    list_iterations = max(1, n // args.list_size)
+    results[f"pydantic.PostOut_list{args.list_size}.envelope_dict"] = measure(
+        lambda: ResponseSchema(
+            code="200", status="Ok", message="Liste des postes",
+            result=[PostOut.model_validate(p) for p in posts],
+        ).model_dump(exclude_none=True),
+        list_iterations,
+    )
+
+    # Réponse complète d'une liste (ORM -> octets), ancien et nouveau chemin
+    def legacy_response():
+        content = ResponseSchema(
+            code="200", status="Ok", message="Liste des postes",
+            result=[PostOut.from_orm(p) for p in posts],
+        ).dict(exclude_none=True)
+        return json.dumps(jsonable_encoder(content), ensure_ascii=False).encode()
+
+    def envelope_response():
+        return EnvelopeResponse(ResponseSchema[List[PostOut]](
+            code="200", status="Ok", message="Liste des postes", result=posts,
+        )).body
+
+    results[f"response.posts_list{args.list_size}.legacy"] = measure(legacy_response, list_iterations)
+    results[f"response.posts_list{args.list_size}.envelope"] = measure(envelope_response, list_iterations)
+
+    print_table(results)
+    return handle_baseline(args, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Outils partagés des benchmarks : base de test, statistiques, baseline."""
+import json
+import os
+import statistics
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def setup_environment(database_url: str = None) -> str:
+    """
+    Pointe l'application sur une base SQLite jetable (ou DATABASE_URL fourni).
+    Doit être appelé avant tout import de `config`.
+    """
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    # Les benchmarks mesurent bcrypt : le limiteur de tentatives ne doit pas les rejeter
+    os.environ.setdefault("RATE_LIMIT_IP", "1000000/60")
+    os.environ.setdefault("RATE_LIMIT_IDENTITY", "1000000/60")
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    return database_url
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed: float) -> dict:
+    """Latences en secondes -> p50/p95/p99 en ms et débit."""
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def print_table(results: dict, columns=("p50_ms", "p95_ms", "p99_ms", "rps")):
+    width = max([len(name) for name in results] + [10])
+    print(f"{'benchmark':<{width}} " + " ".join(f"{c:>10}" for c in columns))
+    for name, row in results.items():
+        print(f"{name:<{width}} " + " ".join(f"{row.get(c, ''):>10}" for c in columns))
+
+
+def save_baseline(path: str, results: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Baseline enregistrée dans {path}")
+
+
+def compare_baseline(path: str, results: dict, metric: str = "p95_ms", threshold: float = 10.0) -> bool:
+    """
+    Compare `metric` à la baseline. Retourne False si un benchmark régresse
+    de plus de `threshold` %. Pour `rps`, une baisse est une régression.
+    """
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    ok = True
+    width = max([len(name) for name in results] + [10])
+    print(f"\n{'benchmark':<{width}} {'baseline':>10} {'actuel':>10} {'delta %':>9}")
+    for name, row in results.items():
+        if name not in baseline or metric not in baseline[name]:
+            print(f"{name:<{width}} {'-':>10} {row[metric]:>10} {'nouveau':>9}")
+            continue
+        before, after = baseline[name][metric], row[metric]
+        delta = (after - before) / before * 100 if before else 0.0
+        regressed = -delta > threshold if metric == "rps" else delta > threshold
+        ok = ok and not regressed
+        flag = "  <-- régression" if regressed else ""
+        print(f"{name:<{width}} {before:>10} {after:>10} {delta:>+9.1f}{flag}")
+    return ok
+
+
+def add_baseline_arguments(parser):
+    parser.add_argument("--save", metavar="FICHIER", help="enregistre les résultats comme baseline")
+    parser.add_argument("--compare", metavar="FICHIER", help="compare aux résultats d'une baseline")
+    parser.add_argument("--metric", default="p95_ms", help="métrique comparée (défaut: p95_ms)")
+    parser.add_argument("--threshold", type=float, default=10.0, help="régression tolérée en %% (défaut: 10)")
+
+
+def handle_baseline(args, results: dict) -> int:
+    if args.save:
+        save_baseline(args.save, results)
+    if args.compare:
+        return 0 if compare_baseline(args.compare, results, args.metric, args.threshold) else 1
+    return 0
@@ -1,5 +1,10 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.concurrency import run_in_threadpool
+from repository.pool_monitor import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from repository.metrics import instrument_engine
 from dotenv import load_dotenv
 
 from sqlalchemy.ext.declarative import declarative_base
@@ -16,19 +21,92 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+# Pool de connexions
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_USE_LIFO = os.getenv("DB_POOL_USE_LIFO", "false").lower() in ("1", "true", "yes")
+
+# Mode d'accès à la base : synchrone (par défaut) ou asynchrone
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# Drivers asynchrones correspondant aux drivers synchrones
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (to_async_url(DATABASE_URL) if DATABASE_URL else None)
+
+def pool_options(url: str, async_mode: bool = False) -> dict:
+    # SQLite en mémoire garde son pool mono-connexion
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if async_mode else InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_use_lifo": DB_POOL_USE_LIFO,
+    }
+
 # Configuration SQLAlchemy
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-def get_db():
+# Moteur asynchrone, créé uniquement si le mode async est activé
+async_engine = (
+    create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, async_mode=True))
+    if DB_ASYNC else None
+)
+# Nombre et durée des requêtes SQL (exposés par /metrics)
+instrument_engine(engine)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
+
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if DB_ASYNC else None
+)
+
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dépendance utilisée par les routes, selon DB_ASYNC
+get_db = get_async_db if DB_ASYNC else get_sync_db
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Exécute une méthode de repository sans bloquer la boucle d'événements :
+    via AsyncSession.run_sync en mode async, sinon dans le threadpool.
+    """
+    # Méthodes en cache-aside (repository.cache.cached)
+    if hasattr(fn, "aload"):
+        return await fn.aload(db, *args, **kwargs)
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
 # JWT 
 SECRET_KEY = "your_secret_key_here"
 ALGORITHM = "HS256"
@@ -1,13 +1,21 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
 
-from config import engine
+from config import engine, async_engine
 import models.models as users_model
 import routes.auth as auth_routes
 import routes.users as users_routes
 import routes.posts as posts_routes
+import routes.internal as internal_routes
+import routes.wellknown as wellknown_routes
+import routes.metrics as metrics_routes
+from repository.compression import CompressionMiddleware
+from repository.hashing import hasher
+from repository.metrics import MetricsMiddleware
+from repository.revocation import revocation_backend, start_revocation_listener
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -26,9 +34,20 @@ else:
         "https://app.sdnconstruction.com"
     ]
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_revocation_listener()
+    yield
+    # Arrêt propre du pool de hachage, de l'abonnement aux révocations et du moteur async
+    hasher.shutdown()
+    revocation_backend.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
+
 app = FastAPI(
     title="Authentication API JWT FastAPI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -39,12 +58,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression des réponses (ajoutée en dernier : enveloppe toute l'application)
+app.add_middleware(CompressionMiddleware)
+
+# Métriques par route : ajoutées après la compression pour mesurer la requête complète
+app.add_middleware(MetricsMiddleware)
+
 # ========================
 # ROUTES
 # ========================
 app.include_router(auth_routes.router, prefix="/auth")
 app.include_router(users_routes.router, prefix="/api")
 app.include_router(posts_routes.router, prefix="/api")
+app.include_router(internal_routes.router, prefix="/internal", include_in_schema=False)
+app.include_router(wellknown_routes.router)
+app.include_router(metrics_routes.router, include_in_schema=False)
 
 # @app.get("/")
 # async def root():
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, DateTime
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, DateTime, bindparam, event, inspect, text, update
 from datetime import datetime
 from config import Base
 from sqlalchemy.orm import relationship
@@ -11,21 +11,157 @@ class Users(Base):
     email = Column(String(100), unique=True, index=True, nullable=False)
     phone = Column(String(10), nullable=True)
     password = Column(String(200), nullable=False)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
-    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Colonnes de tri des curseurs (repository.pagination) : jamais NULL
+    created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Nombre de posts, maintenu dans la même transaction que les écritures sur Post
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
     # Relation avec Post (un user peut avoir plusieurs posts)
     posts = relationship("Post", back_populates="users", cascade="all, delete-orphan")
 
+    # Pagination par curseur sur (created_at, id)
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Comptage par auteur (CountPostByUser) : index partiel couvrant, dans l'ordre des id.
+        # Le prédicat de la requête doit reprendre la constante telle quelle (pas de paramètre lié).
+        Index("ix_users_with_posts", "id", "username", "email", "post_count",
+              sqlite_where=text("post_count > 0"), postgresql_where=text("post_count > 0")),
+    )
+
 
 class Post(Base):
     __tablename__ = "posts"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    title = Column(String(200), nullable=False)
+    title = Column(String(200), nullable=False, unique=True, index=True)
     content = Column(String, nullable=False)
+    # Indexé par ix_posts_users_id_created_at_id (colonne de tête)
     users_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
-    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Colonnes de tri des curseurs (repository.pagination) : jamais NULL
+    created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relation avec Users (plusieurs posts peuvent appartenir à un user)
-    users = relationship("Users", back_populates="posts")
\ No newline at end of file
+    users = relationship("Users", back_populates="posts")
+
+    # Pagination par curseur : liste globale, fil par auteur, synchronisation incrémentale
+    __table_args__ = (
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_users_id_created_at_id", "users_id", "created_at", "id"),
+        Index("ix_posts_updated_at_id", "updated_at", "id"),
+    )
+
+
+class RefreshToken(Base):
+    """
+    Jeton de rafraîchissement opaque "<id>.<secret>" : seul le HMAC du
+    secret est stocké. Chaque rotation remplit `replaced_by` ; présenter un
+    jeton déjà remplacé révoque toute sa famille (détection de réutilisation).
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(String(32), primary_key=True)
+    family_id = Column(String(32), nullable=False, index=True)
+    users_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    replaced_by = Column(String(32), nullable=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+
+    # Purge des jetons révoqués (RefreshTokenRepo.purge_expired) : seules les lignes révoquées sont indexées
+    __table_args__ = (
+        Index("ix_refresh_tokens_revoked_at", "revoked_at",
+              sqlite_where=text("revoked_at IS NOT NULL"), postgresql_where=text("revoked_at IS NOT NULL")),
+    )
+
+
+# ========================
+# Maintenance de Users.post_count
+# ========================
+def adjust_post_count(connection, users_id: int, delta: int):
+    users = Users.__table__
+    connection.execute(
+        update(users)
+        .where(users.c.id == users_id)
+        # updated_at reste inchangé : le compteur n'est pas une modification du profil
+        .values(post_count=users.c.post_count + delta, updated_at=users.c.updated_at)
+    )
+
+
+def adjust_post_counts(connection, deltas: dict):
+    """Variante en lot de adjust_post_count : {users_id: delta}, un seul executemany."""
+    deltas = [{"_users_id": users_id, "_delta": delta} for users_id, delta in deltas.items() if delta]
+    if not deltas:
+        return
+    users = Users.__table__
+    connection.execute(
+        update(users)
+        .where(users.c.id == bindparam("_users_id"))
+        .values(post_count=users.c.post_count + bindparam("_delta"), updated_at=users.c.updated_at),
+        deltas,
+    )
+
+
+@event.listens_for(Post, "after_insert")
+def post_inserted(mapper, connection, target):
+    adjust_post_count(connection, target.users_id, 1)
+
+
+@event.listens_for(Post, "after_delete")
+def post_deleted(mapper, connection, target):
+    adjust_post_count(connection, target.users_id, -1)
+
+
+@event.listens_for(Post, "after_update")
+def post_reassigned(mapper, connection, target):
+    history = inspect(target).attrs.users_id.history
+    if history.has_changes():
+        for old_users_id in history.deleted:
+            if old_users_id is not None:
+                adjust_post_count(connection, old_users_id, -1)
+        adjust_post_count(connection, target.users_id, 1)
+
+
+# ========================
+# Index de recherche plein texte sur posts (hors du modèle ORM)
+# ========================
+# PostgreSQL : colonne tsvector générée (titre poids A, contenu poids B) et index GIN.
+# SQLite : table FTS5 à contenu externe, tenue à jour par triggers (y compris écritures en lot).
+# Configuration "simple" : pas de racinisation, même découpage que le tokenizer FTS5.
+SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE posts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(content, '')), 'B')) STORED",
+        "CREATE INDEX ix_posts_search_vector ON posts USING gin (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE posts_fts USING fts5(title, content, content='posts', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER posts_fts_ai AFTER INSERT ON posts BEGIN "
+        "INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+        "CREATE TRIGGER posts_fts_ad AFTER DELETE ON posts BEGIN "
+        "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+        "CREATE TRIGGER posts_fts_au AFTER UPDATE OF title, content ON posts BEGIN "
+        "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+        "INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    ],
+}
+
+SEARCH_DROP_DDL = {
+    "sqlite": ["DROP TABLE IF EXISTS posts_fts"],
+}
+
+
+@event.listens_for(Post.__table__, "after_create")
+def create_search_index(target, connection, **kw):
+    # Pour create_all (tests, benchmarks) ; en production, voir la migration Alembic
+    for statement in SEARCH_DDL.get(connection.dialect.name, []):
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Post.__table__, "before_drop")
+def drop_search_index(target, connection, **kw):
+    for statement in SEARCH_DROP_DDL.get(connection.dialect.name, []):
+        connection.exec_driver_sql(statement)
@@ -0,0 +1,84 @@
+import os
+from typing import Iterable, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from schemas.posts import ResponseSchema
+from schemas.responses import BulkResult, EnvelopeResponse
+
+# Taille maximale d'un lot accepté par les routes /bulk
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 1000))
+
+
+class BulkReport:
+    """
+    Résultat d'une opération en lot, aligné sur l'ordre des éléments reçus :
+    `ids[i]` vaut l'identifiant traité ou None, et `errors` liste les échecs.
+    """
+
+    def __init__(self, size: int):
+        self.ids: List[Optional[int]] = [None] * size
+        self.errors: List[dict] = []
+
+    def ok(self, index: int, id: int):
+        self.ids[index] = id
+
+    def fail(self, index: int, message: str):
+        self.errors.append({"index": index, "message": message})
+
+    def result(self) -> dict:
+        return {"ids": self.ids, "errors": sorted(self.errors, key=lambda e: e["index"])}
+
+
+def validate_items(schema: Type[BaseModel], items: list, report: BulkReport, exclude_unset: bool = False) -> List[Tuple[int, dict]]:
+    """Valide chaque élément ; les invalides sont reportés, les autres retournés (index, données)."""
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            model = schema.model_validate(item)
+        except ValidationError as error:
+            first = error.errors()[0]
+            location = ".".join(str(part) for part in first["loc"])
+            report.fail(index, f"{location}: {first['msg']}" if location else first["msg"])
+            continue
+        valid.append((index, model.model_dump(exclude_unset=exclude_unset)))
+    return valid
+
+
+def reject_duplicates(items: List[Tuple[int, dict]], fields: Iterable[str], report: BulkReport, message: str) -> List[Tuple[int, dict]]:
+    """Écarte les éléments qui répètent, dans le lot, une valeur déjà vue pour l'un des champs."""
+    seen = {field: set() for field in fields}
+    kept = []
+    for index, data in items:
+        values = [(field, data.get(field)) for field in seen if data.get(field) is not None]
+        if any(value in seen[field] for field, value in values):
+            report.fail(index, message)
+            continue
+        for field, value in values:
+            seen[field].add(value)
+        kept.append((index, data))
+    return kept
+
+
+def group_by_columns(rows: List[dict]) -> dict:
+    """Regroupe les lignes par jeu de colonnes, un executemany exigeant des clés identiques."""
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return groups
+
+
+def bulk_response(report: BulkReport, message: str) -> EnvelopeResponse:
+    # 207 : au moins un élément en erreur, les autres sont appliqués
+    return EnvelopeResponse(ResponseSchema[BulkResult](
+        code="207" if report.errors else "200",
+        status="Partial" if report.errors else "Ok",
+        message=message,
+        result=report.result()
+    ))
+
+
+def bulk_conflict(error: Exception) -> EnvelopeResponse:
+    # Conflit apparu entre la vérification et l'écriture : le lot entier est annulé
+    print(f"Conflit pendant l'écriture en lot: {error}")
+    return EnvelopeResponse(ResponseSchema(code="409", status="Error", message="Conflit d'écriture, lot annulé"))
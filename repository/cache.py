@@ -0,0 +1,391 @@
+import asyncio
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Cache LRU borné en mémoire, avec expiration par entrée.
+    Thread-safe : partagé entre la boucle d'événements et le threadpool.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            return
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# ========================
+# Cache partagé (cache-aside) pour les lectures des repositories
+# ========================
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # "memory" ou "redis"
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+CACHE_PREFIX = os.getenv("CACHE_PREFIX", "fastapi-jwt:")
+CACHE_TTL = int(os.getenv("CACHE_TTL", 300))
+CACHE_SIZE = int(os.getenv("CACHE_SIZE", 10000))
+# Durée de vie du verrou de calcul (single-flight) et attente maximale des autres lecteurs
+CACHE_LOCK_TTL = float(os.getenv("CACHE_LOCK_TTL", 5))
+# Verrous locaux du single-flight, partagés par hachage de la clé (nombre borné)
+CACHE_LOCK_STRIPES = int(os.getenv("CACHE_LOCK_STRIPES", 64))
+
+
+class CacheBackend:
+    """Interface des backends : valeurs str, TTL en secondes."""
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        """Écrit seulement si la clé est absente ; sert de verrou distribué."""
+        raise NotImplementedError
+
+    def set_many(self, values: dict, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def set_if_unchanged(self, key: str, value: str, ttl: Optional[float], guard_key: str, expected: Optional[str]) -> bool:
+        """Écrit `key` seulement si `guard_key` vaut encore `expected`, de façon atomique."""
+        raise NotImplementedError
+
+    def delete(self, *keys: str):
+        raise NotImplementedError
+
+
+class LocalCacheBackend(CacheBackend):
+    """Backend LRU en mémoire du processus."""
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self._cache = TTLCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ttl=None):
+        self._cache.set(key, value, ttl=ttl)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._cache.get(key) is not None:
+                return False
+            self._cache.set(key, value, ttl=ttl)
+            return True
+
+    def set_many(self, values, ttl=None):
+        with self._lock:
+            for key, value in values.items():
+                self._cache.set(key, value, ttl=ttl)
+
+    def set_if_unchanged(self, key, value, ttl, guard_key, expected):
+        with self._lock:
+            if self._cache.get(guard_key) != expected:
+                return False
+            self._cache.set(key, value, ttl=ttl)
+            return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self._cache.delete(key)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Backend partagé entre workers et nœuds, via le protocole Redis.
+    `client` permet d'injecter un client compatible (ex. fakeredis en local).
+    """
+
+    def __init__(self, url: str = CACHE_URL, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as error:
+                raise RuntimeError("CACHE_BACKEND=redis nécessite le paquet 'redis'") from error
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+
+    def get(self, key):
+        value = self.client.get(key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, ex=int(math.ceil(ttl)) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(key, value, ex=int(math.ceil(ttl)) if ttl else None, nx=True))
+
+    def set_many(self, values, ttl=None):
+        with self.client.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                pipe.set(key, value, ex=int(math.ceil(ttl)) if ttl else None)
+            pipe.execute()
+
+    def set_if_unchanged(self, key, value, ttl, guard_key, expected):
+        from redis.exceptions import WatchError
+
+        # WATCH : la transaction échoue si guard_key change entre la lecture et l'écriture
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(guard_key)
+                current = pipe.get(guard_key)
+                if (current.decode() if isinstance(current, bytes) else current) != expected:
+                    return False
+                pipe.multi()
+                pipe.set(key, value, ex=int(math.ceil(ttl)) if ttl else None)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*keys)
+
+
+def build_backend(kind: str = CACHE_BACKEND) -> CacheBackend:
+    if kind == "redis":
+        return RedisCacheBackend()
+    return LocalCacheBackend()
+
+
+cache_backend = build_backend()
+
+# Compteurs globaux du cache partagé
+cache_stats = {"hits": 0, "misses": 0, "loads": 0, "waits": 0, "stale": 0}
+
+
+def cache_key(namespace: str, *parts) -> str:
+    return CACHE_PREFIX + ":".join([namespace, *map(str, parts)])
+
+
+def generation_key(key: str) -> str:
+    return key + ":gen"
+
+
+def invalidate(*keys: str):
+    """
+    Invalidation après écriture (à appeler une fois le commit effectué).
+    La génération de chaque clé change avant la suppression : un calcul
+    commencé avant l'écriture ne peut plus stocker son résultat périmé.
+    """
+    if not keys:
+        return
+    try:
+        generation = os.urandom(8).hex()
+        cache_backend.set_many({generation_key(key): generation for key in keys}, ttl=CACHE_TTL)
+        cache_backend.delete(*keys)
+    except Exception as error:
+        print(f"Erreur d'invalidation du cache: {error}")
+
+
+class CachedMethod:
+    """
+    Méthode de repository en cache-aside. Le résultat est sérialisé en JSON
+    (`serialize`) : un hit et un miss renvoient donc la même forme (dict/list).
+    Un seul appelant recalcule une clé manquante (single-flight), localement
+    et entre nœuds via `CacheBackend.add`. Le résultat n'est stocké que si
+    la génération de la clé n'a pas changé pendant le calcul (`invalidate`).
+    """
+
+    def __init__(self, fn, namespace: str, key, serialize, ttl: Optional[float] = None):
+        functools.update_wrapper(self, fn)
+        self.fn = fn
+        self.namespace = namespace
+        self.key = key
+        self.serialize = serialize
+        self.ttl = CACHE_TTL if ttl is None else ttl
+        self._local_locks = [threading.Lock() for _ in range(CACHE_LOCK_STRIPES)]
+        self._inflight: dict = {}
+
+    def cache_key(self, *args) -> str:
+        return cache_key(self.namespace, self.key(*args))
+
+    def _load(self, db, *args):
+        # Exécuté dans la session : la sérialisation ne déclenche pas de lazy load hors contexte
+        result = self.fn(db, *args)
+        return None if result is None else self.serialize(result)
+
+    def _lookup(self, key):
+        try:
+            raw = cache_backend.get(key)
+        except Exception as error:
+            print(f"Erreur de lecture du cache: {error}")
+            return None
+        if raw is None:
+            return None
+        cache_stats["hits"] += 1
+        return json.loads(raw)
+
+    def _generation(self, key) -> Optional[str]:
+        try:
+            return cache_backend.get(generation_key(key))
+        except Exception:
+            return None
+
+    def _store(self, key, value, generation):
+        cache_stats["loads"] += 1
+        if value is None:
+            return
+        try:
+            # Invalidée pendant le calcul : la valeur lue peut précéder l'écriture, on ne la garde pas
+            if not cache_backend.set_if_unchanged(key, json.dumps(value), self.ttl, generation_key(key), generation):
+                cache_stats["stale"] += 1
+        except Exception as error:
+            print(f"Erreur d'écriture du cache: {error}")
+
+    def _try_lock(self, lock_key) -> bool:
+        try:
+            return cache_backend.add(lock_key, "1", ttl=CACHE_LOCK_TTL)
+        except Exception:
+            return True
+
+    def _unlock(self, lock_key):
+        try:
+            cache_backend.delete(lock_key)
+        except Exception as error:
+            print(f"Erreur de libération du verrou de cache: {error}")
+
+    # Appel synchrone (threads, scripts)
+    def __call__(self, db, *args):
+        key = self.cache_key(*args)
+        value = self._lookup(key)
+        if value is not None:
+            return value
+
+        with self._local_locks[hash(key) % len(self._local_locks)]:
+            value = self._lookup(key)
+            if value is not None:
+                return value
+            cache_stats["misses"] += 1
+
+            lock_key = key + ":lock"
+            deadline = time.monotonic() + CACHE_LOCK_TTL
+            while not self._try_lock(lock_key) and time.monotonic() < deadline:
+                # Un autre nœud calcule déjà cette clé : on attend son résultat
+                cache_stats["waits"] += 1
+                time.sleep(0.05)
+                value = self._lookup(key)
+                if value is not None:
+                    return value
+            try:
+                generation = self._generation(key)
+                value = self._load(db, *args)
+                self._store(key, value, generation)
+                return value
+            finally:
+                self._unlock(lock_key)
+
+    # Appel asynchrone (routes, via config.run_db) : aucune attente bloquante
+    async def aload(self, db, *args):
+        from config import run_db
+
+        key = self.cache_key(*args)
+        value = self._lookup(key)
+        if value is not None:
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            cache_stats["waits"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            cache_stats["misses"] += 1
+            lock_key = key + ":lock"
+            deadline = time.monotonic() + CACHE_LOCK_TTL
+            while not self._try_lock(lock_key) and time.monotonic() < deadline:
+                cache_stats["waits"] += 1
+                await asyncio.sleep(0.05)
+                value = self._lookup(key)
+                if value is not None:
+                    future.set_result(value)
+                    return value
+            try:
+                generation = self._generation(key)
+                value = await run_db(db, self._load, *args)
+                self._store(key, value, generation)
+            finally:
+                self._unlock(lock_key)
+            future.set_result(value)
+            return value
+        except BaseException as error:
+            if not future.done():
+                future.set_exception(error)
+                # Évite l'avertissement "exception never retrieved" sans attente concurrente
+                future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+def cached(namespace: str, key=lambda *args: ":".join(map(str, args)), serialize=lambda value: value, ttl: Optional[float] = None):
+    """Décorateur cache-aside pour une méthode statique de repository `fn(db, *args)`."""
+
+    def decorator(fn):
+        return CachedMethod(fn, namespace, key, serialize, ttl)
+
+    return decorator
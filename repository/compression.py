@@ -0,0 +1,262 @@
+import gzip
+import os
+import threading
+import zlib
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from repository.cache import TTLCache
+
+# Encodages proposés, par ordre de préférence du serveur ; par défaut ceux dont le paquet est installé
+COMPRESSION_ENCODINGS = os.getenv("COMPRESSION_ENCODINGS")
+# En dessous, l'en-tête et le coût CPU dépassent le gain
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+# Types compressés (préfixes de Content-Type)
+COMPRESSION_TYPES = [t.strip() for t in os.getenv("COMPRESSION_TYPES", "application/json,application/x-ndjson,text/").split(",") if t.strip()]
+# Niveaux : compromis CPU / octets pour des réponses dynamiques (voir benchmarks/bench_compression.py)
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 5))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3))
+# Cache des corps compressés, indexé par (encodage, chemin, ETag) ; 0 pour désactiver
+COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", 512))
+
+
+class Codec:
+    """Encodage HTTP : compression d'un corps complet ou d'un flux."""
+
+    name = ""
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def stream(self):
+        """Objet avec compress(chunk) -> bytes et flush() -> bytes."""
+        raise NotImplementedError
+
+
+class GzipCodec(Codec):
+    name = "gzip"
+
+    def __init__(self, level: int = COMPRESSION_GZIP_LEVEL):
+        self.level = level
+
+    def compress(self, data):
+        # mtime=0 : même entrée, mêmes octets
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def stream(self):
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+
+class BrotliCodec(Codec):
+    name = "br"
+
+    def __init__(self, quality: int = COMPRESSION_BROTLI_QUALITY):
+        try:
+            import brotli
+        except ImportError:
+            import brotlicffi as brotli
+        self.brotli = brotli
+        self.quality = quality
+
+    def compress(self, data):
+        return self.brotli.compress(data, quality=self.quality)
+
+    def stream(self):
+        compressor = self.brotli.Compressor(quality=self.quality)
+
+        class Stream:
+            def compress(self, chunk):
+                return compressor.process(chunk)
+
+            def flush(self):
+                return compressor.finish()
+
+        return Stream()
+
+
+class ZstdCodec(Codec):
+    name = "zstd"
+
+    def __init__(self, level: int = COMPRESSION_ZSTD_LEVEL):
+        import zstandard
+        self.compressor = zstandard.ZstdCompressor(level=level)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def stream(self):
+        return self.compressor.compressobj()
+
+
+CODECS = {"zstd": ZstdCodec, "br": BrotliCodec, "gzip": GzipCodec}
+
+
+def build_codecs(names: Optional[str] = COMPRESSION_ENCODINGS) -> List[Codec]:
+    """
+    Sans configuration : tous les encodages disponibles (zstd, br, gzip).
+    Un encodage demandé explicitement dont le paquet manque est une erreur.
+    """
+    if names is None:
+        codecs = []
+        for factory in CODECS.values():
+            try:
+                codecs.append(factory())
+            except ImportError:
+                continue
+        return codecs
+
+    codecs = []
+    for name in (n.strip() for n in names.split(",") if n.strip()):
+        if name not in CODECS:
+            raise RuntimeError(f"Encodage de compression inconnu : {name}")
+        try:
+            codecs.append(CODECS[name]())
+        except ImportError as error:
+            package = {"br": "brotli", "zstd": "zstandard"}[name]
+            raise RuntimeError(f"COMPRESSION_ENCODINGS={name} nécessite le paquet '{package}'") from error
+    return codecs
+
+
+# Instances partagées : encodages actifs, corps compressés et compteurs (exposés par /internal/compression)
+active_codecs = build_codecs()
+compressed_cache = TTLCache(maxsize=max(1, COMPRESSION_CACHE_SIZE))
+compression_stats = {"compressed": 0, "skipped": 0, "cache_hits": 0, "bytes_in": 0, "bytes_out": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(**deltas):
+    with _stats_lock:
+        for key, value in deltas.items():
+            compression_stats[key] += value
+
+
+def compression_summary() -> dict:
+    with _stats_lock:
+        stats = dict(compression_stats)
+    stats["encodings"] = [codec.name for codec in active_codecs]
+    stats["min_size"] = COMPRESSION_MIN_SIZE
+    stats["ratio"] = round(stats["bytes_out"] / stats["bytes_in"], 4) if stats["bytes_in"] else 0.0
+    stats["cache"] = compressed_cache.stats() if COMPRESSION_CACHE_SIZE > 0 else None
+    return stats
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compression des réponses (zstd, brotli, gzip) :
+    encodage choisi selon Accept-Encoding et l'ordre de préférence du
+    serveur, seuil de taille, liste de types autorisés. Les réponses munies
+    d'un ETag sont compressées une seule fois par version (cache LRU) ;
+    les flux (exports) sont compressés au fil de l'eau.
+    """
+
+    def __init__(self, app, codecs: Optional[List[Codec]] = None, min_size: int = COMPRESSION_MIN_SIZE,
+                 types: List[str] = COMPRESSION_TYPES, cache: Optional[TTLCache] = None):
+        self.app = app
+        self.codecs = active_codecs if codecs is None else codecs
+        self.min_size = min_size
+        self.types = tuple(types)
+        self.cache = cache if cache is not None else (compressed_cache if COMPRESSION_CACHE_SIZE > 0 else None)
+
+    def choose(self, accept_encoding: str) -> Optional[Codec]:
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        for codec in self.codecs:
+            if accepted.get(codec.name, wildcard) > 0:
+                return codec
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.codecs:
+            return await self.app(scope, receive, send)
+        codec = self.choose(Headers(scope=scope).get("accept-encoding", ""))
+        if codec is None:
+            return await self.app(scope, receive, send)
+
+        state = {"start": None, "stream": None, "passthrough": False}
+
+        async def send_compressed(message):
+            if message["type"] == "http.response.start":
+                state["start"] = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            start = state["start"]
+            if state["passthrough"]:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            # Premier morceau : décision de compresser
+            if state["stream"] is None:
+                headers = MutableHeaders(scope=start)
+                content_type = headers.get("content-type", "")
+                if (
+                    start["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or "no-transform" in headers.get("cache-control", "")
+                    or not content_type.startswith(self.types)
+                    or (not more_body and len(body) < self.min_size)
+                ):
+                    state["passthrough"] = True
+                    _count(skipped=1)
+                    await send(start)
+                    return await send(message)
+
+                headers["Content-Encoding"] = codec.name
+                headers.add_vary_header("Accept-Encoding")
+                # Corps complet : compression en une passe, en cache si la version est connue
+                if not more_body:
+                    compressed = self._compress_body(codec, scope, headers.get("etag"), body)
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(start)
+                    return await send({"type": "http.response.body", "body": compressed})
+
+                del headers["Content-Length"]
+                state["stream"] = codec.stream()
+                _count(compressed=1)
+                await send(start)
+
+            chunk = state["stream"].compress(body)
+            _count(bytes_in=len(body), bytes_out=len(chunk))
+            if not more_body:
+                tail = state["stream"].flush()
+                _count(bytes_out=len(tail))
+                return await send({"type": "http.response.body", "body": chunk + tail})
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compress_body(self, codec: Codec, scope, etag: Optional[str], body: bytes) -> bytes:
+        key = None
+        if etag and self.cache is not None:
+            key = (codec.name, scope["path"], scope.get("query_string", b""), etag)
+            cached = self.cache.get(key)
+            if cached is not None:
+                _count(compressed=1, cache_hits=1, bytes_in=len(body), bytes_out=len(cached))
+                return cached
+        compressed = codec.compress(body)
+        if key is not None:
+            self.cache.set(key, compressed)
+        _count(compressed=1, bytes_in=len(body), bytes_out=len(compressed))
+        return compressed
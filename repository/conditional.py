@@ -0,0 +1,62 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Politique de cache des lectures : par défaut, revalidation à chaque requête (If-None-Match -> 304)
+READ_CACHE_CONTROL = os.getenv("READ_CACHE_CONTROL", "no-cache")
+
+
+def _utc(value: datetime) -> datetime:
+    # Dates stockées en UTC naïf (datetime.utcnow)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def make_etag(*parts) -> str:
+    """
+    ETag faible calculé à partir de la version de la représentation (dates
+    de modification, empreinte d'une collection), sans sérialiser le corps.
+    Faible : le même contenu compressé ou non garde le même validateur.
+    """
+    raw = "\x1f".join(_utc(part).isoformat() if isinstance(part, datetime) else str(part) for part in parts)
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": READ_CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_utc(last_modified), usegmt=True)
+    return headers
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Comparaison faible (RFC 9110) : le préfixe W/ est ignoré
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """If-None-Match prime ; If-Modified-Since n'est consulté qu'en son absence."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        # Last-Modified est à la seconde près
+        return _utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
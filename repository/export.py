@@ -0,0 +1,73 @@
+import os
+from typing import Type
+
+from pydantic import BaseModel
+
+from config import DB_ASYNC, SessionLocal, AsyncSessionLocal
+
+# Nombre de lignes lues par aller-retour avec le curseur serveur
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+class _Encoder:
+    """Encode des lots d'objets ORM en NDJSON ou en tableau JSON découpé."""
+
+    def __init__(self, schema: Type[BaseModel], fmt: str):
+        self.schema = schema
+        self.fmt = fmt
+        self.first = True
+
+    def start(self) -> bytes:
+        return b"[" if self.fmt == "json" else b""
+
+    def encode(self, rows) -> bytes:
+        items = [self.schema.model_validate(row).model_dump_json().encode() for row in rows]
+        if not items:
+            return b""
+        if self.fmt == "ndjson":
+            return b"\n".join(items) + b"\n"
+        chunk = b",".join(items)
+        if not self.first:
+            chunk = b"," + chunk
+        self.first = False
+        return chunk
+
+    def end(self) -> bytes:
+        return b"]\n" if self.fmt == "json" else b""
+
+
+def _sync_stream(statement, schema, fmt, batch_size):
+    encoder = _Encoder(schema, fmt)
+    yield encoder.start()
+    with SessionLocal() as db:
+        result = db.execute(statement.execution_options(yield_per=batch_size)).scalars()
+        for rows in result.partitions():
+            # La carte d'identité ne garde que des références faibles :
+            # chaque lot est libéré dès qu'il a été encodé
+            yield encoder.encode(rows)
+    yield encoder.end()
+
+
+async def _async_stream(statement, schema, fmt, batch_size):
+    encoder = _Encoder(schema, fmt)
+    yield encoder.start()
+    async with AsyncSessionLocal() as db:
+        result = await db.stream_scalars(statement.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield encoder.encode(rows)
+    yield encoder.end()
+
+
+def export_stream(statement, schema: Type[BaseModel], fmt: str = "ndjson", batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Générateur d'export à mémoire constante : curseur serveur (yield_per)
+    et une session dédiée qui vit aussi longtemps que la réponse.
+    """
+    if DB_ASYNC:
+        return _async_stream(statement, schema, fmt, batch_size)
+    return _sync_stream(statement, schema, fmt, batch_size)
@@ -0,0 +1,206 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from repository.metrics import password_hash_duration, password_hash_wait
+
+# Politique de hachage : le premier schéma hache, les suivants ne servent qu'à vérifier
+# (puis sont remplacés au prochain login). Paramètres à choisir avec scripts/calibrate_hashing.py
+PASSWORD_SCHEMES = [s.strip() for s in os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",") if s.strip()]
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))  # en Kio
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 4))
+
+
+def build_context(schemes: List[str] = PASSWORD_SCHEMES, bcrypt_rounds: int = BCRYPT_ROUNDS,
+                  argon2_time_cost: int = ARGON2_TIME_COST, argon2_memory_cost: int = ARGON2_MEMORY_COST,
+                  argon2_parallelism: int = ARGON2_PARALLELISM) -> CryptContext:
+    """
+    Contexte passlib de la politique. Un hash d'un autre schéma, ou dont le
+    coût diffère de la politique (dans un sens ou dans l'autre), est signalé
+    par `needs_update` et rehaché au login.
+    """
+    if "argon2" in schemes:
+        try:
+            import argon2  # noqa: F401
+        except ImportError as error:
+            raise RuntimeError("PASSWORD_SCHEMES=argon2 nécessite le paquet 'argon2-cffi'") from error
+    settings = {}
+    if "bcrypt" in schemes:
+        settings.update(bcrypt__rounds=bcrypt_rounds, bcrypt__min_rounds=bcrypt_rounds, bcrypt__max_rounds=bcrypt_rounds)
+    if "argon2" in schemes:
+        settings.update(
+            argon2__time_cost=argon2_time_cost,
+            argon2__memory_cost=argon2_memory_cost,
+            argon2__parallelism=argon2_parallelism,
+        )
+    return CryptContext(schemes=schemes, deprecated="auto", **settings)
+
+
+# Contexte unique de hachage partagé par toute l'application
+pwd_context = build_context()
+
+# Configuration du pool de hachage
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "thread")  # "thread" ou "process"
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", os.cpu_count() or 1))
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", 64))
+# Workers utilisables par l'ensemble des lots (hash_many), la moitié du pool par défaut :
+# le reste reste libre pour les logins
+HASH_BULK_WORKERS = int(os.getenv("HASH_BULK_WORKERS", 0)) or None
+
+
+# Fonctions de niveau module pour rester picklables avec un ProcessPoolExecutor
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return pwd_context.verify(password, hashed)
+
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed)
+
+
+class HashingPoolSaturated(HTTPException):
+    """Levée quand la file d'attente du pool de hachage est pleine."""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Serveur surchargé, veuillez réessayer plus tard.",
+            headers={"Retry-After": "1"},
+        )
+
+
+class PasswordHasher:
+    """
+    Exécute bcrypt hors de la boucle d'événements, dans un pool borné.
+    Au-delà de `workers + max_queue` opérations en cours, les appels sont
+    rejetés immédiatement (HTTP 429) au lieu de s'empiler. Les lots
+    (`hash_many`) se partagent au plus `bulk_workers` workers.
+    """
+
+    def __init__(self, kind: str = HASH_EXECUTOR, workers: int = HASH_WORKERS, max_queue: int = HASH_MAX_QUEUE,
+                 bulk_workers: Optional[int] = None):
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        bulk_workers = bulk_workers or HASH_BULK_WORKERS or self.workers // 2
+        # Toujours sous la taille du pool (sauf pool d'un seul worker)
+        self.bulk_workers = max(1, min(bulk_workers, self.workers - 1))
+        self._bulk_loop = None
+        self._bulk_slots: Optional[asyncio.Semaphore] = None
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+        self._run_max = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwd-hash")
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise HashingPoolSaturated()
+            self._in_flight += 1
+
+        submitted = time.perf_counter()
+        started = submitted
+        loop = asyncio.get_running_loop()
+
+        def timed():
+            nonlocal started
+            started = time.perf_counter()
+            return fn(*args)
+
+        try:
+            if self.kind == "process":
+                # Le temps d'attente n'est pas observable dans un autre processus
+                return await loop.run_in_executor(self._get_executor(), fn, *args)
+            return await loop.run_in_executor(self._get_executor(), timed)
+        finally:
+            finished = time.perf_counter()
+            operation = fn.__name__.lstrip("_")
+            password_hash_wait.observe(started - submitted, operation)
+            password_hash_duration.observe(finished - started, operation)
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+                self._wait_total += started - submitted
+                self._run_total += finished - started
+                self._run_max = max(self._run_max, finished - started)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit(_verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(valide, nouveau hash) : le nouveau hash n'est fourni que si `hashed` ne suit plus la politique."""
+        return await self._submit(_verify_and_update, password, hashed)
+
+    def _bulk_semaphore(self) -> asyncio.Semaphore:
+        # Quota commun à tous les lots en cours, recréé si la boucle d'événements change
+        loop = asyncio.get_running_loop()
+        if self._bulk_loop is not loop:
+            self._bulk_loop, self._bulk_slots = loop, asyncio.Semaphore(self.bulk_workers)
+        return self._bulk_slots
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        Hache un lot sans dépasser `bulk_workers` opérations simultanées,
+        tous lots confondus : les logins gardent des workers disponibles.
+        """
+        semaphore = self._bulk_semaphore()
+
+        async def one(password: str) -> str:
+            async with semaphore:
+                return await self.hash(password)
+
+        return await asyncio.gather(*(one(password) for password in passwords))
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "executor": self.kind,
+                "scheme": pwd_context.default_scheme(),
+                "workers": self.workers,
+                "bulk_workers": self.bulk_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.workers),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_total / completed * 1000, 3),
+                "avg_run_ms": round(self._run_total / completed * 1000, 3),
+                "max_run_ms": round(self._run_max * 1000, 3),
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Instance partagée
+hasher = PasswordHasher()
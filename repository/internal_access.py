@@ -0,0 +1,56 @@
+import hmac
+import ipaddress
+import os
+from typing import List, Union
+
+from fastapi import Depends, HTTPException, Request, status
+
+# Accès aux routes d'exploitation (/internal/*, /metrics) : jeton "Authorization: Bearer <jeton>"
+# ou adresse du pair direct dans la liste autorisée. Sans configuration, les routes sont fermées.
+INTERNAL_TOKEN = os.getenv("INTERNAL_TOKEN", "")
+# Adresses ou réseaux séparés par des virgules (ex. "10.0.0.0/8,192.168.1.5"). L'adresse testée est
+# celle du pair TCP : derrière un reverse proxy local, ne pas y mettre 127.0.0.1.
+INTERNAL_ALLOWED_IPS = os.getenv("INTERNAL_ALLOWED_IPS", "")
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_networks(value: str) -> List[Network]:
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in value.split(",") if part.strip()]
+
+
+class InternalAccess:
+    """Contrôle d'accès des routes d'exploitation, partagé par leurs routers."""
+
+    def __init__(self, token: str = INTERNAL_TOKEN, allowed_ips: str = INTERNAL_ALLOWED_IPS):
+        self.token = token
+        self.networks = parse_networks(allowed_ips)
+
+    def _token_ok(self, request: Request) -> bool:
+        scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+        return bool(self.token) and scheme.lower() == "bearer" and hmac.compare_digest(credentials.encode(), self.token.encode())
+
+    def _ip_ok(self, request: Request) -> bool:
+        if not self.networks or request.client is None:
+            return False
+        try:
+            address = ipaddress.ip_address(request.client.host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.networks)
+
+    def check(self, request: Request):
+        if not (self._token_ok(request) or self._ip_ok(request)):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès réservé à l'exploitation.")
+
+
+# Instance partagée
+internal_access = InternalAccess()
+
+
+def internal_only():
+    """Dépendance de router : /internal/* et /metrics."""
+    async def dependency(request: Request):
+        internal_access.check(request)
+
+    return Depends(dependency)
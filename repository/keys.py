@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from jose import jwk
+from jose.backends.base import Key
+
+from config import ALGORITHM, SECRET_KEY
+
+# Algorithme de signature des tokens d'accès : HS256 (secret partagé) ou RS256/ES256 (paire de clés)
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", ALGORITHM)
+# Répertoire des clés : "<kid>.pem" (privée, signe et vérifie) ou "<kid>.pub.pem" (publique, vérifie seulement)
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "keys")
+# Clé de signature imposée ; par défaut la clé privée la plus récente déjà activable
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")
+# Intervalle entre deux contrôles du répertoire (relu seulement si son mtime a changé)
+JWT_KEYS_RELOAD_INTERVAL = float(os.getenv("JWT_KEYS_RELOAD_INTERVAL", 30))
+# Durée de mise en cache du JWKS par les vérificateurs (Cache-Control de /.well-known/jwks.json)
+JWKS_MAX_AGE = int(os.getenv("JWKS_MAX_AGE", 300))
+# Une nouvelle clé n'est publiée que pendant ce délai avant de signer : chaque worker l'a
+# relue et chaque copie du JWKS en cache l'a reçue (défaut : max-age + intervalle de contrôle)
+JWT_KEY_ACTIVATION_DELAY = float(os.getenv("JWT_KEY_ACTIVATION_DELAY", JWKS_MAX_AGE + JWT_KEYS_RELOAD_INTERVAL))
+
+
+def select_active_kid(created: Dict[str, float], now: float, delay: float = JWT_KEY_ACTIVATION_DELAY,
+                      active_kid: Optional[str] = JWT_ACTIVE_KID) -> str:
+    """
+    Clé de signature parmi les clés privées (kid -> date de création) : la
+    plus récente publiée depuis au moins `delay` ; à défaut (premier
+    déploiement), la plus ancienne. JWT_ACTIVE_KID prime s'il existe.
+    """
+    if active_kid in created:
+        return active_kid
+    activable = [kid for kid, at in created.items() if at <= now - delay]
+    if activable:
+        return max(activable, key=created.get)
+    return min(created, key=created.get)
+
+
+class KeySet:
+    """
+    Jeu de clés de signature identifiées par `kid`, analysées une seule fois.
+    Rotation sans interruption, en deux temps : une nouvelle clé déposée dans
+    le répertoire est d'abord seulement publiée (JWKS, vérification), puis
+    signe une fois JWT_KEY_ACTIVATION_DELAY écoulé depuis sa création ; les
+    anciennes, gardées en ".pub.pem", vérifient encore les tokens en
+    circulation. Chaque worker contrôle le répertoire toutes les
+    JWT_KEYS_RELOAD_INTERVAL secondes et ne le relit que s'il a changé.
+    """
+
+    def __init__(self, algorithm: str = JWT_ALGORITHM, directory: str = JWT_KEYS_DIR, active_kid: Optional[str] = JWT_ACTIVE_KID):
+        self.algorithm = algorithm
+        self.directory = directory
+        self.active_kid = active_kid
+        self.symmetric = algorithm.startswith("HS")
+        self._lock = threading.Lock()
+        self._signing: Tuple[Optional[str], Optional[Key]] = (None, None)
+        self._verifying: Dict[Optional[str], Key] = {}
+        self._jwks = b'{"keys":[]}'
+        self._private: Dict[str, Key] = {}
+        self._created: Dict[str, float] = {}
+        self._directory_mtime = None
+        self._checked_at = 0.0
+        self.reload()
+
+    def _read_directory(self):
+        # Date de création d'une clé privée : mtime du fichier (à préserver lors d'une copie)
+        private, public, mtimes = {}, {}, {}
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".pem"):
+                continue
+            path = os.path.join(self.directory, name)
+            with open(path, encoding="utf-8") as f:
+                pem = f.read()
+            if name.endswith(".pub.pem"):
+                public[name[:-len(".pub.pem")]] = jwk.construct(pem, self.algorithm)
+            else:
+                kid = name[:-len(".pem")]
+                private[kid] = jwk.construct(pem, self.algorithm)
+                mtimes[kid] = os.path.getmtime(path)
+        return private, public, mtimes
+
+    def reload(self):
+        """(Re)charge les clés ; en HS*, une seule clé symétrique sans kid."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if self.symmetric:
+                key = jwk.construct(SECRET_KEY, self.algorithm)
+                self._signing, self._verifying = (None, key), {None: key}
+                return
+
+            directory_mtime = os.stat(self.directory).st_mtime
+            private, public, mtimes = self._read_directory()
+            if not private:
+                raise RuntimeError(f"Aucune clé privée {self.algorithm} dans {self.directory}")
+            verifying = {**public, **{kid: key.public_key() for kid, key in private.items()}}
+            self._private, self._created = private, mtimes
+            self._directory_mtime = directory_mtime
+            self._activate()
+            self._verifying = verifying
+            self._jwks = json.dumps({"keys": [
+                {**key.to_dict(), "kid": kid, "use": "sig", "alg": self.algorithm}
+                for kid, key in sorted(verifying.items())
+            ]}).encode()
+
+    def _activate(self):
+        active = select_active_kid(self._created, time.time(), active_kid=self.active_kid)
+        if active != self._signing[0]:
+            self._signing = (active, self._private[active])
+
+    def refresh(self):
+        """
+        Contrôle périodique, au plus une fois par JWT_KEYS_RELOAD_INTERVAL :
+        relecture si le mtime du répertoire a changé (clé ajoutée, retirée),
+        sinon simple réévaluation de la clé active (fin du délai d'activation).
+        """
+        if self.symmetric or time.monotonic() - self._checked_at < JWT_KEYS_RELOAD_INTERVAL:
+            return
+        try:
+            if os.stat(self.directory).st_mtime != self._directory_mtime:
+                self.reload()
+                return
+            with self._lock:
+                self._checked_at = time.monotonic()
+                self._activate()
+        except Exception as error:
+            # On garde le jeu de clés courant
+            self._checked_at = time.monotonic()
+            print(f"Erreur de rechargement des clés JWT: {error}")
+
+    def signing_key(self) -> Tuple[Optional[str], Key]:
+        self.refresh()
+        return self._signing
+
+    def verification_key(self, kid: Optional[str]) -> Optional[Key]:
+        self.refresh()
+        return self._verifying.get(kid)
+
+    def jwks(self) -> bytes:
+        """Clés publiques au format JWKS (RFC 7517), sérialisées une fois par chargement."""
+        self.refresh()
+        return self._jwks
+
+
+# Instance partagée
+key_set = KeySet()
@@ -0,0 +1,273 @@
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+# Désactive le middleware et les hooks SQLAlchemy (les métriques restent à zéro)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Bornes (en secondes) des histogrammes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+HASH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 1.0, 2.5)
+JWT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01)
+# Nombre de requêtes SQL par requête HTTP
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Requêtes ne correspondant à aucune route : un seul label, pour borner la cardinalité
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """
+    Métrique au format texte Prometheus (0.0.4), une série par combinaison
+    de valeurs de labels, passées dans l'ordre de `labelnames`.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _labels(self, key: Tuple[str, ...], extra: Optional[str] = None) -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra is not None:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def collect(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{self._labels(key)} {_format(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # [compteurs par borne (non cumulés) + +Inf, somme, nombre]
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            else:
+                series[0][-1] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % _format(bound)
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> bytes:
+        return ("\n".join(line for metric in self._metrics for line in metric.collect()) + "\n").encode()
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+
+# Registre partagé (par processus : avec plusieurs workers, chaque worker est une cible distincte)
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "Requêtes HTTP traitées, par route et statut.", ("method", "route", "status")))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Durée des requêtes HTTP jusqu'au dernier octet envoyé.", ("method", "route")))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requêtes HTTP en cours de traitement.", ("method",)))
+api_errors = registry.register(Counter(
+    "api_errors_total", "Réponses en erreur selon le code de l'enveloppe (4xx/5xx), même servies en HTTP 200.",
+    ("method", "route", "code")))
+http_request_db_queries = registry.register(Histogram(
+    "http_request_db_queries", "Requêtes SQL exécutées par requête HTTP.", ("method", "route"), QUERY_COUNT_BUCKETS))
+http_request_db_duration = registry.register(Histogram(
+    "http_request_db_duration_seconds", "Temps passé en base par requête HTTP.", ("method", "route")))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "Durée d'exécution des requêtes SQL.", (), QUERY_BUCKETS))
+db_query_errors = registry.register(Counter(
+    "db_query_errors_total", "Requêtes SQL en erreur."))
+password_hash_duration = registry.register(Histogram(
+    "password_hash_duration_seconds", "Durée de calcul des hachages / vérifications de mot de passe.",
+    ("operation",), HASH_BUCKETS))
+password_hash_wait = registry.register(Histogram(
+    "password_hash_wait_seconds", "Attente dans la file du pool de hachage.", ("operation",)))
+jwt_verify_duration = registry.register(Histogram(
+    "jwt_verify_duration_seconds", "Durée de vérification des tokens d'accès.", ("cache", "result"), JWT_BUCKETS))
+# Jauges relevées au moment de la collecte (routes/metrics.py)
+db_pool_connections = registry.register(Gauge(
+    "db_pool_connections", "Connexions du pool, par état.", ("state",)))
+password_hash_queue = registry.register(Gauge(
+    "password_hash_queue", "Opérations du pool de hachage, par état.", ("state",)))
+
+
+class RequestMetrics:
+    """Compteurs de la requête HTTP en cours, alimentés par les hooks SQLAlchemy et EnvelopeResponse."""
+
+    __slots__ = ("queries", "db_time", "code")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.code: Optional[str] = None
+
+
+# Propagé au threadpool (run_in_threadpool copie le contexte) et à AsyncSession.run_sync
+_current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request_metrics", default=None)
+
+
+def record_envelope_code(code: str):
+    current = _current_request.get()
+    if current is not None:
+        current.code = code
+
+
+def instrument_engine(engine):
+    """Hooks de temps d'exécution sur un moteur synchrone (`async_engine.sync_engine` en mode async)."""
+    if not METRICS_ENABLED:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        db_query_duration.observe(elapsed)
+        current = _current_request.get()
+        if current is not None:
+            current.queries += 1
+            current.db_time += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("metrics_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+        db_query_errors.inc()
+
+
+def route_template(scope) -> str:
+    """
+    Gabarit de la route ("/api/posts/{id}") plutôt que le chemin, pour que
+    chaque route ne produise qu'une série. Renseigné par FastAPI dans le
+    scope au routage : rien à résoudre une seconde fois.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI : nombre et durée des requêtes par route, et pour
+    chaque requête le nombre de requêtes SQL et le temps passé en base.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        current = RequestMetrics()
+        token = _current_request.set(current)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        # La route n'est connue qu'après le routage : les requêtes en cours sont comptées par méthode
+        http_requests_in_flight.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_request.reset(token)
+            route = route_template(scope)
+            http_requests_in_flight.dec(method)
+            http_requests.inc(method, route, str(status_code))
+            http_request_duration.observe(elapsed, method, route)
+            http_request_db_queries.observe(current.queries, method, route)
+            http_request_db_duration.observe(current.db_time, method, route)
+            if current.code is not None and current.code[:1] in ("4", "5"):
+                api_errors.inc(method, route, current.code)
@@ -0,0 +1,127 @@
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+from config import SECRET_KEY
+
+# Taille de page par défaut et maximale
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Tris autorisés : nom public -> (colonne, décroissant) ; l'id départage les égalités
+SORT_KEYS = {
+    "-created_at": ("created_at", True),
+    "created_at": ("created_at", False),
+    "-updated_at": ("updated_at", True),
+    "updated_at": ("updated_at", False),
+}
+DEFAULT_SORT = "-created_at"
+SORT_PATTERN = "^(" + "|".join(SORT_KEYS) + ")$"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def utc_naive(value: datetime) -> datetime:
+    """Les dates sont stockées en UTC naïf (datetime.utcnow) : même forme pour les filtres."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(SECRET_KEY.encode(), payload, hashlib.sha256).digest()[:16]
+
+
+def _encode_payload(values: list) -> str:
+    payload = json.dumps(values, separators=(",", ":")).encode()
+    return f"{_b64encode(payload)}.{_b64encode(_sign(payload))}"
+
+
+def _decode_payload(token: str) -> list:
+    raw_payload, raw_signature = token.split(".", 1)
+    payload = _b64decode(raw_payload)
+    if not hmac.compare_digest(_b64decode(raw_signature), _sign(payload)):
+        raise InvalidCursor("Signature du curseur invalide")
+    return json.loads(payload)
+
+
+def encode_cursor(value: datetime, id: int, sort: str = DEFAULT_SORT) -> str:
+    """
+    Curseur opaque et signé pointant sur la position (valeur de tri, id).
+    Le tri n'est inscrit que s'il diffère du tri par défaut (anciens curseurs inchangés).
+    """
+    return _encode_payload([value.isoformat(), id] + ([sort] if sort != DEFAULT_SORT else []))
+
+
+def decode_cursor(token: str, sort: str = DEFAULT_SORT) -> Tuple[datetime, int]:
+    try:
+        value, id, *rest = _decode_payload(token)
+        position = datetime.fromisoformat(value), int(id)
+    except InvalidCursor:
+        raise
+    except Exception as error:
+        raise InvalidCursor("Curseur invalide") from error
+    if (rest[0] if rest else DEFAULT_SORT) != sort:
+        raise InvalidCursor("Curseur d'un autre tri")
+    return position
+
+
+def _query_digest(query: str) -> str:
+    return _b64encode(hashlib.sha256(query.encode()).digest()[:8])
+
+
+def encode_rank_cursor(query: str, score: float, id: int) -> str:
+    """Curseur d'une recherche classée : position (score, id), liée au texte recherché."""
+    return _encode_payload([_query_digest(query), score, id])
+
+
+def decode_rank_cursor(token: str, query: str) -> Tuple[float, int]:
+    try:
+        digest, score, id = _decode_payload(token)
+    except InvalidCursor:
+        raise
+    except Exception as error:
+        raise InvalidCursor("Curseur invalide") from error
+    if digest != _query_digest(query):
+        raise InvalidCursor("Curseur d'une autre recherche")
+    return float(score), int(id)
+
+
+def paginate(query, model, limit: int, cursor: Optional[str] = None, sort: str = DEFAULT_SORT):
+    """
+    Pagination par curseur (keyset) sur (colonne de tri, id), par défaut du
+    plus récent au plus ancien. `sort` doit être une clé de SORT_KEYS.
+    Retourne (lignes, curseur suivant ou None).
+    """
+    name, descending = SORT_KEYS[sort]
+    column = getattr(model, name)
+    if cursor:
+        value, id = decode_cursor(cursor, sort)
+        if descending:
+            query = query.filter(or_(column < value, and_(column == value, model.id < id)))
+        else:
+            query = query.filter(or_(column > value, and_(column == value, model.id > id)))
+
+    order = (column.desc(), model.id.desc()) if descending else (column.asc(), model.id.asc())
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, name), last.id, sort)
@@ -0,0 +1,99 @@
+import threading
+import time
+from typing import List, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Bornes (en ms) de l'histogramme des temps d'attente au checkout
+CHECKOUT_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class PoolStats:
+    """Compteurs partagés des pools de connexions instrumentés."""
+
+    def __init__(self, buckets: List[float] = CHECKOUT_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.bucket_counts = [0] * (len(self.buckets) + 1)
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def observe_wait(self, seconds: float):
+        ms = seconds * 1000
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            for i, bound in enumerate(self.buckets):
+                if ms <= bound:
+                    self.bucket_counts[i] += 1
+                    break
+            else:
+                self.bucket_counts[-1] += 1
+
+    def observe_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool=None) -> dict:
+        with self._lock:
+            data = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.wait_total / (self.checkouts or 1) * 1000, 3),
+                "max_wait_ms": round(self.wait_max * 1000, 3),
+                "wait_histogram_ms": {
+                    **{f"le_{b}": c for b, c in zip(self.buckets, self.bucket_counts)},
+                    "le_inf": self.bucket_counts[-1],
+                },
+            }
+        if pool is not None:
+            data.update(pool_gauges(pool))
+        return data
+
+
+def pool_gauges(pool) -> dict:
+    # Les pools non dimensionnés (SingletonThreadPool, NullPool...) n'exposent pas ces compteurs
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "in_use": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+
+pool_stats = PoolStats()
+
+
+class _InstrumentedMixin:
+    """Mesure le temps d'attente de chaque checkout et compte les timeouts."""
+
+    stats: Optional[PoolStats] = pool_stats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.observe_timeout()
+            raise
+        self.stats.observe_wait(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedMixin, AsyncAdaptedQueuePool):
+    pass
@@ -1,12 +1,32 @@
-import json
-from typing import TypeVar, Generic, Optional, Type
-from sqlalchemy.orm import Session
+import html
+import re
+from typing import TypeVar, Generic, List, Optional, Tuple, Type
+from sqlalchemy.orm import Session, joinedload, load_only
 from datetime import datetime, timedelta
-from models.models import Post, Users
-from sqlalchemy import func
+from models.models import Post, Users, adjust_post_count, adjust_post_counts
+from repository.bulk import BulkReport, group_by_columns, reject_duplicates
+from repository.pagination import DEFAULT_SORT, decode_rank_cursor, encode_rank_cursor, paginate, utc_naive
+from repository.cache import cached, cache_key, invalidate
+from repository.statements import column_values, dialect_insert, update_returning
+from schemas.posts import PostOut, UserBase
+from sqlalchemy import Float, and_, bindparam, cast, column, delete, func, literal_column, or_, select, table, update
+from sqlalchemy.exc import IntegrityError
 
 T = TypeVar('T')
 
+# Clés de cache invalidées par les écritures sur les posts
+COUNT_BY_USER_KEY = cache_key("posts-count-by-user", "all")
+
+def post_cache_key(id: int) -> str:
+  return cache_key("post", id)
+
+# Colonnes lues par PostOut : posts et auteurs en une seule requête (JOIN)
+def post_out_options(model=Post):
+  return (
+    load_only(model.id, model.title, model.content, model.created_at, model.updated_at),
+    joinedload(model.users).load_only(Users.id, Users.username, Users.email),
+  )
+
 # users
 class BaseRepo():
   @staticmethod
@@ -21,58 +41,183 @@ class PostsRepo(BaseRepo):
   def find_by_title(db: Session, title: str):
     return db.query(Post).filter(Post.title == title).first()
 
+  # INSERT ... ON CONFLICT (title) DO NOTHING RETURNING id : None si le titre existe déjà
+  @staticmethod
+  def create(db: Session, title: str, content: str, users_id: int) -> Optional[int]:
+    """
+    None si le titre existe déjà ; IntegrityError (transaction annulée) si
+    l'auteur n'existe pas (clé étrangère, hors SQLite sans foreign_keys).
+    """
+    try:
+      post_id = db.execute(
+        dialect_insert(db, Post)
+        .values(title=title, content=content, users_id=users_id)
+        .on_conflict_do_nothing(index_elements=[Post.title])
+        .returning(Post.id)
+      ).scalar_one_or_none()
+    except IntegrityError:
+      db.rollback()
+      raise
+    if post_id is not None:
+      adjust_post_count(db, users_id, 1)
+    db.commit()
+    if post_id is not None:
+      invalidate(COUNT_BY_USER_KEY)
+    return post_id
+
 # get all users sauf password
 class AllPostsRepo(BaseRepo):
     @staticmethod
     def get_all(db: Session, model: Generic[T]):
-        return db.query(model).filter(model.id == model.id).all()
+        return db.query(model).options(*post_out_options(model)).all()
+
+    @staticmethod
+    def get_page(
+        db: Session, model: Generic[T], limit: int, cursor: Optional[str] = None,
+        users_id: Optional[int] = None, created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None, updated_since: Optional[datetime] = None,
+        sort: str = DEFAULT_SORT,
+    ):
+        """
+        Page filtrée par auteur et par dates. Index couvrants : (users_id,
+        created_at, id) pour le fil d'un auteur, (updated_at, id) pour la
+        synchronisation incrémentale (updated_since + tri "updated_at").
+        """
+        query = db.query(model).options(*post_out_options(model)).filter(
+            *AllPostsRepo.filters(model, users_id, created_after, created_before, updated_since)
+        )
+        return paginate(query, model, limit, cursor, sort)
+
+    @staticmethod
+    def filters(model, users_id=None, created_after=None, created_before=None, updated_since=None) -> list:
+        criteria = []
+        if users_id is not None:
+            criteria.append(model.users_id == users_id)
+        if created_after is not None:
+            criteria.append(model.created_at >= utc_naive(created_after))
+        if created_before is not None:
+            criteria.append(model.created_at < utc_naive(created_before))
+        if updated_since is not None:
+            criteria.append(model.updated_at >= utc_naive(updated_since))
+        return criteria
     
 # get one post
 class GetOnePostRepo(BaseRepo):
   @staticmethod
+  @cached("post", key=lambda model, id: id, serialize=lambda post: PostOut.model_validate(post).model_dump(mode="json"))
   def get_one_post(db: Session, model: Generic[T], id: int):
-    return db.query(model).filter(model.id == id).first()
+    return db.query(model).options(*post_out_options(model)).filter(model.id == id).first()
   
 
+# Requête d'export en flux (voir repository.export)
+class ExportPostsRepo:
+    @staticmethod
+    def export_query():
+        return select(Post).options(*post_out_options()).order_by(Post.id)
+
+
 class CountPostByUser:
     @staticmethod
+    @cached(
+        "posts-count-by-user",
+        key=lambda: "all",
+        serialize=lambda rows: [
+            {"users": UserBase.model_validate(row["users"]).model_dump(mode="json"), "total_posts": row["total_posts"]}
+            for row in rows
+        ],
+    )
     def get_post_count_by_user(db: Session):
-        results = (
-            db.query(Users, func.count(Post.id).label("total_posts"))
-            .join(Post, Users.id == Post.users_id)
-            .group_by(Users.id)
+        # Compteur dénormalisé (Users.post_count) : parcours de l'index partiel couvrant
+        # ix_users_with_posts, sans agrégat sur posts. Constante littérale : un paramètre
+        # lié ne correspond pas au prédicat de l'index partiel.
+        users = (
+            db.query(Users)
+            .options(load_only(Users.id, Users.username, Users.email, Users.post_count))
+            .filter(Users.post_count > literal_column("0"))
+            .order_by(Users.id)
             .all()
         )
 
         # On formate le résultat pour correspondre au schéma Pydantic
         return [
-            {"users": user, "total_posts": total_posts}
-            for user, total_posts in results
+            {"users": user, "total_posts": user.post_count}
+            for user in users
         ]
-        
-  
+
+
+# Reconstruction et vérification des compteurs Users.post_count
+class PostCounterRepo:
+    @staticmethod
+    def _actual_counts():
+        return (
+            select(Post.users_id, func.count(Post.id).label("total"))
+            .group_by(Post.users_id)
+            .subquery()
+        )
+
+    @staticmethod
+    def check(db: Session):
+        """Utilisateurs dont le compteur diffère du nombre réel de posts."""
+        actual = PostCounterRepo._actual_counts()
+        real = func.coalesce(actual.c.total, 0)
+        rows = db.execute(
+            select(Users.id, Users.post_count, real.label("actual"))
+            .outerjoin(actual, actual.c.users_id == Users.id)
+            .where(Users.post_count != real)
+            .order_by(Users.id)
+        ).all()
+        return [{"users_id": r.id, "post_count": r.post_count, "actual": r.actual} for r in rows]
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """Recalcule tous les compteurs ; retourne le nombre de lignes corrigées."""
+        actual = (
+            select(func.count(Post.id))
+            .where(Post.users_id == Users.id)
+            .correlate(Users)
+            .scalar_subquery()
+        )
+        result = db.execute(
+            update(Users)
+            .where(Users.post_count != actual)
+            .values(post_count=actual, updated_at=Users.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        invalidate(COUNT_BY_USER_KEY)
+        return result.rowcount
+
+
 class UpdatePost(BaseRepo):
     @staticmethod
     def update_post(db: Session, model: Generic[T], id: int, update_data: dict):
-        post = db.query(model).filter(model.id == id).first()
-        if not post:
-            return None
+        """
+        UPDATE ... RETURNING avec l'auteur avant modification, pour tenir
+        Users.post_count à jour en cas de réassignation.
+        Retourne les colonnes du post (dict) ou None s'il n'existe pas ;
+        IntegrityError (transaction annulée) si le titre est déjà pris ou
+        si le nouvel auteur n'existe pas.
+        """
+        table = model.__table__
+        values = column_values(model, update_data)
+        if not values:
+            row = db.execute(select(table).where(table.c.id == id)).mappings().first()
+            return dict(row) if row else None
 
-        for key, value in update_data.items():
-            if not hasattr(post, key):
-                continue
-            # Convert dict/list to JSON string to avoid psycopg2 adaptation error
-            if isinstance(value, (dict, list, tuple)):
-                try:
-                    setattr(post, key, json.dumps(value))
-                except Exception:
-                    # skip problematic fields (or handle as needed)
-                    continue
-            else:
-                setattr(post, key, value)
+        try:
+            row = update_returning(db, table, id, values, ["users_id"], table.c)
+        except IntegrityError:
+            db.rollback()
+            raise
+        if not row:
+            return None
 
+        post = {key: row[key] for key in table.c.keys()}
+        if row["old_users_id"] != post["users_id"]:
+            adjust_post_count(db, row["old_users_id"], -1)
+            adjust_post_count(db, post["users_id"], 1)
         db.commit()
-        db.refresh(post)
+        invalidate(post_cache_key(id), COUNT_BY_USER_KEY)
 
         return post
     
@@ -80,11 +225,237 @@ class UpdatePost(BaseRepo):
 class DeletePost:
     @staticmethod
     def delete_post(db: Session, post_id: int):
-        # On filtre par id
-        post = db.query(Post).filter(Post.id == post_id).first()
-        if not post:
-            return None  # Utilisateur non trouvé
-        db.delete(post)   # Supprime du post
+        # DELETE ... RETURNING : l'auteur est connu sans SELECT préalable
+        users_id = db.execute(
+            delete(Post).where(Post.id == post_id).returning(Post.users_id)
+        ).scalar_one_or_none()
+        if users_id is None:
+            return None  # Post non trouvé
+        adjust_post_count(db, users_id, -1)
         db.commit()       # Applique post
+        invalidate(post_cache_key(post_id), COUNT_BY_USER_KEY)
         return True
-    
\ No newline at end of file
+
+
+# Recherche plein texte (index créés par la migration, voir models.models.SEARCH_DDL)
+SEARCH_CONFIG = "simple"
+HIGHLIGHT_START, HIGHLIGHT_END = "<mark>", "</mark>"
+# Bornes posées par la base (caractères à usage privé), remplacées par les balises après échappement
+MATCH_START, MATCH_END = "\ue000", "\ue001"
+# Nombre de mots du contexte autour des correspondances dans le contenu
+SNIPPET_WORDS = 24
+
+posts_fts = table("posts_fts", column("rowid"))
+
+
+def highlighted_html(value: str) -> str:
+    """
+    Extrait surligné sûr à insérer en HTML : le texte saisi par l'auteur est
+    échappé, seules les bornes de correspondance deviennent <mark>…</mark>.
+    """
+    return html.escape(value).replace(MATCH_START, HIGHLIGHT_START).replace(MATCH_END, HIGHLIGHT_END)
+
+
+def fts5_query(text: str) -> Optional[str]:
+    """
+    Requête FTS5 sûre : chaque mot est cité (ET implicite), la syntaxe
+    MATCH de l'utilisateur n'est jamais interprétée. None si aucun mot.
+    """
+    terms = re.findall(r"\w+", text)
+    return " ".join(f'"{term}"' for term in terms) or None
+
+
+class SearchPostsRepo:
+    """
+    Recherche classée par pertinence, pagination par curseur sur (score, id).
+    Deux requêtes logiques en une : la page (ids et scores) est calculée
+    sur l'index seul, puis seuls ses posts sont lus avec auteur et extraits
+    surlignés, le surlignage étant le coût dominant.
+    """
+
+    @staticmethod
+    def search(db: Session, text: str, limit: int, cursor: Optional[str] = None):
+        if db.get_bind().dialect.name == "postgresql":
+            return SearchPostsRepo._search_postgresql(db, text, limit, cursor)
+        return SearchPostsRepo._search_sqlite(db, text, limit, cursor)
+
+    @staticmethod
+    def _page(page_query, score, id, text: str, limit: int, cursor: Optional[str]):
+        if cursor:
+            last_score, last_id = decode_rank_cursor(cursor, text)
+            page_query = page_query.where(or_(score < last_score, and_(score == last_score, id < last_id)))
+        return page_query.order_by(score.desc(), id.desc()).limit(limit + 1).subquery()
+
+    @staticmethod
+    def _hits(db: Session, statement, text: str, limit: int):
+        rows = db.execute(statement.options(*post_out_options())).all()
+        hits = [
+            {"post": post, "rank": score, "title": highlighted_html(title), "snippet": highlighted_html(snippet)}
+            for post, score, title, snippet in rows
+        ]
+        if len(hits) <= limit:
+            return hits, None
+        hits = hits[:limit]
+        last = hits[-1]
+        return hits, encode_rank_cursor(text, last["rank"], last["post"].id)
+
+    @staticmethod
+    def _search_postgresql(db: Session, text: str, limit: int, cursor: Optional[str]):
+        regconfig = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+        query = func.websearch_to_tsquery(regconfig, text)
+        vector = literal_column("posts.search_vector")
+        # Double précision : le score du curseur se compare sans perte
+        score = cast(func.ts_rank_cd(vector, query), Float(precision=53))
+        page = SearchPostsRepo._page(
+            select(Post.id, score.label("score")).where(vector.op("@@")(query)), score, Post.id, text, limit, cursor
+        )
+        options = f'StartSel="{MATCH_START}", StopSel="{MATCH_END}"'
+        statement = (
+            select(
+                Post,
+                page.c.score,
+                func.ts_headline(regconfig, Post.title, query, options + ", HighlightAll=true"),
+                func.ts_headline(regconfig, Post.content, query, options + f", MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}"),
+            )
+            .join(page, page.c.id == Post.id)
+            .order_by(page.c.score.desc(), Post.id.desc())
+        )
+        return SearchPostsRepo._hits(db, statement, text, limit)
+
+    @staticmethod
+    def _search_sqlite(db: Session, text: str, limit: int, cursor: Optional[str]):
+        match = fts5_query(text)
+        if match is None:
+            return [], None
+        fts = literal_column("posts_fts")
+        # bm25 : plus petit = plus pertinent ; le titre pèse 10 fois le contenu
+        score = -func.bm25(fts, 10.0, 1.0)
+        page = SearchPostsRepo._page(
+            select(posts_fts.c.rowid.label("id"), score.label("score")).where(fts.op("MATCH")(match)),
+            score, posts_fts.c.rowid, text, limit, cursor,
+        )
+        # highlight()/snippet() exigent le curseur FTS : seconde correspondance restreinte aux ids de la page
+        statement = (
+            select(
+                Post,
+                page.c.score,
+                func.highlight(fts, 0, MATCH_START, MATCH_END),
+                func.snippet(fts, 1, MATCH_START, MATCH_END, "…", SNIPPET_WORDS),
+            )
+            .join(page, page.c.id == Post.id)
+            .join(posts_fts, posts_fts.c.rowid == Post.id)
+            .where(fts.op("MATCH")(match))
+            .order_by(page.c.score.desc(), Post.id.desc())
+        )
+        return SearchPostsRepo._hits(db, statement, text, limit)
+
+
+# Écritures en lot : une transaction, des requêtes multi-lignes et un rapport par élément
+class BulkPostsRepo:
+    @staticmethod
+    def _missing_users(db: Session, items) -> set:
+        wanted = {data["users_id"] for _, data in items if data.get("users_id") is not None}
+        if not wanted:
+            return set()
+        return wanted - set(db.execute(select(Users.id).where(Users.id.in_(wanted))).scalars())
+
+    @staticmethod
+    def create_many(db: Session, items: List[Tuple[int, dict]], report: BulkReport):
+        """
+        INSERT multi-lignes ON CONFLICT (title) DO NOTHING RETURNING id, title :
+        les titres absents du RETURNING existaient déjà.
+        """
+        items = reject_duplicates(items, ["title"], report, "Titre en double dans le lot")
+        missing = BulkPostsRepo._missing_users(db, items)
+        rows = []
+        for index, data in items:
+            if data["users_id"] in missing:
+                report.fail(index, "Utilisateur non trouvé")
+            else:
+                rows.append((index, data))
+        if not rows:
+            return
+
+        table = Post.__table__
+        created = dict(db.execute(
+            dialect_insert(db, table)
+            .on_conflict_do_nothing(index_elements=[table.c.title])
+            .returning(table.c.title, table.c.id),
+            [column_values(Post, data) for _, data in rows],
+        ).all())
+
+        deltas = {}
+        for index, data in rows:
+            post_id = created.get(data["title"])
+            if post_id is None:
+                report.fail(index, "Cet post existe déjà")
+                continue
+            report.ok(index, post_id)
+            deltas[data["users_id"]] = deltas.get(data["users_id"], 0) + 1
+        adjust_post_counts(db, deltas)
+        db.commit()
+        if deltas:
+            invalidate(COUNT_BY_USER_KEY)
+
+    @staticmethod
+    def update_many(db: Session, items: List[Tuple[int, dict]], report: BulkReport):
+        """
+        Un SELECT pour l'existence et les auteurs actuels, un pour les titres
+        déjà pris, puis un UPDATE executemany par jeu de colonnes modifiées.
+        """
+        items = reject_duplicates(items, ["id"], report, "Post en double dans le lot")
+        items = reject_duplicates(items, ["title"], report, "Titre en double dans le lot")
+        table = Post.__table__
+        ids = [data["id"] for _, data in items]
+        authors = dict(db.execute(select(table.c.id, table.c.users_id).where(table.c.id.in_(ids))).all()) if ids else {}
+        titles = [data["title"] for _, data in items if data.get("title")]
+        taken = dict(db.execute(select(table.c.title, table.c.id).where(table.c.title.in_(titles))).all()) if titles else {}
+        missing = BulkPostsRepo._missing_users(db, items)
+
+        rows, deltas = [], {}
+        for index, data in items:
+            post_id = data["id"]
+            values = column_values(Post, {k: v for k, v in data.items() if k != "id" and v is not None})
+            if post_id not in authors:
+                report.fail(index, "Post non trouvé")
+            elif taken.get(values.get("title"), post_id) != post_id:
+                report.fail(index, "Cet post existe déjà")
+            elif values.get("users_id") in missing:
+                report.fail(index, "Utilisateur non trouvé")
+            else:
+                report.ok(index, post_id)
+                if values:
+                    rows.append({"_id": post_id, **values})
+                new_author = values.get("users_id", authors[post_id])
+                if new_author != authors[post_id]:
+                    deltas[authors[post_id]] = deltas.get(authors[post_id], 0) - 1
+                    deltas[new_author] = deltas.get(new_author, 0) + 1
+
+        for group in group_by_columns(rows).values():
+            db.execute(update(table).where(table.c.id == bindparam("_id")), group)
+        adjust_post_counts(db, deltas)
+        db.commit()
+        invalidate(*(post_cache_key(row["_id"]) for row in rows), COUNT_BY_USER_KEY)
+
+    @staticmethod
+    def delete_many(db: Session, items: List[Tuple[int, int]], report: BulkReport):
+        # Un seul DELETE ... WHERE id IN (...) RETURNING id, users_id
+        ids = {post_id for _, post_id in items}
+        deleted = dict(db.execute(
+            delete(Post).where(Post.id.in_(ids)).returning(Post.id, Post.users_id)
+        ).all()) if ids else {}
+
+        seen, deltas = set(), {}
+        for index, post_id in items:
+            if post_id in seen:
+                report.fail(index, "Post en double dans le lot")
+            elif post_id not in deleted:
+                report.fail(index, "Post non trouvé")
+            else:
+                report.ok(index, post_id)
+            seen.add(post_id)
+        for users_id in deleted.values():
+            deltas[users_id] = deltas.get(users_id, 0) - 1
+        adjust_post_counts(db, deltas)
+        db.commit()
+        invalidate(*(post_cache_key(post_id) for post_id in deleted), COUNT_BY_USER_KEY)
@@ -0,0 +1,187 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+
+from repository.cache import CACHE_PREFIX, CACHE_URL
+
+# Backend des compteurs : "memory" (par processus) ou "redis" (partagé entre workers)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL", CACHE_URL)
+RATE_LIMIT_PREFIX = os.getenv("RATE_LIMIT_PREFIX", CACHE_PREFIX + "ratelimit:")
+# Limites "tentatives/secondes", par adresse IP et par identifiant visé (username ou email)
+RATE_LIMIT_IP = os.getenv("RATE_LIMIT_IP", "30/60")
+RATE_LIMIT_IDENTITY = os.getenv("RATE_LIMIT_IDENTITY", "5/60")
+# Derrière un reverse proxy : l'IP cliente est le premier élément de X-Forwarded-For
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+
+
+def parse_limit(value: str) -> Tuple[int, float]:
+    """"5/60" -> (5, 60.0)"""
+    limit, window = value.split("/")
+    return int(limit), float(window)
+
+
+class RateLimitExceeded(HTTPException):
+    """Levée avant toute vérification de mot de passe quand une limite est atteinte."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Trop de tentatives, veuillez réessayer plus tard.",
+            headers={"Retry-After": str(max(1, int(math.ceil(retry_after))))},
+        )
+
+
+class RateLimitBackend:
+    """
+    Fenêtre glissante approchée : deux compteurs de fenêtre fixe (courante
+    et précédente), la précédente pondérée par sa part encore couverte.
+    Mémoire constante par clé, un seul aller-retour côté Redis.
+    """
+
+    def hit(self, key: str, window: float, now: float) -> Tuple[int, int]:
+        """Compte une tentative ; retourne (compteur précédent, compteur courant)."""
+        raise NotImplementedError
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """
+    Compteurs en mémoire, rangés par dernière tentative (la plus ancienne en
+    tête). Au-delà de `max_keys`, les clés sans activité depuis deux fenêtres
+    sont retirées par la tête : coût amorti constant par tentative.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # clé -> (index de fenêtre, compteur courant, compteur précédent, fenêtre)
+        self._counters: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, window, now):
+        index = int(now // window)
+        with self._lock:
+            current_index, current, previous, _ = self._counters.get(key, (index, 0, 0, window))
+            if current_index != index:
+                previous = current if current_index == index - 1 else 0
+                current = 0
+            current += 1
+            self._counters[key] = (index, current, previous, window)
+            self._counters.move_to_end(key)
+            if len(self._counters) > self.max_keys:
+                self._purge(now)
+            return previous, current
+
+    def _purge(self, now: float):
+        # S'arrête à la première clé encore active : les suivantes sont plus récentes
+        while self._counters:
+            key, (index, _, _, window) = next(iter(self._counters.items()))
+            if int(now // window) - index < 2:
+                break
+            del self._counters[key]
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """`client` permet d'injecter un client compatible (ex. fakeredis en local)."""
+
+    def __init__(self, url: str = RATE_LIMIT_URL, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as error:
+                raise RuntimeError("RATE_LIMIT_BACKEND=redis nécessite le paquet 'redis'") from error
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+
+    def hit(self, key, window, now):
+        index = int(now // window)
+        current_key = f"{key}:{index}"
+        pipe = self.client.pipeline()
+        pipe.get(f"{key}:{index - 1}")
+        pipe.incr(current_key)
+        pipe.expire(current_key, int(math.ceil(window * 2)))
+        previous, current, _ = pipe.execute()
+        return int(previous or 0), int(current)
+
+
+class RateLimiter:
+    """
+    Limiteur des routes qui vérifient un mot de passe : une tentative est
+    comptée par IP et par identifiant visé, et rejetée (429) dès qu'une des
+    deux limites est dépassée, sans consommer de bcrypt.
+    """
+
+    def __init__(self, backend: RateLimitBackend, ip_limit: str = RATE_LIMIT_IP, identity_limit: str = RATE_LIMIT_IDENTITY):
+        self.backend = backend
+        self.ip_limit = parse_limit(ip_limit)
+        self.identity_limit = parse_limit(identity_limit)
+        self._lock = threading.Lock()
+        self._allowed = 0
+        self._rejected = {"ip": 0, "identity": 0}
+
+    def _check(self, scope: str, key: str, limit: Tuple[int, float], now: float):
+        maximum, window = limit
+        previous, current = self.backend.hit(f"{RATE_LIMIT_PREFIX}{scope}:{key}", window, now)
+        elapsed = now % window
+        if previous * (1 - elapsed / window) + current > maximum:
+            with self._lock:
+                self._rejected[scope] += 1
+            raise RateLimitExceeded(window - elapsed)
+
+    def check(self, route: str, ip: Optional[str], identity: Optional[str]):
+        now = time.time()
+        if ip:
+            self._check("ip", f"{route}:{ip}", self.ip_limit, now)
+        if identity:
+            self._check("identity", f"{route}:{identity.lower()}", self.identity_limit, now)
+        with self._lock:
+            self._allowed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": RATE_LIMIT_BACKEND,
+                "ip_limit": RATE_LIMIT_IP,
+                "identity_limit": RATE_LIMIT_IDENTITY,
+                "allowed": self._allowed,
+                "rejected_ip": self._rejected["ip"],
+                "rejected_identity": self._rejected["identity"],
+            }
+
+
+def build_rate_limit_backend(kind: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    if kind == "redis":
+        return RedisRateLimitBackend()
+    return LocalRateLimitBackend()
+
+
+# Instance partagée
+login_limiter = RateLimiter(build_rate_limit_backend())
+
+
+def client_ip(request: Request) -> Optional[str]:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
+def rate_limited(identity_field: str):
+    """
+    Dépendance de route : l'identifiant visé est lu dans le corps JSON (déjà
+    mis en cache par Starlette), avant que le handler n'appelle bcrypt.
+    """
+    async def dependency(request: Request):
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        identity = body.get(identity_field) if isinstance(body, dict) else None
+        login_limiter.check(request.url.path, client_ip(request), identity if isinstance(identity, str) else None)
+
+    return Depends(dependency)
@@ -0,0 +1,191 @@
+import json
+import math
+import os
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from config import ACCESS_TOKEN_EXPIRE_MINUTES
+from repository.cache import CACHE_PREFIX, CACHE_URL
+
+# Backend de diffusion des révocations entre workers : "memory" (un seul processus) ou "redis"
+REVOCATION_BACKEND = os.getenv("REVOCATION_BACKEND", "memory")
+REVOCATION_URL = os.getenv("REVOCATION_URL", CACHE_URL)
+REVOCATION_CHANNEL = os.getenv("REVOCATION_CHANNEL", CACHE_PREFIX + "revocations")
+
+
+class RevocationList:
+    """
+    Liste de révocation en mémoire, consultée à chaque requête authentifiée
+    sans accès à la base : deux dictionnaires (jti révoqués, et date limite
+    d'émission par utilisateur pour les bannissements / changements de mot
+    de passe). Chaque entrée expire avec le dernier token qu'elle peut viser.
+    """
+
+    def __init__(self):
+        self._tokens: dict = {}   # jti -> expiration (epoch)
+        self._users: dict = {}    # sub -> (iat minimal accepté, expiration)
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+
+    def apply(self, event: dict):
+        """Applique un événement {"jti", "exp"} ou {"sub", "before", "exp"}."""
+        with self._lock:
+            if event.get("jti"):
+                self._tokens[event["jti"]] = event["exp"]
+            elif event.get("sub"):
+                before, _ = self._users.get(event["sub"], (0, 0))
+                self._users[event["sub"]] = (max(before, event["before"]), event["exp"])
+            self._prune(time.time())
+
+    def is_revoked(self, payload: dict) -> bool:
+        now = time.time()
+        jti = payload.get("jti")
+        if jti is not None:
+            exp = self._tokens.get(jti)
+            if exp is not None and exp > now:
+                return True
+        user = self._users.get(payload.get("sub"))
+        if user is not None and user[1] > now:
+            # Tokens sans iat (émis avant cette version) : révoqués aussi
+            return payload.get("iat", 0) < user[0]
+        return False
+
+    def _prune(self, now: float):
+        # Purge paresseuse, au plus une fois par minute
+        if now < self._next_prune:
+            return
+        self._next_prune = now + 60
+        self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+        self._users = {sub: entry for sub, entry in self._users.items() if entry[1] > now}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": REVOCATION_BACKEND, "tokens": len(self._tokens), "users": len(self._users)}
+
+
+class RevocationBackend:
+    """Diffusion des événements de révocation vers tous les workers."""
+
+    def start(self, on_event: Callable[[dict], None]):
+        raise NotImplementedError
+
+    def publish(self, event: dict):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+class LocalRevocationBackend(RevocationBackend):
+    """Un seul processus : l'événement est appliqué immédiatement."""
+
+    def __init__(self):
+        self._on_event: Optional[Callable[[dict], None]] = None
+
+    def start(self, on_event):
+        self._on_event = on_event
+
+    def publish(self, event):
+        if self._on_event is not None:
+            self._on_event(event)
+
+
+class RedisRevocationBackend(RevocationBackend):
+    """
+    Chaque événement est conservé dans une clé Redis expirant avec lui (pour
+    les workers qui démarrent plus tard) puis diffusé par PUBLISH ; un thread
+    d'abonnement l'applique localement. `client` permet d'injecter un client
+    compatible (ex. fakeredis en local).
+    """
+
+    def __init__(self, url: str = REVOCATION_URL, channel: str = REVOCATION_CHANNEL, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as error:
+                raise RuntimeError("REVOCATION_BACKEND=redis nécessite le paquet 'redis'") from error
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.channel = channel
+        self._pubsub = None
+        self._thread = None
+
+    def _key(self, event: dict) -> str:
+        return f"{self.channel}:{'jti:' + event['jti'] if event.get('jti') else 'sub:' + event['sub']}"
+
+    def _events(self) -> Iterable[dict]:
+        for key in self.client.scan_iter(match=f"{self.channel}:*"):
+            raw = self.client.get(key)
+            if raw is not None:
+                yield json.loads(raw)
+
+    def start(self, on_event):
+        if self._thread is not None:
+            return
+
+        def handler(message):
+            on_event(json.loads(message["data"]))
+
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.channel: handler})
+        self._thread = self._pubsub.run_in_thread(sleep_time=1, daemon=True)
+        # Rattrapage des révocations encore actives, après l'abonnement pour ne rien manquer
+        for event in self._events():
+            on_event(event)
+
+    def publish(self, event):
+        ttl = int(math.ceil(event["exp"] - time.time()))
+        if ttl <= 0:
+            return
+        raw = json.dumps(event)
+        self.client.set(self._key(event), raw, ex=ttl)
+        self.client.publish(self.channel, raw)
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+
+def build_revocation_backend(kind: str = REVOCATION_BACKEND) -> RevocationBackend:
+    if kind == "redis":
+        return RedisRevocationBackend()
+    return LocalRevocationBackend()
+
+
+# Instances partagées
+revocation_list = RevocationList()
+revocation_backend = build_revocation_backend()
+if REVOCATION_BACKEND != "redis":
+    # Ni thread ni connexion : actif dès l'import, y compris hors application (scripts, tests)
+    revocation_backend.start(revocation_list.apply)
+
+
+def start_revocation_listener():
+    """
+    Abonnement aux révocations diffusées (thread Redis), démarré par le
+    lifespan de l'application : dans chaque worker, après un éventuel fork
+    (gunicorn --preload), jamais à l'import.
+    """
+    revocation_backend.start(revocation_list.apply)
+
+
+def revoke_token(payload: dict):
+    """Révoque un token d'accès (déconnexion) jusqu'à son expiration."""
+    if payload.get("jti") and payload.get("exp"):
+        revocation_backend.publish({"jti": payload["jti"], "exp": payload["exp"]})
+
+
+def revoke_user(username: str, max_token_age: float = ACCESS_TOKEN_EXPIRE_MINUTES * 60):
+    """
+    Révoque tous les tokens d'accès déjà émis pour `username` (bannissement,
+    changement de mot de passe, suppression). `max_token_age` : durée de vie
+    maximale d'un token, au-delà de laquelle l'entrée devient inutile.
+    """
+    if username:
+        now = time.time()
+        revocation_backend.publish({"sub": username, "before": now, "exp": now + max_token_age})
@@ -0,0 +1,94 @@
+import json
+from typing import Optional
+
+from sqlalchemy import UniqueConstraint, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+# Violations de contrainte : SQLSTATE (PostgreSQL) et code d'erreur étendu (SQLite)
+UNIQUE_VIOLATION = "unique"
+FOREIGN_KEY_VIOLATION = "foreign_key"
+_SQLSTATES = {"23505": UNIQUE_VIOLATION, "23503": FOREIGN_KEY_VIOLATION}
+_SQLITE_ERRORS = {"SQLITE_CONSTRAINT_UNIQUE": UNIQUE_VIOLATION, "SQLITE_CONSTRAINT_FOREIGNKEY": FOREIGN_KEY_VIOLATION}
+
+
+def dialect_insert(db: Session, model):
+    """INSERT propre au dialecte, pour ON CONFLICT (PostgreSQL et SQLite)."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT non supporté pour le dialecte {dialect}")
+    return insert(model)
+
+
+def column_values(model, data: dict) -> dict:
+    """Ne garde que les colonnes du modèle ; dict/list sont stockés en JSON."""
+    columns = model.__table__.c
+    values = {}
+    for key, value in data.items():
+        if key not in columns:
+            continue
+        # Convert dict/list to JSON string to avoid psycopg2 adaptation error
+        if isinstance(value, (dict, list, tuple)):
+            try:
+                value = json.dumps(value)
+            except Exception:
+                continue
+        values[key] = value
+    return values
+
+
+def update_returning(db: Session, table, id: int, values: dict, old_columns, returning):
+    """
+    UPDATE ... WHERE id = :id RETURNING, avec en plus les anciennes valeurs de
+    `old_columns` (clés "old_<nom>"). PostgreSQL : un seul aller-retour via
+    UPDATE ... FROM (sous-requête sur l'état avant modification). SQLite
+    interdit les tables du FROM dans RETURNING : l'ancien état est alors lu
+    par un SELECT dans la même transaction. Retourne un mapping ou None.
+    """
+    labelled = [table.c[name].label(f"old_{name}") for name in old_columns]
+    if db.get_bind().dialect.name == "postgresql":
+        old = select(table.c.id, *labelled).where(table.c.id == id).subquery("old")
+        return db.execute(
+            update(table)
+            .where(table.c.id == old.c.id)
+            .values(**values)
+            .returning(*(old.c[f"old_{name}"] for name in old_columns), *returning)
+        ).mappings().first()
+
+    before = db.execute(select(*labelled).where(table.c.id == id)).mappings().first()
+    if before is None:
+        return None
+    row = db.execute(
+        update(table).where(table.c.id == id).values(**values).returning(*returning)
+    ).mappings().first()
+    return {**before, **row} if row else None
+
+
+def integrity_violation(error: IntegrityError) -> Optional[str]:
+    """UNIQUE_VIOLATION, FOREIGN_KEY_VIOLATION ou None (autre contrainte)."""
+    orig = error.orig
+    # psycopg2 : pgcode ; psycopg 3 et asyncpg (adapté par SQLAlchemy) : sqlstate
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if code:
+        return _SQLSTATES.get(code)
+    return _SQLITE_ERRORS.get(getattr(orig, "sqlite_errorname", None))
+
+
+def violates_unique(error: IntegrityError, column) -> bool:
+    """Vrai si `error` est la violation d'un index ou d'une contrainte unique portant sur `column`."""
+    if integrity_violation(error) != UNIQUE_VIOLATION:
+        return False
+    orig = error.orig
+    # psycopg2 : diag ; asyncpg : exception d'origine
+    name = getattr(getattr(orig, "diag", None), "constraint_name", None) or getattr(orig.__cause__, "constraint_name", None)
+    if name:
+        table = column.table
+        names = {index.name for index in table.indexes if index.unique and column.name in index.columns}
+        names |= {c.name for c in table.constraints if isinstance(c, UniqueConstraint) and column.name in c.columns}
+        return name in names
+    # SQLite : "UNIQUE constraint failed: posts.title"
+    return f"{column.table.name}.{column.name}" in str(orig)
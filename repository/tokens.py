@@ -0,0 +1,163 @@
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from config import SECRET_KEY
+from models.models import RefreshToken, Users
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 30))
+
+
+class RefreshTokenError(Exception):
+    """Jeton de rafraîchissement refusé ; `reason` vaut "invalid" ou "reused"."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _hash_secret(secret: str) -> str:
+    # HMAC-SHA256 : une fuite de la table ne permet pas de forger des jetons
+    return hmac.new(SECRET_KEY.encode(), secret.encode(), hashlib.sha256).hexdigest()
+
+
+def _split(token: str) -> Tuple[str, str]:
+    token_id, _, secret = (token or "").partition(".")
+    if not token_id or not secret or len(token_id) > 32:
+        raise RefreshTokenError("invalid")
+    return token_id, secret
+
+
+class RefreshTokenRepo:
+    @staticmethod
+    def _new_row(users_id: int, family_id: Optional[str] = None, token_id: Optional[str] = None) -> Tuple[str, dict]:
+        token_id, secret = token_id or secrets.token_urlsafe(12), secrets.token_urlsafe(32)
+        row = {
+            "id": token_id,
+            "family_id": family_id or token_id,
+            "users_id": users_id,
+            "token_hash": _hash_secret(secret),
+            "expires_at": datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        }
+        return f"{token_id}.{secret}", row
+
+    @staticmethod
+    def issue(db: Session, users_id: int) -> str:
+        """Nouveau jeton, tête d'une nouvelle famille (connexion)."""
+        token, row = RefreshTokenRepo._new_row(users_id)
+        db.execute(insert(RefreshToken), row)
+        db.commit()
+        return token
+
+    @staticmethod
+    def rotate(db: Session, token: str) -> Tuple[str, str]:
+        """
+        Échange un jeton contre (username, nouveau jeton). Cas courant : un HMAC
+        et un UPDATE ... RETURNING sur la clé primaire, qui réclame le jeton
+        de façon atomique (deux rotations concurrentes ne peuvent pas réussir
+        toutes les deux), suivis de l'INSERT du successeur.
+        """
+        token_id, secret = _split(token)
+        token_hash = _hash_secret(secret)
+        now = datetime.utcnow()
+        new_id = secrets.token_urlsafe(12)
+
+        username = select(Users.username).where(Users.id == RefreshToken.users_id).scalar_subquery()
+        claimed = db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.id == token_id,
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.replaced_by.is_(None),
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > now,
+            )
+            .values(replaced_by=new_id)
+            .returning(RefreshToken.users_id, RefreshToken.family_id, username)
+            .execution_options(synchronize_session=False)
+        ).first()
+
+        if claimed is None or claimed[2] is None:
+            db.rollback()
+            RefreshTokenRepo._detect_reuse(db, token_id, token_hash)
+            raise RefreshTokenError("invalid")
+
+        users_id, family_id, name = claimed
+        new_token, new_row = RefreshTokenRepo._new_row(users_id, family_id, new_id)
+        db.execute(insert(RefreshToken), new_row)
+        db.commit()
+        return name, new_token
+
+    @staticmethod
+    def _detect_reuse(db: Session, token_id: str, token_hash: str):
+        # Jeton authentique mais déjà remplacé : vol probable, toute la famille est révoquée
+        family_id = db.execute(
+            select(RefreshToken.family_id).where(
+                RefreshToken.id == token_id,
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.replaced_by.is_not(None),
+            )
+        ).scalar_one_or_none()
+        if family_id is None:
+            return
+        RefreshTokenRepo.revoke_family(db, family_id)
+        raise RefreshTokenError("reused")
+
+    @staticmethod
+    def revoke(db: Session, token: str) -> bool:
+        """Déconnexion : révoque la famille du jeton présenté (s'il est authentique)."""
+        try:
+            token_id, secret = _split(token)
+        except RefreshTokenError:
+            return False
+        family_id = db.execute(
+            select(RefreshToken.family_id).where(
+                RefreshToken.id == token_id,
+                RefreshToken.token_hash == _hash_secret(secret),
+            )
+        ).scalar_one_or_none()
+        if family_id is None:
+            return False
+        RefreshTokenRepo.revoke_family(db, family_id)
+        return True
+
+    @staticmethod
+    def revoke_user(db: Session, users_id: int) -> int:
+        """Révoque tous les refresh tokens d'un utilisateur (changement de mot de passe, bannissement)."""
+        result = db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.users_id == users_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount
+
+    @staticmethod
+    def revoke_family(db: Session, family_id: str) -> int:
+        result = db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount
+
+    @staticmethod
+    def purge_expired(db: Session) -> int:
+        """Supprime les jetons expirés ou révoqués depuis plus d'un jour ; retourne leur nombre."""
+        now = datetime.utcnow()
+        result = db.execute(
+            delete(RefreshToken)
+            .where(or_(RefreshToken.expires_at <= now, RefreshToken.revoked_at <= now - timedelta(days=1)))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount
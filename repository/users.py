@@ -1,21 +1,40 @@
-from typing import TypeVar, Generic, Optional, Type
-from sqlalchemy.orm import Session
+from typing import TypeVar, Generic, List, Optional, Tuple, Type
+from sqlalchemy import bindparam, delete, or_, select, update
+from sqlalchemy.orm import Session, load_only
 
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from config import SECRET_KEY, ALGORITHM
+from config import ACCESS_TOKEN_EXPIRE_MINUTES, get_db, run_db
+import hashlib
+import os
+import secrets
+import time
 
 from fastapi import Depends, Request, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from passlib.context import CryptContext
-import json
 
-from models.models import Users
+from models.models import Post, Users
+from schemas.users import UserOut
+from repository.pagination import paginate
+from repository.bulk import BulkReport, group_by_columns, reject_duplicates
+from repository.cache import TTLCache, cached, cache_key, invalidate
+from repository.keys import key_set
+from repository.metrics import jwt_verify_duration
+from repository.revocation import revocation_list, revoke_user
+from repository.statements import column_values, dialect_insert, update_returning
 
 T = TypeVar('T')
 
-# cryté le pwd
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Cache des profils (UserOut) par username, pour /auth/me et current_user
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 60))
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def forget_user(*usernames: str):
+  # À appeler après chaque écriture sur un utilisateur
+  for username in usernames:
+    if username:
+      user_cache.delete(username)
 
 
 # users
@@ -31,6 +50,46 @@ class UsersRepo(BaseRepo):
   @staticmethod
   def find_by_username(db: Session, username: str):
     return db.query(Users).filter(Users.username == username).first()
+
+  @staticmethod
+  def find_by_email(db: Session, email: str):
+    return db.query(Users).filter(Users.email == email).first()
+
+  @staticmethod
+  def set_password(db: Session, user: Users, hashed_password: str):
+    db.execute(update(Users).where(Users.id == user.id).values(password=hashed_password))
+    db.commit()
+    forget_user(user.username)
+    return user
+
+  # Rehash au login : ne remplace que le hash vérifié, pour ne pas écraser un changement de mot de passe concurrent
+  @staticmethod
+  def rehash_password(db: Session, user: Users, old_hash: str, new_hash: str) -> bool:
+    updated = db.execute(
+      update(Users).where(Users.id == user.id, Users.password == old_hash).values(password=new_hash)
+    ).rowcount
+    db.commit()
+    forget_user(user.username)
+    return bool(updated)
+
+  # Une requête sur les deux index uniques : évite un hachage bcrypt pour un doublon évident
+  @staticmethod
+  def exists(db: Session, username: str, email: str) -> bool:
+    return db.execute(
+      select(Users.id).where(or_(Users.username == username, Users.email == email)).limit(1)
+    ).first() is not None
+
+  # INSERT ... ON CONFLICT DO NOTHING RETURNING id : None si username ou email existe déjà
+  @staticmethod
+  def create(db: Session, username: str, email: str, phone: str, password: str) -> Optional[int]:
+    user_id = db.execute(
+      dialect_insert(db, Users)
+      .values(username=username, email=email, phone=phone, password=password)
+      .on_conflict_do_nothing()
+      .returning(Users.id)
+    ).scalar_one_or_none()
+    db.commit()
+    return user_id
   
 # get all users sauf password
 class AllUsersRepo(BaseRepo):
@@ -40,74 +99,239 @@ class AllUsersRepo(BaseRepo):
         for user in users:
           user.__dict__.pop('password', None) # Retourne tout sauf le password
         return users
+
+    @staticmethod
+    def get_page(db: Session, model: Generic[T], limit: int, cursor: Optional[str] = None):
+        users, next_cursor = paginate(db.query(model), model, limit, cursor)
+        for user in users:
+          user.__dict__.pop('password', None)
+        return users, next_cursor
     
+# Invalide le profil et les lectures qui embarquent l'auteur (posts, comptage)
+def invalidate_user_reads(user_id: int, post_ids=()):
+  invalidate(
+    cache_key("user", user_id),
+    cache_key("posts-count-by-user", "all"),
+    *(cache_key("post", post_id) for post_id in post_ids)
+  )
+
 # get one users
 class GetOneUserRepo(BaseRepo):
   @staticmethod
+  @cached("user", key=lambda model, id: id, serialize=lambda user: UserOut.model_validate(user).model_dump(mode="json"))
   def get_one_user(db: Session, model: Generic[T], id: int):
     user = db.query(model).filter(model.id == id).first()
     if user:
       user.__dict__.pop('password', None)
     return user
 
+# Requête d'export en flux, sans le mot de passe (voir repository.export)
+class ExportUsersRepo:
+    @staticmethod
+    def export_query():
+        return (
+            select(Users)
+            .options(load_only(Users.id, Users.username, Users.email, Users.phone, Users.created_at, Users.updated_at))
+            .order_by(Users.id)
+        )
+
 class UpdateUser(BaseRepo):
     @staticmethod
     def update_user(db: Session, model: Generic[T], id: int, update_data: dict):
-        user = db.query(model).filter(model.id == id).first()
-        if not user:
-            return None
+        """
+        UPDATE ... RETURNING avec l'ancien username/email, pour invalider
+        les caches. Retourne un dict sans le mot de passe, ou None si
+        l'utilisateur n'existe pas.
+        """
+        table = model.__table__
+        public_columns = [c for c in table.c if c.name != "password"]
+        # Le mot de passe éventuel doit déjà être haché (voir repository.hashing)
+        values = column_values(model, update_data)
+        if not values:
+            row = db.execute(select(*public_columns).where(table.c.id == id)).mappings().first()
+            return dict(row) if row else None
 
-        # Hash password if it exists in update data
-        if "password" in update_data and update_data["password"] is not None:
-            update_data["password"] = pwd_context.hash(update_data["password"])
-
-        for key, value in update_data.items():
-            if not hasattr(user, key):
-                continue
-            # Convert dict/list to JSON string to avoid psycopg2 adaptation error
-            if isinstance(value, (dict, list, tuple)):
-                try:
-                    setattr(user, key, json.dumps(value))
-                except Exception:
-                    # skip problematic fields (or handle as needed)
-                    continue
-            else:
-                setattr(user, key, value)
+        row = update_returning(db, table, id, values, ["username", "email"], public_columns)
+        if not row:
+            return None
+        user = {c.name: row[c.name] for c in public_columns}
 
+        renamed = (row["old_username"], row["old_email"]) != (user["username"], user["email"])
+        # Les posts embarquent l'auteur : relus seulement en cas de renommage
+        post_ids = db.execute(select(Post.id).where(Post.users_id == id)).scalars().all() if renamed else []
         db.commit()
-        db.refresh(user)
-
-        # Remove password from response
-        user.__dict__.pop('password', None)
+        forget_user(row["old_username"], user["username"])
+        invalidate_user_reads(id, post_ids)
         return user
 
 # Suppression de l'user
 class DeleteUser:
     @staticmethod
     def delete_user(db: Session, id: int):
-        # On filtre par id
-        user = db.query(Users).filter(Users.id == id).first()
-        if not user:
+        # DELETE ... RETURNING : posts puis utilisateur, sans SELECT préalable
+        post_ids = db.execute(delete(Post).where(Post.users_id == id).returning(Post.id)).scalars().all()
+        username = db.execute(delete(Users).where(Users.id == id).returning(Users.username)).scalar_one_or_none()
+        if username is None:
+            db.rollback()
             return None  # Utilisateur non trouvé
-        db.delete(user)   # Supprime l'utilisateur
         db.commit()       # Applique la suppression
+        forget_user(username)
+        revoke_user(username)
+        invalidate_user_reads(id, post_ids)
         return True
+
+# Écritures en lot : une transaction, des requêtes multi-lignes et un rapport par élément
+class BulkUsersRepo:
+    DUPLICATE = "Cet email ou nom d'utilisateur est déjà utilisé."
+
+    @staticmethod
+    def create_many(db: Session, items: List[Tuple[int, dict]], report: BulkReport):
+        """
+        INSERT multi-lignes ON CONFLICT DO NOTHING RETURNING id, username :
+        les utilisateurs absents du RETURNING existaient déjà.
+        Les mots de passe doivent déjà être hachés (voir repository.hashing).
+        """
+        items = reject_duplicates(items, ["username", "email"], report, "Email ou nom d'utilisateur en double dans le lot")
+        if not items:
+            return
+        table = Users.__table__
+        created = dict(db.execute(
+            dialect_insert(db, table).on_conflict_do_nothing().returning(table.c.username, table.c.id),
+            [column_values(Users, data) for _, data in items],
+        ).all())
+        db.commit()
+        for index, data in items:
+            user_id = created.get(data["username"])
+            if user_id is None:
+                report.fail(index, BulkUsersRepo.DUPLICATE)
+            else:
+                report.ok(index, user_id)
+
+    @staticmethod
+    def update_many(db: Session, items: List[Tuple[int, dict]], report: BulkReport):
+        """
+        Un SELECT pour l'existence et les anciens username/email, un pour les
+        valeurs déjà prises, puis un UPDATE executemany par jeu de colonnes.
+        """
+        items = reject_duplicates(items, ["id"], report, "Utilisateur en double dans le lot")
+        items = reject_duplicates(items, ["username", "email"], report, "Email ou nom d'utilisateur en double dans le lot")
+        table = Users.__table__
+        ids = [data["id"] for _, data in items]
+        current = {
+            row.id: row for row in db.execute(
+                select(table.c.id, table.c.username, table.c.email).where(table.c.id.in_(ids))
+            )
+        } if ids else {}
+        usernames = [data["username"] for _, data in items if data.get("username")]
+        emails = [data["email"] for _, data in items if data.get("email")]
+        taken = {}
+        if usernames or emails:
+            for row in db.execute(
+                select(table.c.id, table.c.username, table.c.email)
+                .where(table.c.username.in_(usernames) | table.c.email.in_(emails))
+            ):
+                taken[("username", row.username)] = row.id
+                taken[("email", row.email)] = row.id
+
+        rows, renamed = [], []
+        for index, data in items:
+            user_id = data["id"]
+            values = column_values(Users, {k: v for k, v in data.items() if k not in ("id", "password") and v is not None})
+            if user_id not in current:
+                report.fail(index, "Utilisateur non trouvé")
+            elif any(taken.get((field, values.get(field)), user_id) != user_id for field in ("username", "email")):
+                report.fail(index, BulkUsersRepo.DUPLICATE)
+            else:
+                report.ok(index, user_id)
+                if values:
+                    rows.append({"_id": user_id, **values})
+                    old = current[user_id]
+                    if (values.get("username", old.username), values.get("email", old.email)) != (old.username, old.email):
+                        renamed.append(user_id)
+
+        for group in group_by_columns(rows).values():
+            db.execute(update(table).where(table.c.id == bindparam("_id")), group)
+        # Les posts embarquent l'auteur : relus seulement pour les utilisateurs renommés
+        post_ids = db.execute(select(Post.id).where(Post.users_id.in_(renamed))).scalars().all() if renamed else []
+        db.commit()
+
+        forget_user(*(current[row["_id"]].username for row in rows), *(row.get("username") for row in rows))
+        invalidate(
+            *(cache_key("user", row["_id"]) for row in rows),
+            cache_key("posts-count-by-user", "all"),
+            *(cache_key("post", post_id) for post_id in post_ids)
+        )
+
+    @staticmethod
+    def delete_many(db: Session, items: List[Tuple[int, int]], report: BulkReport):
+        # DELETE ... WHERE IN (...) RETURNING : posts puis utilisateurs
+        ids = {user_id for _, user_id in items}
+        post_ids = db.execute(delete(Post).where(Post.users_id.in_(ids)).returning(Post.id)).scalars().all() if ids else []
+        deleted = dict(db.execute(
+            delete(Users).where(Users.id.in_(ids)).returning(Users.id, Users.username)
+        ).all()) if ids else {}
+        db.commit()
+
+        seen = set()
+        for index, user_id in items:
+            if user_id in seen:
+                report.fail(index, "Utilisateur en double dans le lot")
+            elif user_id not in deleted:
+                report.fail(index, "Utilisateur non trouvé")
+            else:
+                report.ok(index, user_id)
+            seen.add(user_id)
+        forget_user(*deleted.values())
+        for username in deleted.values():
+            revoke_user(username)
+        invalidate(
+            *(cache_key("user", user_id) for user_id in deleted),
+            cache_key("posts-count-by-user", "all"),
+            *(cache_key("post", post_id) for post_id in post_ids)
+        )
    
 # Générer le token
 class JWTRepo():
   def generate_token(data: dict, expire_delta: Optional[timedelta]=None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expire_delta if expire_delta else timedelta(minutes=15))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    expire = datetime.utcnow() + (expire_delta if expire_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    # jti : révocation individuelle ; iat (fractionnaire) : révocation de tous les tokens d'un utilisateur
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": secrets.token_urlsafe(12)})
+    # Clé déjà analysée ; le kid indique aux vérificateurs quelle clé publique utiliser
+    kid, key = key_set.signing_key()
+    return jwt.encode(to_encode, key, algorithm=key_set.algorithm, headers={"kid": kid} if kid else None)
 
   def decode_token(token: str):
     try:
-      payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+      key = key_set.verification_key(jwt.get_unverified_header(token).get("kid"))
+      if key is None:
+        return None
+      payload = jwt.decode(token, key, algorithms=[key_set.algorithm])
       return payload
     except JWTError:
       return None
 
+# Cache des payloads déjà vérifiés, conservés jusqu'à l'expiration du token
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE)
+
+def verify_token_cached(token: str) -> Optional[dict]:
+    started = time.perf_counter()
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+      # Le cache ne prolonge jamais la durée de vie du token
+      if payload.get("exp") is None or payload["exp"] > time.time():
+        jwt_verify_duration.observe(time.perf_counter() - started, "hit", "valid")
+        return payload
+      token_cache.delete(key)
+
+    payload = JWTRepo.decode_token(token)
+    if payload and payload.get("exp") is not None:
+      token_cache.set(key, payload, ttl=payload["exp"] - time.time())
+    jwt_verify_duration.observe(time.perf_counter() - started, "miss", "valid" if payload else "invalid")
+    return payload
+
 # Authorisation du token
 class JWTBearer(HTTPBearer):
     def __init__(self, auto_error: bool = True):
@@ -121,17 +345,38 @@ class JWTBearer(HTTPBearer):
         if credentials.scheme.lower() != "bearer":
             raise HTTPException(status_code=403, detail="Scheme d’authentification invalide.")
 
-        payload = JWTRepo.decode_token(credentials.credentials)
+        payload = verify_token_cached(credentials.credentials)
         if not payload:
             raise HTTPException(status_code=403, detail="Token invalide ou expiré.")
 
+        # Liste de révocation en mémoire, synchronisée entre workers : aucune requête en base
+        if revocation_list.is_revoked(payload):
+            raise HTTPException(status_code=403, detail="Token révoqué.")
+
         # Attacher les infos du token à la requête pour les handlers ultérieurs
         request.state.user = payload
         return payload
 
     def verify_jwt(self, token: str) -> bool:
         """
-        Vérifie si le token JWT est valide (non expiré, signature correcte).
+        Vérifie si le token JWT est valide (non expiré, signature correcte, non révoqué).
         """
-        return JWTRepo.decode_token(token) is not None
+        payload = verify_token_cached(token)
+        return payload is not None and not revocation_list.is_revoked(payload)
 
+jwt_bearer = JWTBearer()
+
+# Utilisateur courant, servi depuis le cache dans le cas courant
+async def get_current_user(payload: dict = Depends(jwt_bearer), db: Session = Depends(get_db)) -> UserOut:
+    username = payload.get("sub")
+    if not username:
+        raise HTTPException(status_code=401, detail="Token invalide")
+
+    user_out = user_cache.get(username)
+    if user_out is None:
+        user = await run_db(db, UsersRepo.find_by_username, username)
+        if not user:
+            raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
+        user_out = UserOut.model_validate(user)
+        user_cache.set(username, user_out)
+    return user_out
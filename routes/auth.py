@@ -1,125 +1,158 @@
 from fastapi import APIRouter, Depends, Request, HTTPException, status
-from schemas.users import  ResponseSchema, TokenResponse, Register, Login, UserOut
+from schemas.users import  ResponseSchema, TokenResponse, Register, Login, LogoutRequest, RefreshRequest, UserOut
+from schemas.responses import EnvelopeResponse
 from sqlalchemy.orm import Session
-from config import get_db
-from passlib.context import CryptContext
-from repository.users import UsersRepo, JWTRepo, JWTBearer
-from models.models import Users
+from config import ACCESS_TOKEN_EXPIRE_MINUTES, get_db, run_db
+from repository.users import UsersRepo, JWTRepo, get_current_user, jwt_bearer
+from repository.hashing import hasher, HashingPoolSaturated
+from repository.rate_limit import rate_limited
+from repository.revocation import revoke_token
+from repository.tokens import RefreshTokenError, RefreshTokenRepo
 
 router = APIRouter(tags={"Auth"})
 
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated="auto")
+
+def duplicate_signup() -> EnvelopeResponse:
+    return EnvelopeResponse(ResponseSchema(
+        code="400",
+        status="Error",
+        message="Cet email ou nom d'utilisateur est déjà utilisé."
+    ))
 
 #register
-@router.post('/signup')
+# Limité par IP et par email : chaque inscription coûte un hachage bcrypt
+@router.post('/signup', response_model=ResponseSchema, dependencies=[rate_limited("email")])
 async def signup(request: Register, db: Session = Depends(get_db)):
   try:
     # Vérification si les champs sont vides
     if not request.username or not request.email or not request.password:
-            return ResponseSchema(
+            return EnvelopeResponse(ResponseSchema(
                 code="400",
                 status="Error",
                 message="Veuillez remplir tous les champs obligatoires."
-            ).dict(exclude_none=True)
+            ))
 
-        # Vérification si l'email existe déjà
-    existing_user = db.query(Users).filter(Users.email == request.email).first()
-    if existing_user:
-        return ResponseSchema(
-                code="400",
-                status="Error",
-                message="Cet email est déjà utilisé."
-            ).dict(exclude_none=True)
-    # insert data
-    user = Users(
-      username = request.username,
-      password = pwd_context.hash(request.password),
-      email = request.email,
-      phone = request.phone)
-    UsersRepo.insert(db, user)
-    return ResponseSchema(code="200", status="Ok", message="Enregistrement réussit").dict(exclude_none=True)
+    # Doublon détecté avant le hachage ; les index uniques (ON CONFLICT) couvrent
+    # encore une inscription concurrente entre la vérification et l'insertion
+    if await run_db(db, UsersRepo.exists, request.username, request.email):
+        return duplicate_signup()
+    user_id = await run_db(
+      db, UsersRepo.create,
+      request.username,
+      request.email,
+      request.phone,
+      await hasher.hash(request.password))
+    if user_id is None:
+        return duplicate_signup()
+    return EnvelopeResponse(ResponseSchema(code="200", status="Ok", message="Enregistrement réussit"))
+  except HashingPoolSaturated:
+    raise
   except Exception as error:
     print(error.args)
-    return ResponseSchema(code="500", status="Error", message="Erreur du serveur").dict(exclude_none=True)
+    return EnvelopeResponse(ResponseSchema(code="500", status="Error", message="Erreur du serveur"))
   
 # login
-@router.post('/login')
+# Limité par IP et par username avant la vérification bcrypt
+@router.post('/login', response_model=ResponseSchema[TokenResponse], dependencies=[rate_limited("username")])
 async def login(request: Login, db: Session = Depends(get_db)):
     try:
         # Vérification de l'existence de l'utilisateur
-        user = UsersRepo.find_by_username(db, request.username)
+        user = await run_db(db, UsersRepo.find_by_username, request.username)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Nom d'utilisateur ou mot de passe incorrect."
             )
 
-        # Vérification du mot de passe
-        if not pwd_context.verify(request.password, user.password):
+        # Vérification du mot de passe ; nouveau hash si la politique de hachage a changé
+        valid, new_hash = await hasher.verify_and_update(request.password, user.password)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Nom d'utilisateur ou mot de passe incorrect."
             )
+        if new_hash is not None:
+            # Même mot de passe : les sessions existantes restent valides
+            await run_db(db, UsersRepo.rehash_password, user, user.password, new_hash)
 
-        # Génération du token JWT
+        # Génération du token JWT et d'un refresh token (nouvelle famille)
         token = JWTRepo.generate_token({'sub': user.username})
+        refresh_token = await run_db(db, RefreshTokenRepo.issue, user.id)
 
         # Réponse de succès
-        return ResponseSchema(
+        return EnvelopeResponse(ResponseSchema[TokenResponse](
             code="200",
             status="OK",
             message="Connexion réussie",
             result=TokenResponse(
                 access_token=token,
-                token_type="bearer"
-            ).dict(exclude_none=True)
-        ).dict(exclude_none=True)
+                token_type="bearer",
+                refresh_token=refresh_token,
+                expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            )
+        ))
+
+    except HashingPoolSaturated:
+        # Pool de hachage saturé : on renvoie un vrai 429
+        raise
 
     except HTTPException as http_error:
         # Gestion propre des erreurs d'authentification
-        return ResponseSchema(
+        return EnvelopeResponse(ResponseSchema(
             code=str(http_error.status_code),
             status="Bad Request",
             message=http_error.detail
-        ).dict(exclude_none=True)
+        ))
 
     except Exception as error:
         # Gestion d'erreurs serveur
         print(f"Erreur serveur: {error}")
-        return ResponseSchema(
+        return EnvelopeResponse(ResponseSchema(
             code="500",
             status="Error",
             message="Erreur interne du serveur."
-        ).dict(exclude_none=True)
-  
-@router.get("/me", response_model=ResponseSchema[UserOut], dependencies=[Depends(JWTBearer())])
-async def me(request: Request, db: Session = Depends(get_db)):
-    try:
-        # On récupère le username depuis le payload du token
-        payload = request.state.user
-        username = payload.get("sub")
-        if not username:
-            return ResponseSchema(code="401", status="Error", message="Token invalide").model_dump(exclude_none=True)
-
-        # On récupère l'utilisateur dans la base
-        user = UsersRepo.find_by_username(db, username)
-        if not user:
-            return ResponseSchema(code="404", status="Error", message="Utilisateur non trouvé").model_dump(exclude_none=True)
+        ))
 
-        # Convertir en modèle Pydantic (UserOut) pour exclure le mot de passe
-        user_out = UserOut.model_validate(user)
-
-        return ResponseSchema(
+# Renouvellement : rotation du refresh token, sans bcrypt
+@router.post('/refresh', response_model=ResponseSchema[TokenResponse])
+async def refresh(request: RefreshRequest, db: Session = Depends(get_db)):
+    try:
+        username, refresh_token = await run_db(db, RefreshTokenRepo.rotate, request.refresh_token)
+        return EnvelopeResponse(ResponseSchema[TokenResponse](
             code="200",
-            status="Ok",
-            message="Utilisateur connecté",
-            result=user_out
-        ).model_dump(exclude_none=True)
+            status="OK",
+            message="Token renouvelé",
+            result=TokenResponse(
+                access_token=JWTRepo.generate_token({'sub': username}),
+                token_type="bearer",
+                refresh_token=refresh_token,
+                expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            )
+        ))
+    except RefreshTokenError as error:
+        message = "Refresh token réutilisé, session révoquée." if error.reason == "reused" else "Refresh token invalide ou expiré."
+        return EnvelopeResponse(ResponseSchema(code="401", status="Unauthorized", message=message))
+    except Exception as error:
+        print(f"Erreur serveur: {error}")
+        return EnvelopeResponse(ResponseSchema(code="500", status="Error", message="Erreur interne du serveur."))
 
+# Déconnexion : révoque le token d'accès courant et, s'il est fourni, la famille du refresh token
+@router.post('/logout', response_model=ResponseSchema)
+async def logout(request: LogoutRequest = None, payload: dict = Depends(jwt_bearer), db: Session = Depends(get_db)):
+    try:
+        revoke_token(payload)
+        if request is not None and request.refresh_token:
+            await run_db(db, RefreshTokenRepo.revoke, request.refresh_token)
+        return EnvelopeResponse(ResponseSchema(code="200", status="OK", message="Déconnexion réussie"))
     except Exception as error:
-        print(error.args)
-        return ResponseSchema(
-            code="500",
-            status="Error",
-            message="Erreur du serveur"
-        ).model_dump(exclude_none=True)
\ No newline at end of file
+        print(f"Erreur serveur: {error}")
+        return EnvelopeResponse(ResponseSchema(code="500", status="Error", message="Erreur interne du serveur."))
+
+@router.get("/me", response_model=ResponseSchema[UserOut])
+async def me(user: UserOut = Depends(get_current_user)):
+    return EnvelopeResponse(ResponseSchema[UserOut](
+        code="200",
+        status="Ok",
+        message="Utilisateur connecté",
+        result=user
+    ))
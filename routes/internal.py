@@ -0,0 +1,63 @@
+from fastapi import APIRouter
+
+from config import engine, async_engine, DB_ASYNC
+from repository.hashing import hasher
+from repository.pool_monitor import pool_stats
+from repository.users import token_cache, user_cache
+from repository.cache import CACHE_BACKEND, cache_stats
+from repository.revocation import revocation_list
+from repository.rate_limit import login_limiter
+from repository.compression import compression_summary
+from repository.internal_access import internal_only
+
+# Jeton ou adresse autorisée exigés (repository.internal_access)
+router = APIRouter(tags={"Internal"}, dependencies=[internal_only()])
+
+
+# Statistiques du pool de hachage des mots de passe
+@router.get("/hashing")
+async def hashing_stats():
+    return hasher.stats()
+
+
+# Statistiques du pool de connexions (attente au checkout, connexions actives/inactives)
+@router.get("/db-pool")
+async def db_pool_stats():
+    pool = async_engine.pool if DB_ASYNC else engine.pool
+    return pool_stats.snapshot(pool)
+
+
+# Statistiques du cache des tokens vérifiés
+@router.get("/token-cache")
+async def token_cache_stats():
+    return token_cache.stats()
+
+
+# Statistiques du cache des profils utilisateurs
+@router.get("/user-cache")
+async def user_cache_stats():
+    return user_cache.stats()
+
+
+# Statistiques du cache partagé des lectures
+@router.get("/cache")
+async def shared_cache_stats():
+    return {"backend": CACHE_BACKEND, **cache_stats}
+
+
+# Taille de la liste de révocation locale
+@router.get("/revocations")
+async def revocation_stats():
+    return revocation_list.stats()
+
+
+# Compteurs du limiteur de tentatives de connexion
+@router.get("/rate-limit")
+async def rate_limit_stats():
+    return login_limiter.stats()
+
+
+# Compression des réponses (octets économisés, cache des corps compressés)
+@router.get("/compression")
+async def compression_stats():
+    return compression_summary()
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Response
+
+from config import engine, async_engine, DB_ASYNC
+from repository.hashing import hasher
+from repository.metrics import db_pool_connections, password_hash_queue, registry
+from repository.internal_access import internal_only
+from repository.pool_monitor import pool_gauges
+
+# Même accès que /internal/* : le collecteur envoie le jeton (bearer_token) ou vient d'une adresse autorisée
+router = APIRouter(tags={"Metrics"}, dependencies=[internal_only()])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Métriques au format texte Prometheus (latences par route, requêtes SQL, bcrypt, JWT)
+@router.get("/metrics")
+async def metrics():
+    pool = pool_gauges(async_engine.pool if DB_ASYNC else engine.pool)
+    if "in_use" in pool:
+        db_pool_connections.set(pool["in_use"], "in_use")
+        db_pool_connections.set(pool["idle"], "idle")
+    stats = hasher.stats()
+    password_hash_queue.set(stats["in_flight"] - stats["queue_depth"], "running")
+    password_hash_queue.set(stats["queue_depth"], "queued")
+    return Response(content=registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
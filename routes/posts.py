@@ -1,88 +1,161 @@
-from fastapi import APIRouter, Depends, Request
-from typing import List
-from schemas.posts import PostUpdateSchema, ResponseSchema, Register, PostOut, PostCountResponse
+from fastapi import APIRouter, Body, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Any, List, Optional
+from schemas.posts import PostBulkUpdateSchema, PostUpdateSchema, ResponseSchema, Register, PostOut, PostRecord, PostCountResponse, PostSearchHit
+from schemas.responses import BulkResult, EnvelopeResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from config import get_db
-from repository.posts import AllPostsRepo, CountPostByUser, DeletePost, PostsRepo, GetOnePostRepo, UpdatePost
+from config import get_db, run_db
+from repository.bulk import BULK_MAX_ITEMS, BulkReport, bulk_conflict, bulk_response, validate_items
+from repository.posts import AllPostsRepo, BulkPostsRepo, CountPostByUser, DeletePost, ExportPostsRepo, PostsRepo, GetOnePostRepo, SearchPostsRepo, UpdatePost
+from repository.conditional import is_not_modified, make_etag, not_modified, validator_headers
+from repository.export import EXPORT_MEDIA_TYPES, export_stream
+from repository.pagination import DEFAULT_PAGE_SIZE, DEFAULT_SORT, MAX_PAGE_SIZE, SORT_PATTERN, InvalidCursor
+from repository.statements import FOREIGN_KEY_VIOLATION, integrity_violation, violates_unique
 from models.models import Post
 
 router = APIRouter(tags={"Posts"})
 
 
+def post_integrity_error(error: IntegrityError, message: str) -> EnvelopeResponse:
+    """Titre déjà pris ou auteur inconnu : 400 ; autre contrainte : 500 avec `message`."""
+    if violates_unique(error, Post.title):
+        return EnvelopeResponse(ResponseSchema(code="400", status="Error", message="Cet post existe déjà"))
+    if integrity_violation(error) == FOREIGN_KEY_VIOLATION:
+        return EnvelopeResponse(ResponseSchema(code="400", status="Error", message="Utilisateur non trouvé"))
+    print(f"Violation de contrainte sur posts: {error}")
+    return EnvelopeResponse(ResponseSchema(code="500", status="Error", message=message))
+
+
 # ajout du post
-@router.post("/add_post")
+@router.post("/add_post", response_model=ResponseSchema)
 async def add_post(request: Register, db: Session = Depends(get_db)):
     try:
     # Vérification si les champs sont vides
       if not request.title or not request.content or not request.users_id:
-              return ResponseSchema(
+              return EnvelopeResponse(ResponseSchema(
                   code="400",
                   status="Error",
                   message="Veuillez remplir tous les champs obligatoires."
-              ).dict(exclude_none=True)
+              ))
 
-          # Vérification si l'email existe déjà
-      existing_post = db.query(Post).filter(Post.title == request.title).first()
-      if existing_post:
-          return ResponseSchema(
+      # insert data (l'unicité du titre est garantie par l'index unique)
+      post_id = await run_db(db, PostsRepo.create, request.title, request.content, request.users_id)
+      if post_id is None:
+          return EnvelopeResponse(ResponseSchema(
                   code="400",
                   status="Error",
                   message="Cet post existe déjà"
-              ).dict(exclude_none=True)
-      # insert data
-      post = Post(
-        title = request.title,
-        content = request.content,
-        users_id = request.users_id)
-        
-      PostsRepo.insert(db, post)
-      return ResponseSchema(code="200", status="Ok", message="Post enregisté avec succès.").dict(exclude_none=True)
+              ))
+      return EnvelopeResponse(ResponseSchema(code="200", status="Ok", message="Post enregisté avec succès."))
+    except IntegrityError as error:
+      return post_integrity_error(error, "Erreur du serveur")
     except Exception as error:
       print(error.args)
-      return ResponseSchema(code="500", status="Error", message="Erreur du serveur").dict(exclude_none=True)
+      return EnvelopeResponse(ResponseSchema(code="500", status="Error", message="Erreur du serveur"))
 
-# get all posts
-@router.get("/posts")
-async def get_all_posts(db: Session = Depends(get_db)):
+# get all posts (filtres par auteur et par dates, tri parmi SORT_KEYS)
+@router.get("/posts", response_model=ResponseSchema[List[PostOut]])
+async def get_all_posts(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    users_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    updated_since: Optional[datetime] = None,
+    sort: str = Query(DEFAULT_SORT, pattern=SORT_PATTERN),
+    db: Session = Depends(get_db)
+):
     try:
-        posts = AllPostsRepo.get_all(db, Post)
+        filters = dict(users_id=users_id, created_after=created_after, created_before=created_before, updated_since=updated_since)
 
-        post_out = [PostOut.from_orm(p) for p in posts]
-        return ResponseSchema(
+        posts, next_cursor = await run_db(db, AllPostsRepo.get_page, Post, limit, cursor, sort=sort, **filters)
+
+        # Requête conditionnelle : validateur calculé sur la page lue (ids, versions, auteurs,
+        # curseur suivant), sans agrégat sur la table ; 304 sans sérialiser
+        etag = make_etag("posts", request.url.query, next_cursor, *(
+            part for post in posts for part in (post.id, post.updated_at, post.users.username, post.users.email)
+        ))
+        headers = validator_headers(etag, None)
+        if is_not_modified(request, etag, None):
+            return not_modified(headers)
+
+        # Validation ORM -> PostOut en une passe, puis sérialisation directe en octets
+        return EnvelopeResponse(ResponseSchema[List[PostOut]](
             code="200",
             status="Ok",
             message="Liste des postes",
-            result=post_out
-        ).dict(exclude_none=True)
+            result=posts,
+            next_cursor=next_cursor
+        ), headers=headers)
+    except InvalidCursor:
+        return EnvelopeResponse(ResponseSchema(code="400", status="Error", message="Curseur invalide"))
     except Exception as error:
         print(error.args)
-        return ResponseSchema(
+        return EnvelopeResponse(ResponseSchema(
             code="500",
             status="Error",
             message="Erreur du serveur"
-        ).dict(exclude_none=True)
+        ))
     
+# Recherche plein texte classée par pertinence (déclarée avant /posts/{id})
+@router.get("/posts/search", response_model=ResponseSchema[List[PostSearchHit]])
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    try:
+        hits, next_cursor = await run_db(db, SearchPostsRepo.search, q, limit, cursor)
+        return EnvelopeResponse(ResponseSchema[List[PostSearchHit]](
+            code="200",
+            status="Ok",
+            message="Résultats de la recherche",
+            result=hits,
+            next_cursor=next_cursor
+        ))
+    except InvalidCursor:
+        return EnvelopeResponse(ResponseSchema(code="400", status="Error", message="Curseur invalide"))
+    except Exception as error:
+        print(error.args)
+        return EnvelopeResponse(ResponseSchema(code="500", status="Error", message="Erreur du serveur"))
+
+# Export en flux de tous les posts (NDJSON ou tableau JSON)
+@router.get("/export/posts")
+async def export_posts(format: str = Query("ndjson", pattern="^(ndjson|json)$")):
+    return StreamingResponse(
+        export_stream(ExportPostsRepo.export_query(), PostOut, format),
+        media_type=EXPORT_MEDIA_TYPES[format]
+    )
+
 # Obtenir un post
-@router.get("/posts/{id}")
-async def get_one_post(post_id: int, db: Session = Depends(get_db)):
-    post = GetOnePostRepo.get_one_post(db, Post, post_id)
+@router.get("/posts/{id}", response_model=ResponseSchema[PostOut])
+async def get_one_post(post_id: int, request: Request, db: Session = Depends(get_db)):
+    post = await run_db(db, GetOnePostRepo.get_one_post, Post, post_id)
 
     # Vérifie si le post existe
     if not post:
-        return ResponseSchema(code="404", status="Error", message="Post non trouvé").dict(exclude_none=True)
+        return EnvelopeResponse(ResponseSchema(code="404", status="Error", message="Post non trouvé"))
 
-     # Conversion ORM -> Pydantic # Affiche le resultat avec infos users dans post
-    post_out = PostOut.from_orm(post)
+    # ORM ou entrée du cache -> PostOut ; la version inclut l'auteur embarqué
+    post = PostOut.model_validate(post)
+    etag = make_etag("post", post.id, post.updated_at, post.users.id, post.users.username, post.users.email)
+    headers = validator_headers(etag, post.updated_at)
+    if is_not_modified(request, etag, post.updated_at):
+        return not_modified(headers)
 
-    # Affiche le resultat
-    return ResponseSchema(code="200", status="Ok", message="Post trouvé", result=post_out).dict(exclude_none=True)
+    # Affiche le resultat avec infos users dans post
+    return EnvelopeResponse(ResponseSchema[PostOut](code="200", status="Ok", message="Post trouvé", result=post), headers=headers)
 
 @router.get("/count-by-user", response_model=list[PostCountResponse])
-def get_posts_count_by_user(db: Session = Depends(get_db)):
-    return CountPostByUser.get_post_count_by_user(db)
+async def get_posts_count_by_user(db: Session = Depends(get_db)):
+    return await run_db(db, CountPostByUser.get_post_count_by_user)
 
 # Mise à jour du post
-@router.put("/update_posts/{id}")
+@router.put("/update_posts/{id}", response_model=ResponseSchema[PostRecord])
 async def update_post(
     id: int,
     post_update: PostUpdateSchema,
@@ -91,38 +164,79 @@ async def update_post(
     try:
         # Convert Pydantic model to dict, excluding unset values
         update_data = post_update.dict(exclude_unset=True)
-        
-        # First check if post exists
-        existing_post = GetOnePostRepo.get_one_post(db, Post, id)
-        if not existing_post:
-            return ResponseSchema(
+
+        # UPDATE ... RETURNING : None si le post n'existe pas
+        updated_post = await run_db(db, UpdatePost.update_post, Post, id, update_data)
+        if not updated_post:
+            return EnvelopeResponse(ResponseSchema(
                 code="404",
                 status="Error", 
                 message="Post non trouvé"
-            ).dict(exclude_none=True)
-            
-        # Proceed with update if post exists
-        updated_post = UpdatePost.update_post(db, Post, id, update_data)
-        return ResponseSchema(
+            ))
+
+        return EnvelopeResponse(ResponseSchema[PostRecord](
             code="200",
             status="Ok",
             message="Post mis à jour avec succès",
             result= updated_post
-        ).dict(exclude_none=True)
-        
+        ))
+
+    # Index unique sur le titre ou auteur inconnu : mêmes réponses qu'à la création
+    except IntegrityError as error:
+        return post_integrity_error(error, "Erreur lors de la mise à jour")
     except Exception as error:
         print(f"Erreur de la mise à jour du post: {str(error)}")
-        return ResponseSchema(
+        return EnvelopeResponse(ResponseSchema(
             code="500",
             status="Error",
             message="Erreur lors de la mise à jour"
-        ).dict(exclude_none=True)
+        ))
     
 # Suppression de l'user par l'id
-@router.delete("/delete_post/{id}")
+@router.delete("/delete_post/{id}", response_model=ResponseSchema)
 async def delete_post(post_id: int, db: Session = Depends(get_db)):
-    user = DeletePost.delete_post(db, post_id)
+    user = await run_db(db, DeletePost.delete_post, post_id)
     if not user:
-        return ResponseSchema(code="404", status="Error", message="Post non trouvé").dict(exclude_none=True)
+        return EnvelopeResponse(ResponseSchema(code="404", status="Error", message="Post non trouvé"))
 
-    return ResponseSchema(code="200", status="Ok", message="Post supprimé avec succès").dict(exclude_none=True)
\ No newline at end of file
+    return EnvelopeResponse(ResponseSchema(code="200", status="Ok", message="Post supprimé avec succès"))
+
+# ========================
+# Écritures en lot
+# ========================
+@router.post("/bulk/posts", response_model=ResponseSchema[BulkResult])
+async def bulk_add_posts(items: List[Any] = Body(..., max_length=BULK_MAX_ITEMS), db: Session = Depends(get_db)):
+    try:
+        report = BulkReport(len(items))
+        valid = validate_items(Register, items, report)
+        await run_db(db, BulkPostsRepo.create_many, valid, report)
+        return bulk_response(report, "Posts enregistrés")
+    except IntegrityError as error:
+        return bulk_conflict(error)
+    except Exception as error:
+        print(f"Erreur de l'ajout des posts en lot: {error}")
+        return EnvelopeResponse(ResponseSchema(code="500", status="Error", message="Erreur du serveur"))
+
+@router.put("/bulk/posts", response_model=ResponseSchema[BulkResult])
+async def bulk_update_posts(items: List[Any] = Body(..., max_length=BULK_MAX_ITEMS), db: Session = Depends(get_db)):
+    try:
+        report = BulkReport(len(items))
+        valid = validate_items(PostBulkUpdateSchema, items, report, exclude_unset=True)
+        await run_db(db, BulkPostsRepo.update_many, valid, report)
+        return bulk_response(report, "Posts mis à jour")
+    except IntegrityError as error:
+        return bulk_conflict(error)
+    except Exception as error:
+        print(f"Erreur de la mise à jour des posts en lot: {error}")
+        return EnvelopeResponse(ResponseSchema(code="500", status="Error", message="Erreur lors de la mise à jour"))
+
+# POST : un corps de requête sur DELETE n'a pas de sémantique définie (proxies, clients)
+@router.post("/bulk/posts/delete", response_model=ResponseSchema[BulkResult])
+async def bulk_delete_posts(ids: List[int] = Body(..., max_length=BULK_MAX_ITEMS), db: Session = Depends(get_db)):
+    try:
+        report = BulkReport(len(ids))
+        await run_db(db, BulkPostsRepo.delete_many, list(enumerate(ids)), report)
+        return bulk_response(report, "Posts supprimés")
+    except Exception as error:
+        print(f"Erreur de la suppression des posts en lot: {error}")
+        return EnvelopeResponse(ResponseSchema(code="500", status="Error", message="Erreur du serveur"))
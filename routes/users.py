@@ -1,47 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from schemas.users import  ResponseSchema, UserUpdateSchema, ChangePassword
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, List, Optional
+from schemas.users import  ResponseSchema, Register, UserBulkUpdateSchema, UserUpdateSchema, ChangePassword, UserOut
+from schemas.responses import BulkResult, EnvelopeResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from config import get_db
-from passlib.context import CryptContext
-from repository.users import AllUsersRepo, GetOneUserRepo, UpdateUser, DeleteUser
+from config import get_db, run_db
+from repository.bulk import BULK_MAX_ITEMS, BulkReport, bulk_conflict, bulk_response, validate_items
+from repository.users import UsersRepo, AllUsersRepo, BulkUsersRepo, ExportUsersRepo, GetOneUserRepo, UpdateUser, DeleteUser
+from repository.hashing import hasher, HashingPoolSaturated
+from repository.rate_limit import rate_limited
+from repository.revocation import revoke_user
+from repository.tokens import RefreshTokenRepo
+from repository.conditional import is_not_modified, make_etag, not_modified, validator_headers
+from repository.export import EXPORT_MEDIA_TYPES, export_stream
+from repository.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor
 from models.models import Users
 
 router = APIRouter(tags={"Users"})
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # get all users
-@router.get("/users")
-async def get_all_users(db: Session = Depends(get_db)):
+@router.get("/users", response_model=ResponseSchema[List[UserOut]])
+async def get_all_users(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     try:
-        users = AllUsersRepo.get_all(db, Users)
-        return ResponseSchema(
+        users, next_cursor = await run_db(db, AllUsersRepo.get_page, Users, limit, cursor)
+
+        # Requête conditionnelle : validateur calculé sur la page lue, sans agrégat sur la table
+        etag = make_etag("users", request.url.query, next_cursor, *(part for user in users for part in (user.id, user.updated_at)))
+        headers = validator_headers(etag, None)
+        if is_not_modified(request, etag, None):
+            return not_modified(headers)
+        return EnvelopeResponse(ResponseSchema[List[UserOut]](
             code="200",
             status="Ok",
             message="Liste des utilisateurs",
-            result=users
-        ).dict(exclude_none=True)
+            result=users,
+            next_cursor=next_cursor
+        ), headers=headers)
+    except InvalidCursor:
+        return EnvelopeResponse(ResponseSchema(code="400", status="Error", message="Curseur invalide"))
     except Exception as error:
         print(error.args)
-        return ResponseSchema(
+        return EnvelopeResponse(ResponseSchema(
             code="500",
             status="Error",
             message="Erreur du serveur"
-        ).dict(exclude_none=True)   
+        ))   
     
 
+# Export en flux de tous les utilisateurs (NDJSON ou tableau JSON)
+@router.get("/export/users")
+async def export_users(format: str = Query("ndjson", pattern="^(ndjson|json)$")):
+    return StreamingResponse(
+        export_stream(ExportUsersRepo.export_query(), UserOut, format),
+        media_type=EXPORT_MEDIA_TYPES[format]
+    )
+
 # Obtenir un user par son id
-@router.get("/users/{id}")
-async def get_one_user(user_id: int, db: Session = Depends(get_db)):
-    user = GetOneUserRepo.get_one_user(db, Users, user_id)
+@router.get("/users/{id}", response_model=ResponseSchema[UserOut])
+async def get_one_user(user_id: int, request: Request, db: Session = Depends(get_db)):
+    user = await run_db(db, GetOneUserRepo.get_one_user, Users, user_id)
     
     if not user:
-        return ResponseSchema(code="404", status="Error", message="Utilisateur non trouvé").dict(exclude_none=True)
+        return EnvelopeResponse(ResponseSchema(code="404", status="Error", message="Utilisateur non trouvé"))
+
+    # ORM ou entrée du cache -> UserOut ; updated_at suffit comme version
+    user = UserOut.model_validate(user)
+    etag = make_etag("user", user.id, user.updated_at)
+    headers = validator_headers(etag, user.updated_at)
+    if is_not_modified(request, etag, user.updated_at):
+        return not_modified(headers)
 
-    return ResponseSchema(code="200", status="Ok", message="Utilisateur trouvé", result=user).dict(exclude_none=True)
+    return EnvelopeResponse(ResponseSchema[UserOut](code="200", status="Ok", message="Utilisateur trouvé", result=user), headers=headers)
 
 # Mise à jour 
-@router.put("/update_users/{id}")
+@router.put("/update_users/{id}", response_model=ResponseSchema[UserOut])
 async def update_user(
     id: int,
     user_update: UserUpdateSchema,
@@ -50,100 +88,150 @@ async def update_user(
     try:
         update_data = user_update.dict(exclude_unset=True)
 
-        # Vérifie si l'utilisateur existe
-        existing_user = GetOneUserRepo.get_one_user(db, Users, id)
-        if not existing_user:
-            return ResponseSchema(
+        # Hash le mot de passe hors de la boucle d'événements
+        if update_data.get("password") is not None:
+            update_data["password"] = await hasher.hash(update_data["password"])
+
+        # Mise à jour dans la base (UPDATE ... RETURNING, None si l'utilisateur n'existe pas)
+        updated_user = await run_db(db, UpdateUser.update_user, Users, id, update_data)
+        if not updated_user:
+            return EnvelopeResponse(ResponseSchema(
                 code="404",
                 status="Error",
                 message="Utilisateur non trouvé"
-            ).dict(exclude_none=True)
-
-        # Mise à jour dans la base
-        updated_user = UpdateUser.update_user(db, Users, id, update_data)
+            ))
 
-        return ResponseSchema(
+        return EnvelopeResponse(ResponseSchema[UserOut](
             code="200",
             status="OK",
             message="Utilisateur mis à jour avec succès",
             result=updated_user
-        ).dict(exclude_none=True)
+        ))
 
     except Exception as error:
         print(f"Erreur lors de la mise à jour de l'utilisateur : {str(error)}")
-        return ResponseSchema(
+        return EnvelopeResponse(ResponseSchema(
             code="500",
             status="Error",
             message="Erreur interne du serveur"
-        ).dict(exclude_none=True)
+        ))
 
 # Modifier le password par l'email
-@router.put("/change_password_by_email")
+@router.put("/change_password_by_email", response_model=ResponseSchema, dependencies=[rate_limited("email")])
 async def change_password_by_email(data: ChangePassword, db: Session = Depends(get_db)):
     try:
         # Cherche l'utilisateur par email
-        user = db.query(Users).filter(Users.email == data.email).first()
+        user = await run_db(db, UsersRepo.find_by_email, data.email)
         if not user:
             raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
 
         # Vérifie l'ancien mot de passe
-        if not pwd_context.verify(data.old_password, user.password):
+        if not await hasher.verify(data.old_password, user.password):
             raise HTTPException(status_code=400, detail="Ancien mot de passe incorrect")
 
-        # Hash le nouveau mot de passe
-        user.password = pwd_context.hash(data.new_password)
+        # Hash le nouveau mot de passe puis met à jour en base
+        hashed_password = await hasher.hash(data.new_password)
+        await run_db(db, UsersRepo.set_password, user, hashed_password)
 
-        # Met à jour en base
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+        # Les sessions existantes (tokens d'accès et refresh tokens) sont révoquées
+        revoke_user(user.username)
+        await run_db(db, RefreshTokenRepo.revoke_user, user.id)
 
         # Réponse
-        return ResponseSchema(
+        return EnvelopeResponse(ResponseSchema(
             code="200",
             status="OK",
             message="Mot de passe changé avec succès"
-        ).dict(exclude_none=True)
+        ))
+
+    except HashingPoolSaturated:
+        raise
 
     except HTTPException as http_error:
-        return ResponseSchema(
+        return EnvelopeResponse(ResponseSchema(
             code=str(http_error.status_code),
             status="Error",
             message=http_error.detail
-        ).dict(exclude_none=True)
+        ))
 
     except Exception as e:
         print(f"Erreur serveur: {e}")
-        return ResponseSchema(
+        return EnvelopeResponse(ResponseSchema(
             code="500",
             status="Error",
             message="Erreur interne du serveur"
-        ).dict(exclude_none=True)
+        ))
 
 
 # Suppression de l'user par l'id
-@router.delete("/delete_users/{id}")
+@router.delete("/delete_users/{id}", response_model=ResponseSchema)
 async def delete_user(id: int, db: Session = Depends(get_db)):
     try:
         # Tentative de suppression de l'utilisateur
-        deleted = DeleteUser.delete_user(db, id)
+        deleted = await run_db(db, DeleteUser.delete_user, id)
 
         if not deleted:
-            return ResponseSchema(
+            return EnvelopeResponse(ResponseSchema(
                 code="404",
                 status="Error",
                 message="Utilisateur non trouvé"
-            ).dict(exclude_none=True)
+            ))
 
-        return ResponseSchema(
+        return EnvelopeResponse(ResponseSchema(
             code="200",
             status="OK",
             message="Utilisateur supprimé avec succès"
-        ).dict(exclude_none=True)
+        ))
     except Exception as error:
         print(f"Erreur lors de la suppression de l'utilisateur : {str(error)}")
-        return ResponseSchema(
+        return EnvelopeResponse(ResponseSchema(
             code="500",
             status="Error",
             message="Erreur interne du serveur"
-        ).dict(exclude_none=True)
\ No newline at end of file
+        ))
+
+# ========================
+# Écritures en lot
+# ========================
+@router.post("/bulk/users", response_model=ResponseSchema[BulkResult])
+async def bulk_add_users(items: List[Any] = Body(..., max_length=BULK_MAX_ITEMS), db: Session = Depends(get_db)):
+    try:
+        report = BulkReport(len(items))
+        valid = validate_items(Register, items, report)
+        # Hachage borné au quota des lots du pool (voir repository.hashing)
+        hashed = await hasher.hash_many([data["password"] for _, data in valid])
+        for (_, data), password in zip(valid, hashed):
+            data["password"] = password
+        await run_db(db, BulkUsersRepo.create_many, valid, report)
+        return bulk_response(report, "Utilisateurs enregistrés")
+    except HashingPoolSaturated:
+        raise
+    except IntegrityError as error:
+        return bulk_conflict(error)
+    except Exception as error:
+        print(f"Erreur lors de l'ajout des utilisateurs en lot : {error}")
+        return EnvelopeResponse(ResponseSchema(code="500", status="Error", message="Erreur interne du serveur"))
+
+@router.put("/bulk/users", response_model=ResponseSchema[BulkResult])
+async def bulk_update_users(items: List[Any] = Body(..., max_length=BULK_MAX_ITEMS), db: Session = Depends(get_db)):
+    try:
+        report = BulkReport(len(items))
+        valid = validate_items(UserBulkUpdateSchema, items, report, exclude_unset=True)
+        await run_db(db, BulkUsersRepo.update_many, valid, report)
+        return bulk_response(report, "Utilisateurs mis à jour")
+    except IntegrityError as error:
+        return bulk_conflict(error)
+    except Exception as error:
+        print(f"Erreur lors de la mise à jour des utilisateurs en lot : {error}")
+        return EnvelopeResponse(ResponseSchema(code="500", status="Error", message="Erreur interne du serveur"))
+
+# POST : un corps de requête sur DELETE n'a pas de sémantique définie (proxies, clients)
+@router.post("/bulk/users/delete", response_model=ResponseSchema[BulkResult])
+async def bulk_delete_users(ids: List[int] = Body(..., max_length=BULK_MAX_ITEMS), db: Session = Depends(get_db)):
+    try:
+        report = BulkReport(len(ids))
+        await run_db(db, BulkUsersRepo.delete_many, list(enumerate(ids)), report)
+        return bulk_response(report, "Utilisateurs supprimés")
+    except Exception as error:
+        print(f"Erreur lors de la suppression des utilisateurs en lot : {error}")
+        return EnvelopeResponse(ResponseSchema(code="500", status="Error", message="Erreur interne du serveur"))
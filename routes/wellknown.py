@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Response
+
+from repository.keys import JWKS_MAX_AGE, key_set
+
+router = APIRouter(tags={"Well-known"})
+
+
+# Clés publiques de vérification des tokens (JWKS), pour les passerelles et services tiers
+@router.get("/.well-known/jwks.json")
+async def jwks():
+    return Response(
+        content=key_set.jwks(),
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={JWKS_MAX_AGE}"},
+    )
@@ -16,6 +16,10 @@ class PostUpdateSchema(BaseModel):
   content: Optional[str] = None
   users_id: Optional[int] = None
 
+# PostUpdate en lot : l'id désigne le post à modifier
+class PostBulkUpdateSchema(PostUpdateSchema):
+  id: int
+
 class UserBase(BaseModel):
     id: int
     username: str
@@ -36,6 +40,23 @@ class PostOut(BaseModel):
     class Config:
         from_attributes=True
 
+# Résultat de recherche : post, score et extraits surlignés (<mark>)
+class PostSearchHit(BaseModel):
+    post: PostOut
+    rank: float
+    # Fragments HTML : texte échappé, correspondances entre <mark> et </mark>
+    title: str = Field(..., description="Titre en HTML échappé, correspondances entre <mark> et </mark>")
+    snippet: str = Field(..., description="Extrait du contenu en HTML échappé, correspondances entre <mark> et </mark>")
+
+# Colonnes d'un post après mise à jour (UPDATE ... RETURNING)
+class PostRecord(BaseModel):
+    id: int
+    title: str
+    content: str
+    users_id: int
+    created_at: datetime
+    updated_at: datetime
+
 # UserUpdate
 class UserPostSchema(BaseModel):
   title: Optional[str] = None
@@ -56,6 +77,7 @@ class ResponseSchema(BaseModel, Generic[T]):
   status: str
   message: str
   result: Optional[T] = None
+  next_cursor: Optional[str] = None
 
   class Config:
         from_attributes = True  # permet de convertir automatiquement les objets ORM
\ No newline at end of file
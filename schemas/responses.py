@@ -0,0 +1,32 @@
+from typing import Any, List, Optional
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from repository.metrics import record_envelope_code
+
+
+class EnvelopeResponse(JSONResponse):
+    """
+    Réponse JSON écrite en une passe par pydantic-core : un ResponseSchema
+    est sérialisé directement en octets (exclude_none), sans dict
+    intermédiaire, sans jsonable_encoder ni json.dumps.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            # Les erreurs sont servies en HTTP 200 : le code de l'enveloppe alimente api_errors_total
+            record_envelope_code(getattr(content, "code", None))
+            return content.__pydantic_serializer__.to_json(content, exclude_none=True)
+        return to_json(content)
+
+
+# Résultat des écritures en lot (voir repository.bulk)
+class BulkItemError(BaseModel):
+    index: int
+    message: str
+
+class BulkResult(BaseModel):
+    ids: List[Optional[int]]
+    errors: List[BulkItemError]
@@ -23,6 +23,10 @@ class UserUpdateSchema(BaseModel):
   email: Optional[str] = None
   phone: Optional[str] = None
 
+# UserUpdate en lot : l'id désigne l'utilisateur à modifier
+class UserBulkUpdateSchema(UserUpdateSchema):
+  id: int
+
 class UserOut(BaseModel):
     id: int
     username: str
@@ -57,6 +61,7 @@ class ResponseSchema(BaseModel, Generic[T]):
   status: str
   message: str
   result: Optional[T] = None
+  next_cursor: Optional[str] = None
 
   class Config:
         from_attributes = True  # permet de convertir automatiquement les objets ORM
@@ -65,4 +70,14 @@ class ResponseSchema(BaseModel, Generic[T]):
 #Token
 class TokenResponse(BaseModel):
   access_token: str
-  token_type: str
\ No newline at end of file
+  token_type: str
+  refresh_token: Optional[str] = None
+  expires_in: Optional[int] = None
+
+# Renouvellement du token d'accès
+class RefreshRequest(BaseModel):
+  refresh_token: str = Field(..., min_length=1, max_length=128)
+
+# Déconnexion : le refresh token est facultatif
+class LogoutRequest(BaseModel):
+  refresh_token: Optional[str] = Field(None, max_length=128)
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+Calibration du coût de hachage des mots de passe : mesure la vérification
+sur la machine courante et retient le coût le plus élevé dont la médiane
+reste sous la latence cible. Affiche les variables d'environnement à poser.
+
+    python scripts/calibrate_hashing.py --target-ms 250
+    python scripts/calibrate_hashing.py --scheme argon2 --target-ms 300 --memory-kib 65536
+
+Les hashs existants sont mis à niveau au login suivant (rehash transparent).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from repository.hashing import build_context  # noqa: E402
+
+PASSWORD = "calibration-password"
+
+
+def verify_ms(context, samples: int) -> float:
+    hashed = context.hash(PASSWORD)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(args):
+    best = None
+    # Chaque round double le coût : on s'arrête au premier dépassement
+    for rounds in range(args.min_rounds, 32):
+        elapsed = verify_ms(build_context(["bcrypt"], bcrypt_rounds=rounds), args.samples)
+        print(f"  bcrypt rounds={rounds:<3} {elapsed:8.1f} ms")
+        if elapsed > args.target_ms:
+            break
+        best = rounds
+    if best is None:
+        print(f"Cible trop basse : même {args.min_rounds} rounds dépassent {args.target_ms} ms")
+        return 1
+    print(f"\nPASSWORD_SCHEMES=bcrypt\nBCRYPT_ROUNDS={best}")
+    return 0
+
+
+def calibrate_argon2(args):
+    best = None
+    for time_cost in range(1, 33):
+        context = build_context(["argon2"], argon2_time_cost=time_cost,
+                                argon2_memory_cost=args.memory_kib, argon2_parallelism=args.parallelism)
+        elapsed = verify_ms(context, args.samples)
+        print(f"  argon2 time_cost={time_cost:<3} {elapsed:8.1f} ms")
+        if elapsed > args.target_ms:
+            break
+        best = time_cost
+    if best is None:
+        print(f"Cible trop basse pour {args.memory_kib} Kio : réduire --memory-kib")
+        return 1
+    # bcrypt reste listé pour vérifier (puis migrer) les anciens hashs
+    print(f"\nPASSWORD_SCHEMES=argon2,bcrypt\nARGON2_TIME_COST={best}"
+          f"\nARGON2_MEMORY_COST={args.memory_kib}\nARGON2_PARALLELISM={args.parallelism}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scheme", choices=("bcrypt", "argon2"), default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250, help="latence de vérification visée")
+    parser.add_argument("--samples", type=int, default=5, help="mesures par coût")
+    parser.add_argument("--min-rounds", type=int, default=10, help="plancher bcrypt")
+    parser.add_argument("--memory-kib", type=int, default=65536, help="mémoire argon2")
+    parser.add_argument("--parallelism", type=int, default=4, help="parallélisme argon2")
+    args = parser.parse_args()
+    print(f"Cible : {args.target_ms} ms par vérification ({args.scheme})")
+    if args.scheme == "argon2":
+        return calibrate_argon2(args)
+    return calibrate_bcrypt(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
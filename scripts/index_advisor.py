@@ -0,0 +1,247 @@
+"""
+Conseiller d'index : exécute chaque requête des repositories dans une
+transaction annulée, capture le SQL émis, puis lance EXPLAIN sur chaque
+SELECT/UPDATE/DELETE et signale les parcours séquentiels sur les tables
+dépassant un seuil de lignes. Les requêtes de maintenance qui lisent toute
+une table par construction (FULL_SCANS) sont affichées sans être signalées.
+
+    python scripts/index_advisor.py --min-rows 10000
+
+Code de sortie 1 si au moins un parcours séquentiel est signalé.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, event, func, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from config import engine  # noqa: E402
+from models.models import Post, RefreshToken, Users  # noqa: E402
+from repository.bulk import BulkReport  # noqa: E402
+from repository.posts import (  # noqa: E402
+    AllPostsRepo, BulkPostsRepo, CountPostByUser, DeletePost, GetOnePostRepo, PostCounterRepo, PostsRepo,
+    SearchPostsRepo, UpdatePost,
+)
+from repository.tokens import RefreshTokenError, RefreshTokenRepo  # noqa: E402
+from repository.users import AllUsersRepo, BulkUsersRepo, DeleteUser, GetOneUserRepo, UpdateUser, UsersRepo  # noqa: E402
+
+# Vérification / reconstruction de tous les compteurs : parcours complet attendu
+FULL_SCANS = {"PostCounterRepo.check", "PostCounterRepo.rebuild"}
+
+
+def unwrap(method):
+    # Contourne le cache-aside pour atteindre la requête SQL
+    return getattr(method, "fn", method)
+
+
+def repository_calls(db: Session):
+    """Appels représentatifs de chaque méthode de repository."""
+    post = db.execute(select(Post).limit(1)).scalar_one_or_none()
+    user = db.execute(select(Users).limit(1)).scalar_one_or_none()
+    post_id = post.id if post else 1
+    post_title = post.title if post else "inconnu"
+    user_id = user.id if user else 1
+    username = user.username if user else "inconnu"
+    email = user.email if user else "inconnu@example.com"
+
+    _, posts_cursor = AllPostsRepo.get_page(db, Post, 1)
+    _, users_cursor = AllUsersRepo.get_page(db, Users, 1)
+    # Dernier mot d'un titre existant : présent dans l'index plein texte
+    search_text = post_title.split()[-1] if post else "inconnu"
+    _, search_cursor = SearchPostsRepo.search(db, search_text, 1)
+
+    # Jetons de rafraîchissement : l'un est tourné puis révoqué, l'autre rejoué (réutilisation)
+    tokens = {}
+
+    def rotate():
+        tokens["issued"] = RefreshTokenRepo.issue(db, user_id)
+        _, tokens["rotated"] = RefreshTokenRepo.rotate(db, tokens["issued"])
+
+    def replay():
+        try:
+            RefreshTokenRepo.rotate(db, tokens["issued"])
+        except RefreshTokenError:
+            pass
+
+    # Écritures en lot sur des lignes créées pour l'occasion (ids lus dans le rapport)
+    bulk = {}
+
+    def bulk_create():
+        report = BulkReport(2)
+        BulkUsersRepo.create_many(db, [(i, {"username": f"advisor{i}", "email": f"advisor{i}@example.com",
+                                            "phone": "0000000000", "password": "x"}) for i in range(2)], report)
+        bulk["users"] = [id for id in report.ids if id]
+        report = BulkReport(2)
+        BulkPostsRepo.create_many(db, [(i, {"title": f"index advisor {i}", "content": "index advisor",
+                                            "users_id": bulk["users"][0]}) for i in range(2)], report)
+        bulk["posts"] = [id for id in report.ids if id]
+
+    return [
+        ("UsersRepo.find_by_username", lambda: UsersRepo.find_by_username(db, username)),
+        ("UsersRepo.find_by_email", lambda: UsersRepo.find_by_email(db, email)),
+        ("UsersRepo.exists", lambda: UsersRepo.exists(db, username, email)),
+        ("AllUsersRepo.get_page", lambda: AllUsersRepo.get_page(db, Users, 50)),
+        ("AllUsersRepo.get_page(cursor)", lambda: users_cursor and AllUsersRepo.get_page(db, Users, 50, users_cursor)),
+        ("GetOneUserRepo.get_one_user", lambda: unwrap(GetOneUserRepo.get_one_user)(db, Users, user_id)),
+        ("PostsRepo.find_by_title", lambda: PostsRepo.find_by_title(db, post_title)),
+        ("AllPostsRepo.get_page", lambda: AllPostsRepo.get_page(db, Post, 50)),
+        ("AllPostsRepo.get_page(cursor)", lambda: posts_cursor and AllPostsRepo.get_page(db, Post, 50, posts_cursor)),
+        ("AllPostsRepo.get_page(users_id)", lambda: AllPostsRepo.get_page(db, Post, 50, users_id=user_id)),
+        ("AllPostsRepo.get_page(users_id, created_after)", lambda: AllPostsRepo.get_page(
+            db, Post, 50, users_id=user_id, created_after=datetime.utcnow() - timedelta(days=30))),
+        ("AllPostsRepo.get_page(updated_since)", lambda: AllPostsRepo.get_page(
+            db, Post, 50, updated_since=datetime.utcnow() - timedelta(days=1), sort="updated_at")),
+        ("GetOnePostRepo.get_one_post", lambda: unwrap(GetOnePostRepo.get_one_post)(db, Post, post_id)),
+        ("CountPostByUser.get_post_count_by_user", lambda: unwrap(CountPostByUser.get_post_count_by_user)(db)),
+        ("SearchPostsRepo.search", lambda: SearchPostsRepo.search(db, search_text, 20)),
+        ("SearchPostsRepo.search(cursor)", lambda: search_cursor and SearchPostsRepo.search(db, search_text, 20, search_cursor)),
+        ("RefreshTokenRepo.issue/rotate", rotate),
+        ("RefreshTokenRepo.rotate(réutilisation)", replay),
+        ("RefreshTokenRepo.revoke", lambda: RefreshTokenRepo.revoke(db, tokens["rotated"])),
+        ("RefreshTokenRepo.revoke_user", lambda: RefreshTokenRepo.revoke_user(db, user_id)),
+        ("RefreshTokenRepo.purge_expired", lambda: RefreshTokenRepo.purge_expired(db)),
+        ("BulkUsersRepo/BulkPostsRepo.create_many", bulk_create),
+        ("BulkPostsRepo.update_many", lambda: BulkPostsRepo.update_many(
+            db, [(i, {"id": id, "content": "index advisor", "users_id": bulk["users"][-1]}) for i, id in enumerate(bulk["posts"])],
+            BulkReport(len(bulk["posts"])))),
+        ("BulkUsersRepo.update_many", lambda: BulkUsersRepo.update_many(
+            db, [(i, {"id": id, "username": f"advisor-renamed{i}"}) for i, id in enumerate(bulk["users"])],
+            BulkReport(len(bulk["users"])))),
+        ("BulkPostsRepo.delete_many", lambda: BulkPostsRepo.delete_many(
+            db, list(enumerate(bulk["posts"])), BulkReport(len(bulk["posts"])))),
+        ("BulkUsersRepo.delete_many", lambda: BulkUsersRepo.delete_many(
+            db, list(enumerate(bulk["users"])), BulkReport(len(bulk["users"])))),
+        ("PostCounterRepo.check", lambda: PostCounterRepo.check(db)),
+        ("PostCounterRepo.rebuild", lambda: PostCounterRepo.rebuild(db)),
+        ("UpdatePost.update_post", lambda: UpdatePost.update_post(db, Post, post_id, {"content": "index advisor"})),
+        ("UpdateUser.update_user", lambda: UpdateUser.update_user(db, Users, user_id, {"phone": "0000000000"})),
+        ("DeletePost.delete_post", lambda: DeletePost.delete_post(db, post_id)),
+        ("DeleteUser.delete_user", lambda: DeleteUser.delete_user(db, user_id)),
+    ]
+
+
+def capture_statements(conn):
+    """Exécute les appels dans un savepoint et retourne [(méthode, sql, params)]."""
+    captured = []
+    current = {"name": None}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current["name"]:
+            # executemany (UPDATE en lot) : le plan est le même pour chaque jeu de paramètres
+            captured.append((current["name"], statement, parameters[0] if executemany else parameters))
+
+    db = Session(bind=conn, join_transaction_mode="create_savepoint")
+    calls = repository_calls(db)
+    event.listen(conn, "before_cursor_execute", before_cursor_execute)
+    try:
+        for name, call in calls:
+            current["name"] = name
+            try:
+                call()
+            except Exception as error:
+                print(f"[ignoré] {name}: {error}", file=sys.stderr)
+                db.rollback()
+    finally:
+        current["name"] = None
+        event.remove(conn, "before_cursor_execute", before_cursor_execute)
+        db.close()
+    return captured
+
+
+def table_sizes(conn) -> dict:
+    sizes = {}
+    for table in (Users.__table__, Post.__table__, RefreshToken.__table__):
+        if conn.dialect.name == "postgresql":
+            sizes[table.name] = conn.exec_driver_sql(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %(name)s", {"name": table.name}
+            ).scalar() or 0
+        else:
+            sizes[table.name] = conn.execute(select(func.count()).select_from(table)).scalar()
+    return sizes
+
+
+def sequential_scans(conn, statement, parameters):
+    """Tables parcourues séquentiellement par la requête, selon le plan."""
+    if conn.dialect.name == "postgresql":
+        plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        found = []
+
+        def walk(node):
+            if node.get("Node Type") == "Seq Scan":
+                found.append(node.get("Relation Name"))
+            for child in node.get("Plans", []):
+                walk(child)
+
+        walk(plan[0]["Plan"])
+        return found
+
+    # SQLite : "SCAN <table>" sans index, contre "SEARCH ... USING INDEX"
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    found = []
+    for row in rows:
+        detail = row[-1]
+        if detail.startswith("SCAN ") and "USING" not in detail:
+            found.append(detail.split()[1])
+    return found
+
+
+def advisor_engine():
+    """
+    Moteur dédié. Pour SQLite, le pilote pysqlite gère mal les SAVEPOINT :
+    on prend la main sur BEGIN pour que le rollback final annule vraiment
+    les commits faits par les repositories.
+    """
+    if engine.dialect.name != "sqlite":
+        return engine
+    sqlite_engine = create_engine(engine.url)
+
+    @event.listens_for(sqlite_engine, "connect")
+    def disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(sqlite_engine, "begin")
+    def emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return sqlite_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-rows", type=int, default=10000, help="taille de table à partir de laquelle un seq scan est signalé")
+    args = parser.parse_args()
+
+    with advisor_engine().connect() as conn:
+        outer = conn.begin()
+        try:
+            sizes = table_sizes(conn)
+            captured = capture_statements(conn)
+            flagged = 0
+            for name, statement, parameters in captured:
+                if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+                    continue
+                scans = sequential_scans(conn, statement, parameters)
+                big = [t for t in scans if sizes.get(t, 0) >= args.min_rows]
+                if big and name in FULL_SCANS:
+                    print(f"{'scan complet (attendu)':<28} {name}")
+                    continue
+                status = "SEQ SCAN " + ", ".join(big) if big else "ok"
+                flagged += bool(big)
+                print(f"{status:<28} {name}")
+                if big:
+                    print("    " + " ".join(statement.split()))
+        finally:
+            outer.rollback()
+
+    print(f"\nTailles : {sizes} ; seuil : {args.min_rows} lignes ; requêtes signalées : {flagged}")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
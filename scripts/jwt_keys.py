@@ -0,0 +1,134 @@
+"""
+Gestion des clés de signature JWT (RS256 / ES256) dans JWT_KEYS_DIR.
+
+    python scripts/jwt_keys.py generate --algorithm RS256   # nouvelle clé, publiée puis active
+    python scripts/jwt_keys.py list                         # état de chaque clé
+    python scripts/jwt_keys.py retire 20261018-0915         # ne garde que la clé publique
+
+Rotation en deux temps :
+1. générer une nouvelle clé : les workers la relisent (JWT_KEYS_RELOAD_INTERVAL)
+   et la publient dans le JWKS, mais continuent de signer avec l'ancienne ;
+2. après JWT_KEY_ACTIVATION_DELAY (défaut : max-age du JWKS + intervalle de
+   relecture), chaque vérificateur a reçu la clé et elle devient la clé de
+   signature, sans redémarrage. JWT_ACTIVE_KID permet de forcer la bascule.
+Ensuite, attendre l'expiration des tokens signés par l'ancienne clé, la
+retirer, puis supprimer son ".pub.pem" une fois ces tokens expirés.
+
+La date de création d'une clé est le mtime de son fichier : la préserver
+(cp -p, rsync -t) si les clés sont copiées vers les serveurs.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+KEYS_DIR = os.getenv("JWT_KEYS_DIR", "keys")
+# Mêmes valeurs par défaut que repository/keys.py
+ACTIVATION_DELAY = float(os.getenv(
+    "JWT_KEY_ACTIVATION_DELAY",
+    float(os.getenv("JWKS_MAX_AGE", 300)) + float(os.getenv("JWT_KEYS_RELOAD_INTERVAL", 30)),
+))
+
+
+def generate_private_key(algorithm: str):
+    if algorithm.startswith("RS"):
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    if algorithm == "ES256":
+        return ec.generate_private_key(ec.SECP256R1())
+    raise SystemExit(f"Algorithme non supporté : {algorithm} (RS256, RS384, RS512 ou ES256)")
+
+
+def generate(args):
+    os.makedirs(args.dir, exist_ok=True)
+    kid = args.kid or datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(args.dir, f"{kid}.pem")
+    if os.path.exists(path):
+        raise SystemExit(f"La clé {kid} existe déjà")
+    pem = generate_private_key(args.algorithm).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    )
+    # Clé privée lisible par le seul propriétaire
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(pem)
+    others = [name for name in os.listdir(args.dir) if name.endswith(".pem") and not name.endswith(".pub.pem") and name != f"{kid}.pem"]
+    if not others:
+        print(f"Clé {args.algorithm} créée : {kid} (seule clé privée, signe immédiatement)")
+        return
+    activation = datetime.now(timezone.utc) + timedelta(seconds=ACTIVATION_DELAY)
+    print(f"Clé {args.algorithm} créée : {kid} (publiée, signe à partir de {activation:%Y-%m-%d %H:%M:%S} UTC)")
+
+
+def list_keys(args):
+    if not os.path.isdir(args.dir):
+        print(f"Aucun répertoire {args.dir}")
+        return
+    created = {}
+    for name in sorted(os.listdir(args.dir)):
+        if name.endswith(".pub.pem"):
+            print(f"{name[:-len('.pub.pem')]:<24} publique (vérification seulement)")
+        elif name.endswith(".pem"):
+            created[name[:-len(".pem")]] = os.path.getmtime(os.path.join(args.dir, name))
+    if not created:
+        return
+
+    # Même règle que repository.keys.select_active_kid
+    now = time.time()
+    active_kid = os.getenv("JWT_ACTIVE_KID")
+    if active_kid not in created:
+        activable = [kid for kid, at in created.items() if at <= now - ACTIVATION_DELAY]
+        active_kid = max(activable, key=created.get) if activable else min(created, key=created.get)
+    for kid, at in sorted(created.items(), key=lambda item: item[1]):
+        if kid == active_kid:
+            state = "privée, signe"
+        elif at > now - ACTIVATION_DELAY:
+            activation = datetime.fromtimestamp(at + ACTIVATION_DELAY, timezone.utc)
+            state = f"privée, publiée ; signe à partir de {activation:%Y-%m-%d %H:%M:%S} UTC"
+        else:
+            state = "privée, inactive"
+        print(f"{kid:<24} {state}")
+
+
+def retire(args):
+    path = os.path.join(args.dir, f"{args.kid}.pem")
+    if not os.path.exists(path):
+        raise SystemExit(f"Clé privée {args.kid} introuvable")
+    with open(path, "rb") as f:
+        private_key = serialization.load_pem_private_key(f.read(), password=None)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    # La clé publique d'abord : les tokens déjà signés restent vérifiables
+    with open(os.path.join(args.dir, f"{args.kid}.pub.pem"), "wb") as f:
+        f.write(public_pem)
+    os.remove(path)
+    print(f"Clé {args.kid} retirée de la signature")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=KEYS_DIR, help="répertoire des clés (défaut : JWT_KEYS_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="créer une nouvelle clé de signature")
+    generate_parser.add_argument("--algorithm", default=os.getenv("JWT_ALGORITHM", "RS256"))
+    generate_parser.add_argument("--kid", help="identifiant (défaut : date UTC)")
+    generate_parser.set_defaults(handler=generate)
+
+    commands.add_parser("list", help="lister les clés").set_defaults(handler=list_keys)
+
+    retire_parser = commands.add_parser("retire", help="retirer une clé de la signature")
+    retire_parser.add_argument("kid")
+    retire_parser.set_defaults(handler=retire)
+
+    args = parser.parse_args()
+    args.handler(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
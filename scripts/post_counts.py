@@ -0,0 +1,36 @@
+"""
+Compteurs Users.post_count : vérification et reconstruction.
+
+    python scripts/post_counts.py check     # code 1 si des compteurs divergent
+    python scripts/post_counts.py rebuild   # recalcule tous les compteurs
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import SessionLocal  # noqa: E402
+from repository.posts import PostCounterRepo  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["check", "rebuild"])
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.command == "rebuild":
+            fixed = PostCounterRepo.rebuild(db)
+            print(f"Compteurs corrigés : {fixed}")
+            return 0
+
+        mismatches = PostCounterRepo.check(db)
+        for row in mismatches:
+            print(f"users.id={row['users_id']} post_count={row['post_count']} réel={row['actual']}")
+        print(f"Compteurs incohérents : {len(mismatches)}")
+        return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""
+Purge des refresh tokens expirés ou révoqués, pour garder la table compacte.
+À lancer périodiquement (cron) :
+
+    python scripts/purge_refresh_tokens.py
+"""
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import SessionLocal  # noqa: E402
+from repository.tokens import RefreshTokenRepo  # noqa: E402
+
+
+def main():
+    with SessionLocal() as db:
+        purged = RefreshTokenRepo.purge_expired(db)
+    print(f"Refresh tokens supprimés : {purged}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import os
+import sys
+import tempfile
+
+# Configuration lue à l'import de config : à fixer avant tout import de l'application
+_tmpdir = tempfile.mkdtemp(prefix="fastapi-jwt-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'test.db')}")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("RATE_LIMIT_IP", "100000/60")
+os.environ.setdefault("RATE_LIMIT_IDENTITY", "100000/60")
+os.environ.setdefault("CACHE_BACKEND", "memory")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import config  # noqa: E402
+from models.models import Post, Users  # noqa: E402
+from repository.cache import cache_key, invalidate  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def database():
+    """Schéma recréé pour chaque module de tests (tables, FTS, triggers)."""
+    config.Base.metadata.drop_all(config.engine)
+    config.Base.metadata.create_all(config.engine)
+    yield config.engine
+
+
+@pytest.fixture(scope="module")
+def seed(database):
+    """3 auteurs et 60 posts, insérés sans passer par bcrypt."""
+    db = config.SessionLocal()
+    try:
+        users = [
+            Users(username=f"author{i}", email=f"author{i}@example.com", phone="0123456789", password="x")
+            for i in range(3)
+        ]
+        db.add_all(users)
+        db.flush()
+        db.add_all([
+            Post(title=f"Post {n}", content=f"Contenu du post {n}", users_id=users[n % 3].id)
+            for n in range(60)
+        ])
+        db.commit()
+        return {"user_ids": [user.id for user in users]}
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def statements():
+    """Requêtes SQL émises pendant le test (moteur synchrone, ou celui du mode async)."""
+    engine = config.async_engine.sync_engine if config.DB_ASYNC else config.engine
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def evict():
+    """evict(namespace, *parts) : force la lecture en base au prochain appel d'une méthode en cache."""
+    def evict(namespace: str, *parts):
+        invalidate(cache_key(namespace, *parts))
+    return evict
+
+
+@pytest.fixture
+def anyio_backend():
+    """Tests @pytest.mark.anyio : l'application ne tourne que sous asyncio."""
+    return "asyncio"
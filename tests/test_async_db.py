@@ -0,0 +1,110 @@
+"""
+Mode DB_ASYNC (AsyncSession + aiosqlite) de bout en bout via httpx.AsyncClient.
+Sans DB_ASYNC=1 dans l'environnement, le module bascule l'application en mode
+async pour sa durée : moteur aiosqlite sur la même base, get_db -> get_async_db.
+"""
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import config
+from main import app
+
+PASSWORD = "s3cretpw"
+
+
+@pytest.fixture(scope="module")
+def async_mode(database):
+    if config.DB_ASYNC:
+        yield config.async_engine
+        return
+    # NullPool : chaque test a sa propre boucle, une connexion aiosqlite ne doit pas lui survivre
+    engine = create_async_engine(config.ASYNC_DATABASE_URL, poolclass=NullPool)
+    assert engine.dialect.driver == "aiosqlite"
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(config, "DB_ASYNC", True)
+        patch.setattr(config, "async_engine", engine)
+        patch.setattr(config, "AsyncSessionLocal", async_sessionmaker(engine, autoflush=False, expire_on_commit=False))
+        app.dependency_overrides[config.get_sync_db] = config.get_async_db
+        try:
+            yield engine
+        finally:
+            app.dependency_overrides.pop(config.get_sync_db, None)
+
+
+@pytest.fixture
+async def client(async_mode):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def signup(client, username):
+    response = await client.post("/auth/signup", json={
+        "username": username, "email": f"{username}@example.com", "phone": "0123456789", "password": PASSWORD,
+    })
+    assert response.json()["code"] == "200"
+
+
+async def login(client, username, password=PASSWORD):
+    response = await client.post("/auth/login", json={"username": username, "password": password})
+    return response.json()
+
+
+@pytest.mark.anyio
+async def test_session_is_async(async_mode):
+    async for db in config.get_async_db():
+        assert isinstance(db, AsyncSession)
+        assert db.bind is async_mode
+
+
+@pytest.mark.anyio
+async def test_signup_and_login(client, statements):
+    await signup(client, "asyncalice")
+    assert statements, "aucune requête sur le moteur async"
+
+    body = await login(client, "asyncalice")
+    assert body["code"] == "200"
+    token = body["result"]["access_token"]
+
+    response = await client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.json()["result"]["username"] == "asyncalice"
+
+    assert (await login(client, "asyncalice", "wrongpwd"))["code"] != "200"
+
+
+@pytest.mark.anyio
+async def test_signup_duplicate(client):
+    await signup(client, "asyncbob")
+    response = await client.post("/auth/signup", json={
+        "username": "asyncbob", "email": "asyncbob@example.com", "phone": "0123456789", "password": PASSWORD,
+    })
+    assert response.json()["code"] == "400"
+
+
+@pytest.mark.anyio
+async def test_list_and_update(client):
+    await signup(client, "asynccarol")
+    users = (await client.get("/api/users", params={"limit": 500})).json()["result"]
+    user_id = next(user["id"] for user in users if user["username"] == "asynccarol")
+
+    for n in range(3):
+        response = await client.post("/api/add_post", json={"title": f"Async {n}", "content": "contenu async", "users_id": user_id})
+        assert response.json()["code"] == "200"
+
+    page = (await client.get("/api/posts", params={"users_id": user_id, "limit": 2})).json()
+    assert [post["title"] for post in page["result"]] == ["Async 2", "Async 1"]
+    rest = (await client.get("/api/posts", params={"users_id": user_id, "limit": 2, "cursor": page["next_cursor"]})).json()
+    assert [post["title"] for post in rest["result"]] == ["Async 0"]
+    assert rest.get("next_cursor") is None
+
+    post_id = page["result"][0]["id"]
+    response = await client.put(f"/api/update_posts/{post_id}", json={"title": "Async 2 bis"})
+    assert response.json()["result"]["title"] == "Async 2 bis"
+    response = await client.put(f"/api/update_posts/{post_id}", json={"title": "Async 1"})
+    assert response.json()["code"] == "400"
+
+    response = await client.put(f"/api/update_users/{user_id}", json={"phone": "0999999999"})
+    assert response.json()["result"]["phone"] == "0999999999"
+    response = await client.get(f"/api/users/{user_id}", params={"user_id": user_id})
+    assert response.json()["result"]["phone"] == "0999999999"
@@ -0,0 +1,61 @@
+"""Cache partagé : pas de valeur périmée stockée après une invalidation pendant le calcul."""
+import pytest
+
+from repository import cache
+from repository.cache import LocalCacheBackend, RedisCacheBackend, cached, invalidate
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, monkeypatch):
+    if request.param == "redis":
+        # Dépendance de test (requirements.txt) : sans elle, seul le backend mémoire est testé
+        fakeredis = pytest.importorskip("fakeredis")
+        backend = RedisCacheBackend(client=fakeredis.FakeRedis(decode_responses=True))
+    else:
+        backend = LocalCacheBackend()
+    monkeypatch.setattr(cache, "cache_backend", backend)
+    return backend
+
+
+def test_invalidation_during_load_is_not_stored(backend):
+    source = {"value": 1}
+
+    def load(db, id):
+        value = source["value"]
+        if value == 1:
+            # Écriture concurrente : commit puis invalidation pendant la lecture
+            source["value"] = 2
+            invalidate(read.cache_key(id))
+        return {"value": value}
+
+    read = cached("test-stale")(load)
+
+    assert read(None, 1) == {"value": 1}
+    assert backend.get(read.cache_key(1)) is None
+    assert read(None, 1) == {"value": 2}
+    assert backend.get(read.cache_key(1)) is not None
+
+
+@pytest.mark.anyio
+async def test_async_invalidation_during_load_is_not_stored(backend):
+    source = {"value": 1}
+
+    def load(db, id):
+        value = source["value"]
+        if value == 1:
+            source["value"] = 2
+            invalidate(read.cache_key(id))
+        return {"value": value}
+
+    read = cached("test-stale-async")(load)
+
+    assert await read.aload(None, 1) == {"value": 1}
+    assert await read.aload(None, 1) == {"value": 2}
+    assert await read.aload(None, 1) == {"value": 2}
+
+
+def test_local_locks_are_bounded(backend):
+    read = cached("test-locks")(lambda db, id: {"id": id})
+    for id in range(1000):
+        read(None, id)
+    assert len(read._local_locks) == cache.CACHE_LOCK_STRIPES
@@ -0,0 +1,52 @@
+"""Routes d'exploitation (/internal/*, /metrics) fermées sans jeton ni adresse autorisée."""
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from main import app
+from repository.internal_access import internal_access, parse_networks
+
+ROUTES = ["/internal/hashing", "/internal/cache", "/internal/revocations", "/internal/rate-limit", "/metrics"]
+
+
+@pytest.fixture
+def client(database):
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def access(monkeypatch):
+    def configure(token: str, allowed_ips: str):
+        monkeypatch.setattr(internal_access, "token", token)
+        monkeypatch.setattr(internal_access, "networks", parse_networks(allowed_ips))
+    return configure
+
+
+@pytest.mark.parametrize("url", ROUTES)
+def test_closed_without_configuration(client, access, url):
+    access(token="", allowed_ips="")
+    assert client.get(url).status_code == 403
+    assert client.get(url, headers={"Authorization": "Bearer "}).status_code == 403
+
+
+@pytest.mark.parametrize("url", ROUTES)
+def test_token(client, access, url):
+    access(token="s3cret", allowed_ips="")
+    assert client.get(url, headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert client.get(url, headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+def test_allowed_network(access):
+    def request(host):
+        return Request({"type": "http", "method": "GET", "path": "/metrics", "headers": [], "client": (host, 1234)})
+
+    access(token="", allowed_ips="10.0.0.0/8, ::1")
+    internal_access.check(request("10.1.2.3"))
+    internal_access.check(request("::1"))
+    with pytest.raises(HTTPException):
+        internal_access.check(request("192.168.1.1"))
+    # Pair non IP (client de test) : refusé
+    with pytest.raises(HTTPException):
+        internal_access.check(request("testclient"))
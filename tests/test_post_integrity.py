@@ -0,0 +1,86 @@
+"""
+Violations de contrainte sur posts : titre déjà pris et auteur inconnu
+distingués (400 chacun), à la création comme à la mise à jour. Les clés
+étrangères sont activées sur SQLite pour reproduire le comportement de
+PostgreSQL.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+import config
+from main import app
+from models.models import Post, Users
+from repository.statements import FOREIGN_KEY_VIOLATION, UNIQUE_VIOLATION, integrity_violation, violates_unique
+
+UNKNOWN_USER = 999999
+
+
+@pytest.fixture(scope="module")
+def fk_engine(database):
+    engine = create_engine(config.DATABASE_URL)
+
+    @event.listens_for(engine, "connect")
+    def enable_foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def client(seed, fk_engine):
+    Session = sessionmaker(bind=fk_engine, autoflush=False)
+
+    def get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[config.get_db] = get_db
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.dependency_overrides.pop(config.get_db, None)
+
+
+def error_for(fk_engine, **values) -> IntegrityError:
+    with fk_engine.connect() as conn:
+        with pytest.raises(IntegrityError) as info:
+            conn.execute(insert(Post).values(**values))
+    return info.value
+
+
+def test_classifies_sqlite_violations(seed, fk_engine):
+    duplicate = error_for(fk_engine, title="Post 0", content="Contenu", users_id=seed["user_ids"][0])
+    assert integrity_violation(duplicate) == UNIQUE_VIOLATION
+    assert violates_unique(duplicate, Post.title)
+    assert not violates_unique(duplicate, Users.email)
+
+    orphan = error_for(fk_engine, title="Orphelin", content="Contenu", users_id=UNKNOWN_USER)
+    assert integrity_violation(orphan) == FOREIGN_KEY_VIOLATION
+    assert not violates_unique(orphan, Post.title)
+
+
+def test_add_post_with_unknown_author(client):
+    response = client.post("/api/add_post", json={
+        "title": "Post sans auteur", "content": "Contenu du post sans auteur", "users_id": UNKNOWN_USER})
+    assert response.json() == {"code": "400", "status": "Error", "message": "Utilisateur non trouvé"}
+
+
+def test_update_post_errors(client):
+    response = client.put("/api/update_posts/5", json={"users_id": UNKNOWN_USER})
+    assert response.json()["message"] == "Utilisateur non trouvé"
+    assert response.json()["code"] == "400"
+
+    response = client.put("/api/update_posts/5", json={"title": "Post 0"})
+    assert response.json()["message"] == "Cet post existe déjà"
+    assert response.json()["code"] == "400"
+
+    # Transaction annulée : le post est inchangé
+    assert client.get("/api/posts/5", params={"post_id": 5}).json()["result"]["title"] == "Post 4"
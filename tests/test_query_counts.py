@@ -0,0 +1,163 @@
+"""
+Nombre de requêtes SQL par endpoint : lectures constantes quelle que soit
+la taille de page (pas de N+1 sur les auteurs), lecture en cache sans SQL,
+écritures en un aller-retour (ON CONFLICT / RETURNING) plus les compteurs.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from repository.hashing import hasher
+
+
+@pytest.fixture(scope="module")
+def client(seed):
+    with TestClient(app) as client:
+        yield client
+
+
+def get(client, statements, url, **params):
+    statements.clear()
+    response = client.get(url, params=params)
+    assert response.status_code == 200
+    assert response.json()["code"] == "200"
+    return response, len(statements)
+
+
+def write(client, statements, method, url, code="200", **kwargs):
+    statements.clear()
+    response = client.request(method, url, **kwargs)
+    assert response.status_code == 200
+    assert response.json()["code"] == code
+    return response, len(statements)
+
+
+@pytest.mark.parametrize("limit", [1, 10, 50])
+def test_posts_page_is_one_query(client, statements, limit):
+    response, queries = get(client, statements, "/api/posts", limit=limit)
+    posts = response.json()["result"]
+    assert len(posts) == limit
+    assert all(post["users"]["username"].startswith("author") for post in posts)
+    assert queries == 1
+
+
+def test_posts_next_page_is_one_query(client, statements):
+    first, _ = get(client, statements, "/api/posts", limit=20)
+    _, queries = get(client, statements, "/api/posts", limit=20, cursor=first.json()["next_cursor"])
+    assert queries == 1
+
+
+def test_posts_filtered_page_is_one_query(client, statements, seed):
+    response, queries = get(client, statements, "/api/posts", limit=50, users_id=seed["user_ids"][0], sort="updated_at")
+    assert len(response.json()["result"]) == 20
+    assert queries == 1
+
+
+@pytest.mark.parametrize("limit", [1, 3])
+def test_users_page_is_one_query(client, statements, limit):
+    response, queries = get(client, statements, "/api/users", limit=limit)
+    users = response.json()["result"]
+    assert len(users) == limit
+    assert all("password" not in user for user in users)
+    assert queries == 1
+
+
+def test_one_post_with_author(client, statements, evict):
+    evict("post", 1)
+    response, queries = get(client, statements, "/api/posts/1", post_id=1)
+    assert response.json()["result"]["users"]["username"].startswith("author")
+    assert queries == 1
+
+    # Deuxième lecture : servie par le cache partagé
+    _, queries = get(client, statements, "/api/posts/1", post_id=1)
+    assert queries == 0
+
+
+def test_one_user(client, statements, evict, seed):
+    user_id = seed["user_ids"][0]
+    evict("user", user_id)
+    response, queries = get(client, statements, f"/api/users/{user_id}", user_id=user_id)
+    assert "password" not in response.json()["result"]
+    assert queries == 1
+
+    _, queries = get(client, statements, f"/api/users/{user_id}", user_id=user_id)
+    assert queries == 0
+
+
+def test_count_by_user_reads_the_counter(client, statements, evict):
+    evict("posts-count-by-user", "all")
+    statements.clear()
+    response = client.get("/api/count-by-user")
+    assert response.status_code == 200
+    assert sorted(row["total_posts"] for row in response.json()) == [20, 20, 20]
+    # Compteur dénormalisé : une requête sur users, sans agrégat sur posts
+    assert len(statements) == 1
+    assert "posts" not in statements[0].lower()
+
+
+# ========================
+# Écritures
+# ========================
+def test_signup_is_check_and_insert(client, statements):
+    body = {"username": "counted", "email": "counted@example.com", "phone": "0123456789", "password": "secret12"}
+    _, queries = write(client, statements, "POST", "/auth/signup", json=body)
+    # Vérification sur les index uniques puis INSERT ... ON CONFLICT
+    assert queries == 2
+
+    # Doublon : rejeté par la vérification, sans hachage ni INSERT
+    hashed = hasher.stats()["completed"]
+    _, queries = write(client, statements, "POST", "/auth/signup", code="400", json=body)
+    assert hasher.stats()["completed"] == hashed
+    assert queries == 1
+    assert statements[0].lstrip().upper().startswith("SELECT")
+
+
+def test_add_post_is_insert_and_counter(client, statements, seed):
+    body = {"title": "Post compté", "content": "Contenu du post compté", "users_id": seed["user_ids"][0]}
+    _, queries = write(client, statements, "POST", "/api/add_post", json=body)
+    # INSERT ... RETURNING puis Users.post_count
+    assert queries == 2
+
+    _, queries = write(client, statements, "POST", "/api/add_post", code="400", json=body)
+    assert queries == 1
+
+
+def test_update_post(client, statements, seed):
+    _, queries = write(client, statements, "PUT", "/api/update_posts/3", json={"content": "Contenu modifié du post"})
+    # Ancien auteur puis UPDATE ... RETURNING
+    assert queries == 2
+
+    # Réassignation : les deux compteurs en plus
+    _, queries = write(client, statements, "PUT", "/api/update_posts/3", json={"users_id": seed["user_ids"][0]})
+    assert queries == 4
+
+    _, queries = write(client, statements, "PUT", "/api/update_posts/100000", code="404", json={"content": "Contenu modifié du post"})
+    assert queries == 1
+
+
+def test_update_user(client, statements, seed):
+    user_id = seed["user_ids"][1]
+    _, queries = write(client, statements, "PUT", f"/api/update_users/{user_id}", json={"phone": "0987654321"})
+    assert queries == 2
+
+
+def test_delete_post_is_delete_and_counter(client, statements):
+    _, queries = write(client, statements, "DELETE", "/api/delete_post/4", params={"post_id": 4})
+    # DELETE ... RETURNING users_id puis Users.post_count
+    assert queries == 2
+
+    _, queries = write(client, statements, "DELETE", "/api/delete_post/4", code="404", params={"post_id": 4})
+    assert queries == 1
+
+
+def test_delete_user_with_posts(client, statements):
+    body = {"username": "leaving", "email": "leaving@example.com", "phone": "0123456789", "password": "secret12"}
+    write(client, statements, "POST", "/auth/signup", json=body)
+    user_id = client.get("/api/users", params={"limit": 100}).json()["result"][-1]["id"]
+    for n in range(3):
+        write(client, statements, "POST", "/api/add_post", json={
+            "title": f"Post de départ {n}", "content": "Contenu du post de départ", "users_id": user_id})
+
+    # Posts puis utilisateur, chacun en un DELETE ... RETURNING, quel que soit le nombre de posts
+    _, queries = write(client, statements, "DELETE", f"/api/delete_users/{user_id}")
+    assert queries == 2
@@ -0,0 +1,27 @@
+"""Recherche plein texte : extraits surlignés sûrs à insérer en HTML."""
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+@pytest.fixture(scope="module")
+def client(seed):
+    with TestClient(app) as client:
+        yield client
+
+
+def test_highlights_escape_post_content(client, seed):
+    response = client.post("/api/add_post", json={
+        "title": "<script>alert(1)</script> crêpe",
+        "content": '<img src=x onerror=alert(1)> une crêpe & du "beurre"',
+        "users_id": seed["user_ids"][0],
+    })
+    assert response.json()["code"] == "200"
+
+    hits = client.get("/api/posts/search", params={"q": "crêpe"}).json()["result"]
+    assert len(hits) == 1
+    assert hits[0]["title"] == "&lt;script&gt;alert(1)&lt;/script&gt; <mark>crêpe</mark>"
+    assert hits[0]["snippet"] == "&lt;img src=x onerror=alert(1)&gt; une <mark>crêpe</mark> &amp; du &quot;beurre&quot;"
+    # Le post lui-même reste le texte brut
+    assert hits[0]["post"]["title"] == "<script>alert(1)</script> crêpe"